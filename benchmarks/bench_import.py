@@ -0,0 +1,85 @@
+'''Import time of the package in fresh interpreters.
+
+    $ python benchmarks/bench_import.py
+    $ python benchmarks/bench_import.py --repeat 20 --importtime
+
+"import nft_market" loads the data types and enums only. The rest, e.g. Retriever, is imported on first access, and
+selenium when a browser is launched.
+'''
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import *
+
+STATEMENTS = [
+    ('python', 'pass'),
+    ('nft_market', 'import nft_market'),
+    ('data types', 'from nft_market import Market, NFTInfo, market_name'),
+    ('SnapshotStore', 'from nft_market import SnapshotStore'),
+    ('Retriever', 'from nft_market import Retriever'),
+    ('selenium', 'import selenium.webdriver, webdriver_manager.chrome'),
+    ('everything', 'from nft_market import *'),
+    ]
+
+_TIMED = '''
+import sys, time
+started_at = time.perf_counter()
+{}
+print(time.perf_counter() - started_at, len(sys.modules))
+'''
+
+
+def _run(statement: str, env: Mapping[str, str]) -> Tuple[float, int]:
+    out = subprocess.run([sys.executable, '-c', _TIMED.format(statement)], capture_output=True, text=True, check=True, env=env).stdout
+    sec, num_modules = out.split()
+    return float(sec), int(num_modules)
+# enddef
+
+
+def _importtime(statement: str, env: Mapping[str, str], top: int) -> List[str]:
+    # The modules taking the longest cumulative time by "python -X importtime".
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], capture_output=True, text=True, check=True, env=env).stderr
+    rows = []
+    for line in err.splitlines()[1:]:
+        _, cumulative, name = line.split('|')
+        rows.append((int(cumulative), name.strip()))
+    # endfor
+
+    return [f'{us / 1e3:>8.1f} ms {name}' for us, name in sorted(rows, reverse=True)[:top]]
+# enddef
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of nft_market.')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--importtime', action='store_true', help='Also show the slowest modules of each statement.')
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+
+    # Import the package of this checkout.
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root] + [p for p in [os.environ.get('PYTHONPATH')] if p]))
+
+    for label, statement in STATEMENTS:
+        try:
+            runs = [_run(statement, env) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f'{label:>16}: failed, {e.stderr.strip().splitlines()[-1]}')
+            continue
+        # endtry
+
+        ms = [sec * 1e3 for sec, _ in runs]
+        print(f'{label:>16}: {statistics.median(ms):>8.1f} ms (min {min(ms):.1f}), {runs[0][1]} modules')
+        if args.importtime and statement != 'pass':
+            for line in _importtime(statement, env, args.top):
+                print(f'{"":>18}{line}')
+            # endfor
+        # endif
+    # endfor
+# enddef
+
+
+if __name__ == '__main__':
+    main()
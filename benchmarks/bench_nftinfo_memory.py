@@ -0,0 +1,79 @@
+'''Memory and construction time of the slotted NFTInfo against the former dataclass with a __dict__.
+
+    $ python benchmarks/bench_nftinfo_memory.py
+'''
+import dataclasses
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+from typing import *
+
+# Import the package of this checkout, whether it is installed or not.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nft_market.nftinfo import FrozenNFTInfo, NFTInfo
+
+
+@dataclasses.dataclass
+class _NFTInfoDict:
+    # NFTInfo as it was before.
+    id: str
+    name: str
+    num_supply: Optional[int]
+    num_listing: Optional[int]
+    num_owners: Optional[int]
+    floor: float
+    volume: float
+    days_from_last_trade: Optional[int]
+
+    def __post_init__(self):
+        assert self.id is not None, self.id
+        assert self.name is not None, self.name
+        assert self.floor is not None, self.floor
+        assert self.volume is not None, self.volume
+    # enddef
+
+
+def _rows(n: int) -> List[Tuple]:
+    # The strings and numbers are shared by all the classes, so only the instances themselves are measured.
+    return [(f'collection-{i}', f'Collection {i}', 10000, i % 500 or None, 5000, 1.5, 1234.5, None) for i in range(n)]
+# enddef
+
+
+def _bytes_per_instance(build: Callable[[], List], n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # The list holding them.
+    size -= instances.__sizeof__()
+    return size / n
+# enddef
+
+
+def main():
+    n = 100000
+    rows = _rows(n)
+
+    print(f'{"":>24}  {"bytes/instance":>14}  {"us/instance":>11}')
+    for name, build in [
+        ('dataclass (before)', lambda: [_NFTInfoDict(*row) for row in rows]),
+        ('NFTInfo', lambda: [NFTInfo(*row) for row in rows]),
+        ('FrozenNFTInfo', lambda: [FrozenNFTInfo(*row) for row in rows]),
+        ('NFTInfo.from_tuples', lambda: NFTInfo.from_tuples(rows)),
+        ]:
+        size = _bytes_per_instance(build, n)
+        sec = min(timeit.repeat(build, number=1, repeat=5))
+        print(f'{name:>24}  {size:>14.1f}  {sec / n * 1e6:>11.3f}')
+    # endfor
+# enddef
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+'''Micro-benchmark of the numeric parser of NFTInfoBuilder against the former eval-based one.
+
+    $ python benchmarks/bench_text2float.py
+'''
+import os
+import sys
+import timeit
+
+# Import the package of this checkout, whether it is installed or not.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nft_market.nftinfo import _parse_number
+
+# Texts as they come out of the XPaths (and post-processors) of the scrapers.
+CORPUS = [
+    '10,000',  # OpenSea, supply
+    '111.5',  # OpenSea, floor
+    '487.6K',  # OpenSea, volume
+    '1.2M',  # tofuNFT, volume
+    '3,245',  # tofuNFT, owners
+    '<0.01',  # Rarible, floor
+    '12.5 ',  # Rarible, volume with "ETH" removed
+    '$1,234.56',  # Crypto.com, floor
+    '$2.1m',  # Crypto.com, volume
+    '69.9',  # Solanart, floor with "◎" stripped
+    '1.05B',  # Gem, volume
+    '8888',  # PancakeSwap, supply
+    '1234',  # NFTgeek, supply with spaces removed
+    '0.42',  # ICScan, floor
+    '15,000.7 ',  # ICScan, volume with "ICP" removed
+    ]
+
+
+def _text2float_eval(s: str) -> float:
+    s_rep = s.replace(',', '').replace('<', '').replace('>', '').replace('$', '') \
+        .replace('k', '*1000').replace('K', '*1000') \
+        .replace('m', '*1000000').replace('M', '*1000000') \
+        .replace('B', '*1000000000')
+    return float(eval(s_rep))
+# enddef
+
+
+def main():
+    number = 20000
+    for func in [_text2float_eval, _parse_number]:
+        assert [func(s) for s in CORPUS] == [_text2float_eval(s) for s in CORPUS], func
+        sec = min(timeit.repeat(lambda: [func(s) for s in CORPUS], number=number, repeat=5))
+        print(f'{func.__name__:>20}: {sec / (number * len(CORPUS)) * 1e6:.3f} us/string')
+    # endfor
+# enddef
+
+
+if __name__ == '__main__':
+    main()
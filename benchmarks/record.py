@@ -0,0 +1,113 @@
+'''Record the rendered pages of the marketplaces into fixtures for server.py and run.py.
+
+    $ python benchmarks/record.py fixtures --browser Firefox
+    $ python benchmarks/record.py fixtures --browser Chrome --pair Market.OpenSea azuki --pair Market.MagicEden okay_bears
+'''
+import argparse
+import json
+import os
+import sys
+from typing import *
+
+# Import the package of this checkout, whether it is installed or not.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import fixture_path
+
+from nft_market import Browser, Explorer, Market, REGISTRY, Retriever, market_name, parse_market
+
+# A collection or two of each market in REGISTRY but the deprecated ones, after samples.py.
+DEFAULT_PAIRS = [
+    (Market.OpenSea, 'azuki'),
+    (Market.OpenSea, 'clonex'),
+    (Market.tofuNFT, 'samurise'),
+    (Market.PancakeSwap, '0x0a8901b0e25deb55a87524f0cc164e9644020eba'),
+    (Market.Rarible, 'boredapeyachtclub'),
+    (Market.GhostMarket, 'neoverse'),
+    (Market.Cryptocom, '6c7b1a68479f2fc35e9f81e42bcb7397'),
+    (Market.Gem, 'hakinft-io'),
+    (Market.NFTrade, 'polygon/0xc93c53de60d1a28df01e41f5bc04619039d2ef4f'),
+    (Market.Solanart, 'degenape'),
+    (Market.MagicEden, 'okay_bears'),
+    (Market.XANALIA, 'collection/underground_city'),
+    (Market.Coinbase, 'ethereum/0x23581767a106ae21c074b2276D25e5C3e136a68b'),
+    (Market.NiftyGateway, '0xc71561e12faf378b07eacd36b3d0eb0d13a5fb1c'),
+    # The summary, holders and transactions pages.
+    (Explorer.NFTgeek, 'pk6rk-6aaaa-aaaae-qaazq-cai'),
+    (Explorer.ICScan, 'pk6rk-6aaaa-aaaae-qaazq-cai'),
+    ]  # type: List[Tuple[Union[Market, Explorer], str]]
+
+# The rendered DOM without the scripts, so that a replay neither re-renders the page nor calls the live APIs. Data
+# blocks such as <script id="__NEXT_DATA__" type="application/json"> are kept for the json: selectors.
+_OUTER_HTML = '''
+for (const script of document.querySelectorAll('script')) {
+    const type = script.type.trim().toLowerCase();
+    if (type === '' || type === 'module' || type.includes('javascript') || type.includes('ecmascript')) {
+        script.remove();
+    }
+}
+for (const link of document.querySelectorAll('link[rel="modulepreload"], link[rel="preload"][as="script"]')) {
+    link.remove();
+}
+return document.documentElement.outerHTML;
+'''
+
+
+def record(r: Retriever, root: str, market: Union[Market, Explorer], id: str):
+    pages = REGISTRY[market].pages
+    fetcher = r._open([page.format_url(id) for page in pages], market=market)
+    with fetcher as driver:
+        for i in range(len(pages)):
+            fetcher.switch(i)
+            html = driver.execute_script(_OUTER_HTML)
+
+            path = fixture_path(root, market, i, id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('<!DOCTYPE html>\n' + html)
+            # endwith
+        # endfor
+    # endwith
+# enddef
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record the rendered pages of the marketplaces.')
+    parser.add_argument('root', help='The directory of the fixtures.')
+    parser.add_argument('--browser', choices=[b.name for b in Browser], default=Browser.Firefox.name)
+    parser.add_argument('--sec-wait', type=int, default=10, help='Seconds to let each page render.')
+    parser.add_argument('--pair', nargs=2, action='append', metavar=('MARKET', 'ID'), help='e.g. --pair Market.OpenSea azuki')
+    args = parser.parse_args()
+
+    pairs = [(parse_market(market), id) for market, id in args.pair] if args.pair else DEFAULT_PAIRS
+
+    recorded = []
+    with Retriever(Browser[args.browser], sec_wait=args.sec_wait) as r:
+        for market, id in pairs:
+            try:
+                record(r, args.root, market, id)
+            except Exception as e:
+                print(f'[Warning] Failed to record "{market_name(market)}:{id}": {e!r}', file=sys.stderr)
+                continue
+            # endtry
+
+            recorded.append([market_name(market), id])
+            print(f'Recorded {market_name(market)}:{id}')
+        # endfor
+    # endwith
+
+    # Merge into the pairs recorded before.
+    path = os.path.join(args.root, 'manifest.json')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            recorded = [pair for pair in json.load(f) if pair not in recorded] + recorded
+        # endwith
+    # endif
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(recorded, f, indent=2)
+    # endwith
+# enddef
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+'''Offline benchmarks of Retriever against the pages recorded by record.py.
+
+    $ python benchmarks/run.py fixtures --output results.json
+    $ python benchmarks/run.py fixtures --browser Firefox --output results.json --compare baseline.json
+
+Measured:
+- parse: The cost of extracting and parsing each market from its HTML without a browser (Engine.HTTP).
+- fetch: End-to-end latency of Retriever.fetch for each engine, with the time of each phase.
+- throughput: Retriever.fetch_many over all the fixtures with several pool sizes.
+- memory: RSS of a browser session (Linux only).
+
+The output is JSON, so that results of two commits can be compared with --compare.
+'''
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from typing import *
+
+# Import the package of this checkout, whether it is installed or not.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import FixtureServer, fixture_path, load_manifest, local_specs
+
+from nft_market import Browser, Engine, Explorer, Instrumentation, Market, MetricsHook, REGISTRY, Retriever, Wait, http_engine, market_name
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+# enddef
+
+
+def _summary(seconds: List[float]) -> Dict[str, float]:
+    ms = [s * 1e3 for s in seconds]
+    return {'n': len(ms), 'mean_ms': statistics.mean(ms), 'p50_ms': _percentile(ms, 50), 'p95_ms': _percentile(ms, 95)}
+# enddef
+
+
+def bench_parse(root: str, pairs: List[Tuple[Union[Market, Explorer], str]], number: int) -> Dict[str, Any]:
+    '''Extraction and parsing of each page with lxml, i.e. the work of _retrieve_page_http after the download.'''
+    results = {}
+    for market, id in pairs:
+        for i, page in enumerate(REGISTRY[market].pages):
+            with open(fixture_path(root, market, i, id), 'r', encoding='utf-8') as f:
+                html = f.read()
+            # endwith
+
+            def resolve():
+                for selectors in page.compiled:
+                    builder = http_engine.HTTPBuilder(html, id)
+                    for field, xpath, post in selectors:
+                        getattr(builder, field)(xpath, post)
+                    # endfor
+                    try:
+                        return builder.resolve()
+                    except Exception:
+                        continue
+                    # endtry
+                # endfor
+            # enddef
+
+            ok = resolve() is not None
+            sec = min(timeit.repeat(resolve, number=number, repeat=3)) / number
+            results[f'{market_name(market)}:{id}:{i}'] = {'ms': sec * 1e3, 'ok': ok}
+        # endfor
+    # endfor
+
+    return results
+# enddef
+
+
+def _retriever(args: argparse.Namespace, server: FixtureServer, engine: Engine, pool_size: int = 1,
+               instrumentation: Instrumentation = None) -> Retriever:
+    specs = local_specs(server.url)
+    return Retriever(Browser[args.browser or Browser.Firefox.name], sec_wait=args.sec_wait, num_retry=0, wait=Wait.Ready, pool_size=pool_size,
+                     specs=specs, engines={market: engine for market in specs}, instrumentation=instrumentation)
+# enddef
+
+
+def bench_fetch(args: argparse.Namespace, server: FixtureServer, pairs: List[Tuple[Union[Market, Explorer], str]],
+                engine: Engine) -> Dict[str, Any]:
+    '''End-to-end latency of Retriever.fetch for each market, and the mean time of each phase.'''
+    hook = MetricsHook()
+    results = {}
+    with _retriever(args, server, engine, instrumentation=Instrumentation([hook])) as r:
+        # Warm up, e.g. launch the browser.
+        try:
+            r.fetch(*pairs[0])
+        except Exception:
+            pass
+        # endtry
+
+        for market, id in pairs:
+            seconds = []
+            error = None
+            for _ in range(args.repeat):
+                started_at = time.perf_counter()
+                try:
+                    r.fetch(market, id)
+                except Exception as e:
+                    error = repr(e)
+                    continue
+                # endtry
+                seconds.append(time.perf_counter() - started_at)
+            # endfor
+
+            result = _summary(seconds) if len(seconds) > 0 else {'n': 0}
+            result['error'] = error
+            results[f'{market_name(market)}:{id}'] = result
+        # endfor
+    # endwith
+
+    phases = {}
+    for (market, phase), (count, total) in hook.phase_stats().items():
+        phases.setdefault(phase, [0, 0.0])
+        phases[phase][0] += count
+        phases[phase][1] += total
+    # endfor
+
+    return {
+        'by_pair': results,
+        'phases_mean_ms': {phase: total / count * 1e3 for phase, (count, total) in sorted(phases.items())},
+        }
+# enddef
+
+
+def bench_throughput(args: argparse.Namespace, server: FixtureServer, pairs: List[Tuple[Union[Market, Explorer], str]],
+                     engine: Engine) -> Dict[str, Any]:
+    '''Fetches per second of Retriever.fetch_many with several pool sizes.'''
+    results = {}
+    for pool_size in args.pool_sizes:
+        with _retriever(args, server, engine, pool_size=pool_size) as r:
+            # Warm up the sessions.
+            list(r.fetch_many(pairs[:1] * pool_size))
+
+            started_at = time.perf_counter()
+            batch = r.fetch_many(pairs * args.repeat)
+            for _ in batch:
+                pass
+            # endfor
+            sec = time.perf_counter() - started_at
+        # endwith
+
+        results[str(pool_size)] = {'fetches_per_sec': len(batch.pairs) / sec, 'failed': len(batch.failures)}
+    # endfor
+
+    return results
+# enddef
+
+
+def _rss_tree(pid: int) -> Optional[int]:
+    # The resident set size of a process and its descendants in bytes, from /proc.
+    if not os.path.isdir('/proc'):
+        return None
+    # endif
+
+    children = {}  # type: Dict[int, List[int]]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat', 'r') as f:
+                    stat = f.read()
+                # endwith
+            except OSError:
+                continue
+            # endtry
+            ppid = int(stat.rsplit(')', 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        # endif
+    # endfor
+
+    total = 0
+    stack = [pid]
+    while len(stack) > 0:
+        p = stack.pop()
+        try:
+            with open(f'/proc/{p}/statm', 'r') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+            # endwith
+        except OSError:
+            pass
+        # endtry
+        stack += children.get(p, [])
+    # endwhile
+
+    return total
+# enddef
+
+
+def bench_memory(args: argparse.Namespace, server: FixtureServer, pairs: List[Tuple[Union[Market, Explorer], str]]) -> Dict[str, Any]:
+    '''RSS of one browser session after fetching all the fixtures.'''
+    with _retriever(args, server, Engine.Selenium) as r:
+        for market, id in pairs:
+            try:
+                r.fetch(market, id)
+            except Exception:
+                pass
+            # endtry
+        # endfor
+
+        sessions = r._pool._idle
+        if len(sessions) == 0:
+            return {'rss_mb_per_session': None}
+        # endif
+        rss = _rss_tree(sessions[0].driver.service.process.pid)
+    # endwith
+
+    return {'rss_mb_per_session': None if rss is None else rss / 2 ** 20}
+# enddef
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+    # endtry
+# enddef
+
+
+def _flatten(d: Mapping[str, Any], prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in d.items():
+        if isinstance(value, Mapping):
+            flat.update(_flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f'{prefix}{key}'] = value
+        # endif
+    # endfor
+
+    return flat
+# enddef
+
+
+def compare(baseline: Mapping[str, Any], current: Mapping[str, Any]):
+    '''Print the ratio of every number in "current" to the one in "baseline".'''
+    old = _flatten(baseline['results'])
+    new = _flatten(current['results'])
+    print(f'{baseline.get("commit")} -> {current.get("commit")}')
+    for key in sorted(set(old) & set(new)):
+        if old[key] != 0 and not key.endswith('.n'):
+            print(f'{key:>80}: {old[key]:>12.3f} -> {new[key]:>12.3f} ({new[key] / old[key]:.2f}x)')
+        # endif
+    # endfor
+# enddef
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks of Retriever against recorded pages.')
+    parser.add_argument('root', help='The directory of the fixtures recorded by record.py.')
+    parser.add_argument('--browser', choices=[b.name for b in Browser], help='Also benchmark Engine.Selenium with this browser.')
+    parser.add_argument('--sec-wait', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--parse-number', type=int, default=20)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--latency', type=float, default=0, help='Seconds the server waits before each response.')
+    parser.add_argument('--output', help='Where to write the results as JSON. Standard output by default.')
+    parser.add_argument('--compare', help='Results of a baseline to compare with.')
+    args = parser.parse_args()
+
+    if not http_engine.is_available():
+        sys.exit('lxml is required: pip install nft_market[http]')
+    # endif
+
+    pairs = load_manifest(args.root)
+    engines = [Engine.HTTP] + ([Engine.Selenium] if args.browser is not None else [])
+
+    results = {'parse': bench_parse(args.root, pairs, args.parse_number), 'fetch': {}, 'throughput': {}}
+    with FixtureServer(args.root, latency=args.latency) as server:
+        for engine in engines:
+            results['fetch'][engine.name] = bench_fetch(args, server, pairs, engine)
+            results['throughput'][engine.name] = bench_throughput(args, server, pairs, engine)
+        # endfor
+        if args.browser is not None:
+            results['memory'] = bench_memory(args, server, pairs)
+        # endif
+    # endwith
+
+    output = {
+        'commit': _commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'browser': args.browser,
+        'results': results,
+        }
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+        # endwith
+    else:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+    # endif
+
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), output)
+        # endwith
+    # endif
+# enddef
+
+
+if __name__ == '__main__':
+    main()
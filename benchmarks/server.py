@@ -0,0 +1,137 @@
+'''A local stand-in for the marketplaces, serving the pages recorded by record.py.
+
+    $ python benchmarks/server.py fixtures --port 8000 --latency 0.05
+
+Fixtures are laid out as <root>/<market>/<page index>/<quoted id>.html, e.g. fixtures/Market.OpenSea/0/azuki.html.
+'''
+import argparse
+import dataclasses
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from typing import *
+
+# Import the package of this checkout, whether it is installed or not.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nft_market import Explorer, Market, MarketSpec, REGISTRY, market_name, parse_market
+
+
+def fixture_path(root: str, market: Union[Market, Explorer], page: int, id: str) -> str:
+    return os.path.join(root, market_name(market), str(page), urllib.parse.quote(id, safe='') + '.html')
+# enddef
+
+
+def load_manifest(root: str) -> List[Tuple[Union[Market, Explorer], str]]:
+    '''The (market, id) pairs recorded in the fixtures.'''
+    with open(os.path.join(root, 'manifest.json'), 'r', encoding='utf-8') as f:
+        return [(parse_market(market), id) for market, id in json.load(f)]
+    # endwith
+# enddef
+
+
+def local_specs(base_url: str, specs: Mapping[Union[Market, Explorer], MarketSpec] = REGISTRY) -> Dict[Union[Market, Explorer], MarketSpec]:
+    '''The specs of the markets with their URLs pointed at a FixtureServer.'''
+    def url(market: Union[Market, Explorer], page: int) -> Callable[[str], str]:
+        prefix = f'{base_url}/{urllib.parse.quote(market_name(market))}/{page}/'
+        return lambda id: prefix + urllib.parse.quote(id, safe='')
+    # enddef
+
+    return {market: dataclasses.replace(spec, pages=[dataclasses.replace(page, url=url(market, i)) for i, page in enumerate(spec.pages)])
+            for market, spec in specs.items()}
+# enddef
+
+
+class FixtureServer:
+    '''Serves the fixtures on a local port in a background thread, optionally with an artificial latency.'''
+
+    def __init__(self, root: str, host: str = '127.0.0.1', port: int = 0, latency: float = 0):
+        self.root = root
+        self.latency = latency
+
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parts = urllib.parse.urlsplit(self.path).path.strip('/').split('/')
+                path = None
+                if len(parts) == 3:
+                    market, page, id = (urllib.parse.unquote(part) for part in parts)
+                    path = fixture_path(server.root, parse_market(market), int(page), id) if page.isdigit() else None
+                # endif
+
+                if path is None or not os.path.isfile(path):
+                    self.send_error(404)
+                    return
+                # endif
+
+                with open(path, 'rb') as f:
+                    body = f.read()
+                # endwith
+                if server.latency > 0:
+                    time.sleep(server.latency)
+                # endif
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            # enddef
+
+            def log_message(self, format, *args):
+                pass
+            # enddef
+
+        self._httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None  # type: Optional[threading.Thread]
+    # enddef
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+    # enddef
+
+    def __enter__(self) -> 'FixtureServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fixture_server', daemon=True)
+        self._thread.start()
+        return self
+    # enddef
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+    # enddef
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded pages of the marketplaces.')
+    parser.add_argument('root', help='The directory of the fixtures.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0, help='Seconds to wait before each response.')
+    args = parser.parse_args()
+
+    with FixtureServer(args.root, args.host, args.port, args.latency) as server:
+        print(f'Serving {args.root} at {server.url}')
+        try:
+            while True:
+                time.sleep(3600)
+            # endwhile
+        except KeyboardInterrupt:
+            pass
+        # endtry
+    # endwith
+# enddef
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,49 @@
+import importlib
+from typing import *
+
 from nft_market.market import *
+from nft_market.instrument import *
 from nft_market.nftinfo import *
-from nft_market.retriever import *
+
+# The names imported above. The star imports bring typing and the like as well, which are not exported.
+_EAGER = (
+    'Market', 'Explorer', 'market_name', 'parse_market',
+    'Phase', 'Hook', 'Instrumentation', 'MetricsHook', 'NULL_INSTRUMENTATION', 'DEFAULT_BUCKETS',
+    'NFTINFO_FIELDS', 'FieldError', 'MissingFieldError', 'ParseError', 'NFTInfo', 'FrozenNFTInfo', 'NFTInfoBuilder',
+    )
+
+# The rest is imported on first access, so that importing the data types is cheap, e.g. for analytics and CLI tools that
+# never launch a browser. Add the public names of a new module here.
+_LAZY = {
+    'retriever': ('Browser', 'Engine', 'Wait', 'FetchResult', 'FetchBatch', 'Retriever'),
+    'retry': ('RetryPolicy',),
+    'async_retriever': ('AsyncRetriever',),
+    'cache': ('CacheBackend', 'MemoryCache', 'SQLiteCache', 'CachedRetriever'),
+    'spec': ('Resource', 'POSTS', 'FIELDS', 'Selector', 'Page', 'MarketSpec', 'REGISTRY', 'register_market'),
+    'store': ('MISSING', 'to_missing', 'from_missing', 'History', 'SnapshotStore'),
+    'watcher': ('Threshold', 'DEFAULT_THRESHOLDS', 'Delta', 'Watcher'),
+    'scheduler': ('TokenBucket', 'SchedulerMetrics', 'Scheduler'),
+    'jobqueue': ('Job', 'DeadLetter', 'JobQueue', 'SQLiteJobQueue', 'Worker'),
+    }  # type: Dict[str, Tuple[str, ...]]
+
+_MODULE_OF = {name: module for module, names in _LAZY.items() for name in names}
+
+# "from nft_market import *" imports everything, as before.
+__all__ = list(_EAGER) + list(_MODULE_OF)
+
+
+def __getattr__(name: str) -> Any:
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    # endif
+
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+# enddef
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_MODULE_OF))
+# enddef
@@ -0,0 +1,5 @@
+import sys
+
+from nft_market.cli import main
+
+sys.exit(main())
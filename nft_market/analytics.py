@@ -0,0 +1,218 @@
+import dataclasses
+from typing import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+# endtry
+
+from nft_market.market import Explorer, Market, market_name
+from nft_market.nftinfo import NFTInfo
+
+# How rows are grouped across markets: a mapping or a function from (market, id) to a collection name. Rows not in a
+# mapping are grouped by their ID.
+KeyFunc = Union[Mapping[Tuple[Union[Market, Explorer], str], str], Callable[[Union[Market, Explorer], str], str]]
+
+
+def is_available() -> bool:
+    '''Whether the analytics can be used, i.e. NumPy is installed.'''
+    return np is not None
+# enddef
+
+
+def _masked(values: List[Optional[Union[int, float]]], dtype) -> 'np.ma.MaskedArray':
+    n = len(values)
+    mask = np.fromiter((v is None for v in values), dtype=bool, count=n)
+    data = np.fromiter((0 if v is None else v for v in values), dtype=dtype, count=n)
+    return np.ma.MaskedArray(data, mask=mask)
+# enddef
+
+
+def _divide(a: 'np.ma.MaskedArray', b: 'np.ma.MaskedArray') -> 'np.ma.MaskedArray':
+    # Masked wherever either side is missing or the divisor is zero.
+    b = np.ma.masked_equal(b, 0)
+    return np.ma.asarray(a, dtype=np.float64) / np.ma.asarray(b, dtype=np.float64)
+# enddef
+
+
+@dataclasses.dataclass
+class Spread:
+    '''Floors of each collection across markets. Rows are collections and columns are markets.
+
+    "low", "high", "spread" and "relative" are masked for collections listed on fewer than two markets.
+    '''
+    keys: 'np.ndarray'
+    markets: List[Union[Market, Explorer]]
+    floors: 'np.ma.MaskedArray'
+    low: 'np.ma.MaskedArray'
+    high: 'np.ma.MaskedArray'
+    spread: 'np.ma.MaskedArray'
+    relative: 'np.ma.MaskedArray'
+    cheapest: 'np.ndarray'
+
+
+class Table:
+    '''A batch of NFTInfo as NumPy columns.
+
+    The Optional fields (num_supply, num_listing, num_owners and days_from_last_trade) are masked arrays, so missing
+    values drop out of the calculations instead of being branched on row by row.
+    '''
+
+    def __init__(self, rows: Iterable[Tuple[Union[Market, Explorer], NFTInfo]]):
+        '''
+        Args:
+            rows (Iterable[Tuple[Market, NFTInfo]]): e.g. the successful results of Retriever.fetch_many.
+        '''
+        if np is None:
+            raise ImportError('NumPy is required for nft_market.analytics. Install it with "pip install nft_market[analytics]".')
+        # endif
+
+        rows = list(rows)
+        nfts = [nft for _, nft in rows]
+        self.market = np.array([market for market, _ in rows], dtype=object)
+        self.id = np.array([nft.id for nft in nfts], dtype=object)
+        self.name = np.array([nft.name for nft in nfts], dtype=object)
+        self.num_supply = _masked([nft.num_supply for nft in nfts], np.int64)
+        self.num_listing = _masked([nft.num_listing for nft in nfts], np.int64)
+        self.num_owners = _masked([nft.num_owners for nft in nfts], np.int64)
+        self.floor = np.fromiter((nft.floor for nft in nfts), dtype=np.float64, count=len(nfts))
+        self.volume = np.fromiter((nft.volume for nft in nfts), dtype=np.float64, count=len(nfts))
+        self.days_from_last_trade = _masked([nft.days_from_last_trade for nft in nfts], np.int64)
+    # enddef
+
+    @classmethod
+    def from_results(cls, results: Iterable[Any]) -> 'Table':
+        '''A table of the successful ones of FetchResult.'''
+        return cls((r.market, r.nft) for r in results if r.ok)
+    # enddef
+
+    def __len__(self) -> int:
+        return len(self.id)
+    # enddef
+
+    def listing_ratio(self) -> 'np.ma.MaskedArray':
+        '''num_listing / num_supply of each row.'''
+        return _divide(self.num_listing, self.num_supply)
+    # enddef
+
+    def owner_concentration(self) -> 'np.ma.MaskedArray':
+        '''num_supply / num_owners of each row, i.e. how many items an owner holds on average.'''
+        return _divide(self.num_supply, self.num_owners)
+    # enddef
+
+    def _group(self, key: Optional[KeyFunc]) -> Tuple['np.ndarray', 'np.ndarray']:
+        # Unique collection names and the index of each row in them.
+        if key is None:
+            names = self.id
+        elif callable(key):
+            names = np.array([key(market, id) for market, id in zip(self.market, self.id)], dtype=object)
+        else:
+            names = np.array([key.get((market, id), id) for market, id in zip(self.market, self.id)], dtype=object)
+        # endif
+
+        return np.unique(names.astype(str), return_inverse=True)
+    # enddef
+
+    def _markets(self) -> Tuple[List[Union[Market, Explorer]], 'np.ndarray']:
+        names, index = np.unique(np.array([market_name(m) for m in self.market], dtype=str), return_inverse=True)
+        markets = [None] * len(names)
+        for market, i in zip(self.market, index):
+            markets[i] = market
+        # endfor
+
+        return markets, index
+    # enddef
+
+    def pivot(self, column: str, key: KeyFunc = None) -> Tuple['np.ndarray', List[Union[Market, Explorer]], 'np.ma.MaskedArray']:
+        '''A column as a (collections x markets) matrix, masked where a collection is not fetched from a market.
+
+        Args:
+            column (str): The name of a column, e.g. "floor".
+            key (KeyFunc): How rows are grouped into collections, since markets may call a collection by different IDs.
+        '''
+        keys, rows = self._group(key)
+        markets, cols = self._markets()
+        values = np.ma.asarray(getattr(self, column), dtype=np.float64)
+
+        matrix = np.ma.masked_all((len(keys), len(markets)), dtype=np.float64)
+        matrix[rows, cols] = values
+        return keys, markets, matrix
+    # enddef
+
+    def floor_spread(self, key: KeyFunc = None) -> Spread:
+        '''Floors of each collection compared across markets.'''
+        keys, markets, floors = self.pivot('floor', key)
+        count = floors.count(axis=1)
+        low = np.ma.masked_where(count < 2, floors.min(axis=1))
+        high = np.ma.masked_where(count < 2, floors.max(axis=1))
+        spread = high - low
+        cheapest = np.array(markets, dtype=object)[floors.filled(np.inf).argmin(axis=1)] if len(markets) > 0 else np.array([], dtype=object)
+
+        return Spread(keys=keys, markets=markets, floors=floors, low=low, high=high, spread=spread, relative=_divide(spread, low), cheapest=cheapest)
+    # enddef
+
+    def volume_weighted_floor(self, key: KeyFunc = None) -> Tuple['np.ndarray', 'np.ma.MaskedArray']:
+        '''The floor of each collection across markets, weighted by the volume on each market.
+
+        Masked for collections without volume.
+        '''
+        keys, rows = self._group(key)
+        weighted = np.bincount(rows, weights=self.floor * self.volume, minlength=len(keys))
+        volume = np.bincount(rows, weights=self.volume, minlength=len(keys))
+        return keys, _divide(weighted, volume)
+    # enddef
+
+
+def _windows(a: Any, window: int) -> Tuple['np.ndarray', 'np.ndarray']:
+    # The values and the validity of the window ending at each element, one row per element, with 0 for invalid ones.
+    # Each window is computed on its own rather than from running sums, which lose the precision of e.g. a small
+    # deviation of a large price.
+    if window < 1:
+        raise ValueError(f'window must be positive: {window}')
+    # endif
+
+    a = np.ma.masked_invalid(np.ma.asarray(a, dtype=np.float64))
+    if len(a) == 0:
+        return np.zeros((0, window)), np.zeros((0, window), dtype=bool)
+    # endif
+
+    values = np.concatenate([np.zeros(window - 1), a.filled(0.0)])
+    valid = np.concatenate([np.zeros(window - 1, dtype=bool), ~np.ma.getmaskarray(a)])
+    return np.lib.stride_tricks.sliding_window_view(values, window), np.lib.stride_tricks.sliding_window_view(valid, window)
+# enddef
+
+
+def rolling_mean(a: Any, window: int, min_periods: int = 1) -> 'np.ma.MaskedArray':
+    '''The mean over the last "window" elements, e.g. of History.floor, skipping missing values.
+
+    Args:
+        min_periods (int): The result is masked where fewer valid values than this are in the window.
+    '''
+    values, valid = _windows(a, window)
+    counts = valid.sum(axis=1)
+    return np.ma.masked_where(counts < max(min_periods, 1), values.sum(axis=1) / np.maximum(counts, 1))
+# enddef
+
+
+def rolling_std(a: Any, window: int, min_periods: int = 2) -> 'np.ma.MaskedArray':
+    '''The sample standard deviation over the last "window" elements, skipping missing values.'''
+    values, valid = _windows(a, window)
+    counts = valid.sum(axis=1)
+    means = values.sum(axis=1) / np.maximum(counts, 1)
+    deviations = np.where(valid, values - means[:, None], 0.0)
+    var = (deviations * deviations).sum(axis=1) / (np.maximum(counts, 2) - 1)
+    return np.ma.masked_where(counts < max(min_periods, 2), np.sqrt(var))
+# enddef
+
+
+def pct_change(a: Any, periods: int = 1) -> 'np.ma.MaskedArray':
+    '''The relative change from "periods" elements before, masked for the first ones and for missing values.'''
+    a = np.ma.masked_invalid(np.ma.asarray(a, dtype=np.float64))
+    change = np.ma.masked_all(a.shape, dtype=np.float64)
+    if periods < len(a):
+        change[periods:] = _divide(a[periods:] - a[:-periods], a[:-periods])
+    # endif
+
+    return change
+# enddef
@@ -0,0 +1,114 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import *
+
+from nft_market.market import Explorer, Market
+from nft_market.nftinfo import NFTInfo
+from nft_market.retriever import FetchResult, Retriever, _Attempts
+
+
+class AsyncRetriever:
+    '''An asyncio interface of Retriever.
+
+    Pages are still scraped by the pooled browser sessions of a Retriever, on as many threads as the pool size,
+    while waiting for a session, for a market and for a retry does not block the event loop.
+    '''
+
+    def __init__(self, *args, market_limits: Dict[Union[Market, Explorer], int] = None, **kwargs):
+        '''
+        Args:
+            market_limits (Dict[Market, int]): The maximum number of concurrent fetches for each market.
+            *args, **kwargs: Passed to nft_market.Retriever.
+        '''
+        self.retriever = Retriever(*args, **kwargs)
+        self.market_limits = market_limits or {}
+
+        self._executor = ThreadPoolExecutor(max_workers=self.retriever.max_workers, thread_name_prefix='nft_market')
+        self._semaphores = {}  # type: Dict[Union[Market, Explorer], asyncio.Semaphore]
+    # enddef
+
+    async def __aenter__(self) -> 'AsyncRetriever':
+        return self
+    # enddef
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    # enddef
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._close)
+    # enddef
+
+    def _close(self):
+        self._executor.shutdown(wait=True)
+        self.retriever.close()
+    # enddef
+
+    def _semaphore(self, market: Union[Market, Explorer]) -> Optional[asyncio.Semaphore]:
+        limit = self.market_limits.get(market)
+        if limit is None:
+            return None
+        # endif
+
+        if market not in self._semaphores:
+            self._semaphores[market] = asyncio.Semaphore(limit)
+        # endif
+
+        return self._semaphores[market]
+    # enddef
+
+    async def fetch(self, market: Union[Market, Explorer], id: str) -> NFTInfo:
+        '''Fetch the current information of the specific NFT. See nft_market.Retriever.fetch.'''
+        semaphore = self._semaphore(market)
+        if semaphore is None:
+            return await self._fetch(market, id)
+        # endif
+
+        async with semaphore:
+            return await self._fetch(market, id)
+        # endwith
+    # enddef
+
+    async def _fetch(self, market: Union[Market, Explorer], id: str) -> NFTInfo:
+        # The same attempts as Retriever._fetch, while waiting on the event loop.
+        loop = asyncio.get_running_loop()
+        func = self.retriever._retriever_of(market)
+        attempts = _Attempts(self.retriever, market, id)
+        while True:
+            nft, error = await loop.run_in_executor(self._executor, func, id)
+            if nft is not None:
+                return attempts.succeeded(nft, error)
+            # endif
+
+            sec_wait = attempts.failed(error)
+            if sec_wait is None:
+                raise error
+            # endif
+            with attempts.backoff():
+                await asyncio.sleep(sec_wait)
+            # endwith
+        # endwhile
+    # enddef
+
+    async def _fetch_result(self, market: Union[Market, Explorer], id: str) -> FetchResult:
+        try:
+            return FetchResult(market, id, await self.fetch(market, id), None)
+        except Exception as e:
+            return FetchResult(market, id, None, e)
+        # endtry
+    # enddef
+
+    async def fetch_many(self, pairs: Iterable[Tuple[Union[Market, Explorer], str]]) -> AsyncIterator[FetchResult]:
+        '''Fetch the information of many NFTs concurrently, and yield nft_market.FetchResult in the order of completion.'''
+        tasks = [asyncio.ensure_future(self._fetch_result(market, id)) for market, id in pairs]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+            # endfor
+        finally:
+            for task in tasks:
+                task.cancel()
+            # endfor
+        # endtry
+    # enddef
@@ -0,0 +1,255 @@
+import collections
+import dataclasses
+import json
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import *
+
+from nft_market.market import Explorer, Market, market_name
+from nft_market.nftinfo import NFTInfo
+from nft_market.retriever import FetchBatch, Retriever
+from nft_market.retry import RetryPolicy
+
+
+def _key(market: Union[Market, Explorer], id: str) -> str:
+    return f'{market_name(market)}:{id}'
+# enddef
+
+
+class CacheBackend:
+    '''Storage of cached NFTInfo with the time they were fetched.'''
+
+    def get(self, key: str) -> Optional[Tuple[float, NFTInfo]]:
+        raise NotImplementedError
+    # enddef
+
+    def set(self, key: str, fetched_at: float, nft: NFTInfo):
+        raise NotImplementedError
+    # enddef
+
+    def delete(self, key: str):
+        raise NotImplementedError
+    # enddef
+
+    def close(self):
+        pass
+    # enddef
+
+
+class MemoryCache(CacheBackend):
+    '''An in-memory LRU cache holding up to "maxsize" entries.'''
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()  # type: collections.OrderedDict[str, Tuple[float, NFTInfo]]
+        self._lock = threading.Lock()
+    # enddef
+
+    def get(self, key: str) -> Optional[Tuple[float, NFTInfo]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            # endif
+        # endwith
+
+        return entry
+    # enddef
+
+    def set(self, key: str, fetched_at: float, nft: NFTInfo):
+        with self._lock:
+            self._entries[key] = (fetched_at, nft)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            # endwhile
+        # endwith
+    # enddef
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        # endwith
+    # enddef
+
+
+class SQLiteCache(CacheBackend):
+    '''An on-disk cache that survives process restarts.'''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS nftinfo (key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, value TEXT NOT NULL)')
+        self._conn.commit()
+        self._lock = threading.Lock()
+    # enddef
+
+    def get(self, key: str) -> Optional[Tuple[float, NFTInfo]]:
+        with self._lock:
+            row = self._conn.execute('SELECT fetched_at, value FROM nftinfo WHERE key = ?', (key,)).fetchone()
+        # endwith
+
+        if row is None:
+            return None
+        # endif
+
+        return row[0], NFTInfo(**json.loads(row[1]))
+    # enddef
+
+    def set(self, key: str, fetched_at: float, nft: NFTInfo):
+        value = json.dumps(dataclasses.asdict(nft))
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO nftinfo (key, fetched_at, value) VALUES (?, ?, ?)', (key, fetched_at, value))
+            self._conn.commit()
+        # endwith
+    # enddef
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM nftinfo WHERE key = ?', (key,))
+            self._conn.commit()
+        # endwith
+    # enddef
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        # endwith
+    # enddef
+
+
+class CachedRetriever:
+    '''A Retriever with a TTL cache in front of fetch.
+
+    Within "ttl" seconds, a cached result is returned as is. Within a further "stale_ttl" seconds, the stale result is
+    returned while it is refreshed in the background. Concurrent fetches of the same NFT share one scrape.
+    '''
+
+    def __init__(self, retriever: Retriever, backend: CacheBackend = None, ttl: float = 60, ttls: Dict[Union[Market, Explorer], float] = None,
+                 stale_ttl: float = 0):
+        '''
+        Args:
+            ttls (Dict[Market, float]): TTLs for each market, overriding "ttl".
+        '''
+        self.retriever = retriever
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.stale_ttl = stale_ttl
+
+        self._inflight = {}  # type: Dict[str, Future]
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=retriever.max_workers, thread_name_prefix='nft_market_cache')
+    # enddef
+
+    def __enter__(self) -> 'CachedRetriever':
+        return self
+    # enddef
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    # enddef
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.backend.close()
+        self.retriever.close()
+    # enddef
+
+    def reserve(self, num_sessions: int):
+        '''See nft_market.Retriever.reserve.'''
+        self.retriever.reserve(num_sessions)
+    # enddef
+
+    @property
+    def max_workers(self) -> int:
+        '''See nft_market.Retriever.max_workers.'''
+        return self.retriever.max_workers
+    # enddef
+
+    @property
+    def retry(self) -> RetryPolicy:
+        return self.retriever.retry
+    # enddef
+
+    @property
+    def verbose(self) -> bool:
+        return self.retriever.verbose
+    # enddef
+
+    def fetch(self, market: Union[Market, Explorer], id: str) -> NFTInfo:
+        '''Fetch the information of the NFT, from the cache if it is fresh enough. See nft_market.Retriever.fetch.'''
+        key = _key(market, id)
+        ttl = self.ttls.get(market, self.ttl)
+
+        entry = self.backend.get(key)
+        if entry is not None:
+            fetched_at, nft = entry
+            age = time.time() - fetched_at
+            if age < ttl:
+                return nft
+            elif age < ttl + self.stale_ttl:
+                self._refresh(market, id, key, background=True)
+                return nft
+            # endif
+        # endif
+
+        return self._refresh(market, id, key).result()
+    # enddef
+
+    def fetch_many(self, pairs: Iterable[Tuple[Union[Market, Explorer], str]], max_workers: int = None,
+                   market_limits: Dict[Union[Market, Explorer], int] = None, window: int = None) -> FetchBatch:
+        '''See nft_market.Retriever.fetch_many.'''
+        if max_workers is None:
+            max_workers = self.max_workers
+        # endif
+
+        batch = FetchBatch(self, pairs, max_workers, market_limits or {}, window=window)
+        self.reserve(max_workers)
+
+        return batch
+    # enddef
+
+    def invalidate(self, market: Union[Market, Explorer], id: str):
+        self.backend.delete(_key(market, id))
+    # enddef
+
+    def _refresh(self, market: Union[Market, Explorer], id: str, key: str, background: bool = False) -> Future:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            # endif
+
+            future = Future()
+            self._inflight[key] = future
+        # endwith
+
+        if background:
+            self._executor.submit(self._scrape, market, id, key, future)
+        else:
+            self._scrape(market, id, key, future)
+        # endif
+
+        return future
+    # enddef
+
+    def _scrape(self, market: Union[Market, Explorer], id: str, key: str, future: Future):
+        try:
+            nft = self.retriever.fetch(market, id)
+            self.backend.set(key, time.time(), nft)
+            future.set_result(nft)
+        except Exception as e:
+            if self.retriever.verbose:
+                print(f'[Warning] Failed to refresh "{key}": {e}', file=sys.stderr)
+            # endif
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            # endwith
+        # endtry
+    # enddef
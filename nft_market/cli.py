@@ -0,0 +1,195 @@
+import argparse
+import contextlib
+import csv
+import json
+import re
+import sys
+import threading
+from typing import *
+
+from nft_market.market import Explorer, Market, market_name, parse_market
+from nft_market.nftinfo import NFTINFO_FIELDS
+
+if TYPE_CHECKING:
+    from nft_market.retriever import FetchResult, Retriever
+# endif
+
+# The columns of the output.
+COLUMNS = ('market',) + NFTINFO_FIELDS + ('error',)
+
+
+def read_pairs(lines: Iterable[str]) -> Iterator[Tuple[Union[Market, Explorer], str]]:
+    '''Parse lines of "<market> <id>", separated by whitespace or a comma, e.g. "Market.OpenSea azuki" or "OpenSea,azuki".
+
+    Blank lines and lines starting with "#" are skipped.
+    '''
+    for num, line in enumerate(lines, 1):
+        line = line.strip()
+        if len(line) == 0 or line.startswith('#'):
+            continue
+        # endif
+
+        fields = re.split(r'\s*,\s*|\s+', line, maxsplit=1)
+        if len(fields) != 2 or len(fields[1]) == 0:
+            print(f'[Warning] Skipped line {num}, which is not "<market> <id>": {line!r}', file=sys.stderr)
+            continue
+        # endif
+        yield parse_market(fields[0]), fields[1]
+    # endfor
+# enddef
+
+
+@contextlib.contextmanager
+def _open(path: str, mode: str) -> Iterator[IO[str]]:
+    # "-" is the standard input or output, which is left open.
+    if path == '-':
+        yield sys.stdin if 'r' in mode else sys.stdout
+    else:
+        with open(path, mode, encoding='utf-8', newline='' if 'w' in mode else None) as f:
+            yield f
+        # endwith
+    # endif
+# enddef
+
+
+class _JSONLWriter:
+    def __init__(self, f: IO[str]):
+        self.f = f
+    # enddef
+
+    def write(self, result: 'FetchResult'):
+        self.f.write(json.dumps(_record(result), ensure_ascii=False) + '\n')
+        self.f.flush()
+    # enddef
+
+
+class _CSVWriter:
+    def __init__(self, f: IO[str]):
+        self.f = f
+        self._writer = csv.writer(f, lineterminator='\n')
+        self._writer.writerow(COLUMNS)
+    # enddef
+
+    def write(self, result: 'FetchResult'):
+        self._writer.writerow([value if value is not None else '' for value in _record(result).values()])
+        self.f.flush()
+    # enddef
+
+
+_WRITERS = {'jsonl': _JSONLWriter, 'csv': _CSVWriter}
+
+
+def _record(result: 'FetchResult') -> Dict[str, Any]:
+    record = {'market': market_name(result.market)}
+    if result.ok:
+        record.update(zip(NFTINFO_FIELDS, result.nft.to_tuple()))
+    else:
+        record.update(dict.fromkeys(NFTINFO_FIELDS), id=result.id)
+    # endif
+    record['error'] = None if result.ok else repr(result.error)
+
+    return record
+# enddef
+
+
+def _retriever(args: argparse.Namespace) -> 'Retriever':
+    from nft_market.retriever import Browser, Engine, Retriever, Wait
+    from nft_market.spec import REGISTRY
+
+    return Retriever(Browser[args.browser], sec_wait=args.sec_wait, num_retry=args.num_retry, verbose=args.verbose, headless=args.headless,
+                     pool_size=args.workers, wait=Wait[args.wait], lean=args.lean,
+                     engines={market: Engine[args.engine] for market in REGISTRY})
+# enddef
+
+
+def fetch(args: argparse.Namespace) -> int:
+    '''Fetch the pairs in the input, and write the results as they complete. Return the number of the failures.'''
+    num_failed = 0
+    with _open(args.input, 'r') as fin, _open(args.output, 'w') as fout:
+        writer = _WRITERS[args.format](fout)
+        with _retriever(args) as r:
+            # The input is read as the results come out, so that the results of a long or endless input start coming
+            # out right away, and a slow NFT holds up no more than the window.
+            window = args.window if args.window is not None else 2 * args.workers * args.tabs
+            for result in r.fetch_many(read_pairs(fin), tabs=args.tabs, window=window):
+                writer.write(result)
+                if not result.ok:
+                    num_failed += 1
+                # endif
+            # endfor
+        # endwith
+    # endwith
+
+    return num_failed
+# enddef
+
+
+def work(args: argparse.Namespace) -> int:
+    '''Process the jobs of a SQLiteJobQueue until interrupted, or until the queue is drained with --exit-when-empty.'''
+    from nft_market.jobqueue import SQLiteJobQueue, Worker
+
+    stop = threading.Event()
+    with SQLiteJobQueue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts) as queue, \
+            _retriever(args) as r:
+        worker = Worker(r, queue, batch=args.batch, poll_interval=args.poll_interval)
+        try:
+            worker.run(stop, exit_when_empty=args.exit_when_empty)
+        except KeyboardInterrupt:
+            stop.set()
+        # endtry
+    # endwith
+    print(f'{worker.owner}: {worker.num_completed} completed, {worker.num_failed} failed, {worker.num_lost} lost', file=sys.stderr)
+
+    return 0
+# enddef
+
+
+def _add_retriever_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--browser', choices=['Firefox', 'Chrome'], default='Firefox')
+    parser.add_argument('--no-headless', dest='headless', action='store_false', help='Show the browser windows.')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='The number of browser sessions fetching at the same time.')
+    parser.add_argument('--wait', choices=['Sleep', 'Ready'], default='Ready',
+                        help='Sleep --sec-wait seconds after loading a page, or wait until its fields are ready (default).')
+    parser.add_argument('--sec-wait', type=int, default=10)
+    parser.add_argument('--num-retry', type=int, default=5)
+    parser.add_argument('--engine', choices=['Selenium', 'HTTP'], default='Selenium',
+                        help='HTTP parses pages without a browser where possible. Requires nft_market[http].')
+    parser.add_argument('--lean', action='store_true', help='Do not load images, media, fonts and trackers.')
+    parser.add_argument('-v', '--verbose', action='store_true')
+# enddef
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='nft-market', description='Fetch information of NFT collections from marketplaces.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('fetch', help='Fetch a list of NFTs, and stream the results as JSON Lines or CSV.',
+                              description='Fetch the NFTs listed as "<market> <id>" per line, e.g. "Market.OpenSea azuki", '
+                                          'and write the results in the order of completion. Exits with 1 if any fetch fails.')
+    p.add_argument('input', nargs='?', default='-', help='The list of NFTs. Standard input by default.')
+    p.add_argument('-o', '--output', default='-', help='Standard output by default.')
+    p.add_argument('-f', '--format', choices=sorted(_WRITERS), default='jsonl')
+    p.add_argument('--tabs', type=int, default=1, help='The number of NFTs of a market fetched in the tabs of one browser.')
+    p.add_argument('--window', type=int,
+                   help='The maximum number of NFTs read from the input ahead of their results. Twice --workers times --tabs by default.')
+    _add_retriever_arguments(p)
+    p.set_defaults(func=lambda args: 1 if fetch(args) > 0 else 0)
+
+    p = subparsers.add_parser('worker', help='Fetch the jobs of a queue shared with other workers.',
+                              description='Fetch the jobs of a nft_market.SQLiteJobQueue and write the results back to it.')
+    p.add_argument('queue', help='The SQLite file of the queue.')
+    p.add_argument('--batch', type=int, help='The number of jobs leased at once. --workers by default.')
+    p.add_argument('--lease-seconds', type=float, default=300)
+    p.add_argument('--max-attempts', type=int, default=3)
+    p.add_argument('--poll-interval', type=float, default=1)
+    p.add_argument('--exit-when-empty', action='store_true', help='Exit when no job is pending or leased.')
+    _add_retriever_arguments(p)
+    p.set_defaults(func=work)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+# enddef
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import gzip
+import http.client
+import json
+import re
+import threading
+import urllib.parse
+import zlib
+from typing import *
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+# endtry
+
+from nft_market.instrument import Instrumentation
+from nft_market.market import Explorer, Market
+from nft_market.nftinfo import NFTInfoBuilder
+
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:107.0) Gecko/20100101 Firefox/107.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Accept-Language': 'en-US,en;q=0.5',
+    }
+_NEXT_DATA = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+# Elements whose text is put on its own line by innerText.
+_BLOCKS = frozenset(['address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+                     'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'td', 'th', 'thead',
+                     'tr', 'ul'])
+_HIDDEN = frozenset(['script', 'style', 'noscript', 'template'])
+
+
+def is_available() -> bool:
+    '''Whether the HTTP engine can be used, i.e. lxml is installed.'''
+    return lxml is not None
+# enddef
+
+
+class HTTPClient:
+    '''A thread-safe HTTP client that keeps connections alive for each host.'''
+
+    def __init__(self, timeout: float = 10, max_connections: int = 8, max_redirects: int = 5):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_redirects = max_redirects
+
+        self._idle = {}  # type: Dict[Tuple[str, str], List[http.client.HTTPConnection]]
+        self._lock = threading.Lock()
+    # enddef
+
+    def _connect(self, scheme: str, netloc: str, reuse: bool = True) -> Tuple[http.client.HTTPConnection, bool]:
+        # Return a connection, and whether it is an idle one reused.
+        if reuse:
+            with self._lock:
+                idle = self._idle.get((scheme, netloc))
+                if idle:
+                    return idle.pop(), True
+                # endif
+            # endwith
+        # endif
+
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout), False
+        else:
+            return http.client.HTTPConnection(netloc, timeout=self.timeout), False
+        # endif
+    # enddef
+
+    def _release(self, scheme: str, netloc: str, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_connections:
+                idle.append(conn)
+                return
+            # endif
+        # endwith
+
+        conn.close()
+    # enddef
+
+    def _request(self, scheme: str, netloc: str, path: str, reuse: bool = True) -> Tuple[http.client.HTTPResponse, bytes]:
+        conn, reused = self._connect(scheme, netloc, reuse)
+        try:
+            conn.request('GET', path, headers=_HEADERS)
+            res = conn.getresponse()
+            body = res.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            # endif
+
+            # The server has closed the idle connection, which is found out only on its reuse. Retry on a new one.
+            return self._request(scheme, netloc, path, reuse=False)
+        except Exception:
+            conn.close()
+            raise
+        # endtry
+
+        if res.will_close:
+            conn.close()
+        else:
+            self._release(scheme, netloc, conn)
+        # endif
+
+        return res, body
+    # enddef
+
+    def get(self, url: str) -> str:
+        for _ in range(self.max_redirects + 1):
+            u = urllib.parse.urlsplit(url)
+            path = urllib.parse.urlunsplit(('', '', u.path or '/', u.query, ''))
+
+            res, body = self._request(u.scheme, u.netloc, path)
+            if res.status in (301, 302, 303, 307, 308):
+                url = urllib.parse.urljoin(url, res.getheader('Location'))
+                continue
+            elif res.status != 200:
+                raise ValueError(f'HTTP {res.status}: {url}')
+            # endif
+
+            encoding = res.getheader('Content-Encoding', '')
+            if encoding == 'gzip':
+                body = gzip.decompress(body)
+            elif encoding == 'deflate':
+                body = zlib.decompress(body)
+            # endif
+
+            return body.decode(res.headers.get_content_charset() or 'utf-8', errors='replace')
+        # endfor
+
+        raise ValueError(f'Too many redirects: {url}')
+    # enddef
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        # endwith
+
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+            # endfor
+        # endfor
+    # enddef
+
+
+def _inner_text(element) -> str:
+    # An approximation of HTMLElement.innerText, which is what the browser engine returns.
+    parts = []
+
+    def walk(e):
+        if not isinstance(e.tag, str) or e.tag in _HIDDEN:
+            return
+        # endif
+
+        block = e.tag in _BLOCKS
+        if block:
+            parts.append('\n')
+        # endif
+        if e.text:
+            parts.append(e.text)
+        # endif
+        for child in e:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+            # endif
+        # endfor
+        if block:
+            parts.append('\n')
+        # endif
+    # enddef
+
+    walk(element)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if len(line) > 0)
+# enddef
+
+
+def _json_path(data: Any, path: str) -> Optional[str]:
+    for key in path.split('.'):
+        if isinstance(data, list) and key.isdigit() and int(key) < len(data):
+            data = data[int(key)]
+        elif isinstance(data, dict) and key in data:
+            data = data[key]
+        else:
+            return None
+        # endif
+    # endfor
+
+    return None if data is None else str(data)
+# enddef
+
+
+class HTTPBuilder(NFTInfoBuilder):
+    '''NFTInfoBuilder over a server-rendered HTML document instead of a browser.
+
+    XPaths are evaluated by lxml. Selectors of the form "json:<dotted.path>" are looked up in the
+    embedded __NEXT_DATA__ JSON of Next.js pages.
+    '''
+
+    __slots__ = ('html', '_doc', '_next_data')
+
+    def __init__(self, html: str, id: str, instrumentation: Instrumentation = None, market: Union[Market, Explorer] = None):
+        super().__init__(None, id, instrumentation=instrumentation, market=market)
+        self.html = html
+        self._doc = None
+        self._next_data = ...
+    # enddef
+
+    def _find_texts(self, xpaths: List[str]) -> Dict[str, Optional[str]]:
+        texts = {}
+        for xpath in xpaths:
+            if xpath.startswith('json:'):
+                texts[xpath] = _json_path(self._load_next_data(), xpath[len('json:'):])
+                continue
+            # endif
+
+            if self._doc is None:
+                self._doc = lxml.html.document_fromstring(self.html)
+            # endif
+            try:
+                nodes = self._doc.xpath(xpath)
+            except Exception:
+                nodes = []
+            # endtry
+
+            if len(nodes) == 0:
+                texts[xpath] = None
+            elif isinstance(nodes[0], str):
+                texts[xpath] = nodes[0].strip()
+            else:
+                texts[xpath] = _inner_text(nodes[0])
+            # endif
+        # endfor
+
+        return texts
+    # enddef
+
+    def _load_next_data(self) -> Any:
+        if self._next_data is ...:
+            m = _NEXT_DATA.search(self.html)
+            self._next_data = json.loads(m.group(1)) if m is not None else None
+        # endif
+
+        return self._next_data
+    # enddef
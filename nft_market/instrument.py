@@ -0,0 +1,295 @@
+import bisect
+import collections
+import threading
+import time
+from enum import Enum, auto
+from typing import *
+
+from nft_market.market import Explorer, Market, market_name
+
+if TYPE_CHECKING:
+    import http.server
+# endif
+
+
+class Phase(Enum):
+    # The whole of a fetch of Retriever or AsyncRetriever, including retries.
+    Fetch = auto()
+    # Checking out a browser session from the pool, including Launch.
+    Acquire = auto()
+    # Starting a browser.
+    Launch = auto()
+    # Loading the pages of a market, i.e. driver.get and opening tabs.
+    Load = auto()
+    # Sleeping sec_wait seconds with Wait.Sleep, or waiting for the fields to be ready with Wait.Ready.
+    Wait = auto()
+    # Getting the texts of the fields out of a page.
+    Extract = auto()
+    # Converting the texts into values.
+    Parse = auto()
+    # Downloading a page with Engine.HTTP.
+    HTTP = auto()
+    # Sleeping between retries.
+    Backoff = auto()
+
+
+class Hook:
+    '''Callbacks of Instrumentation. Override the ones of interest.
+
+    They are called from the threads doing the fetches, and market is None for events that belong to no market, e.g.
+    Phase.Launch.
+    '''
+
+    def on_phase(self, market: Optional[Union[Market, Explorer]], phase: Phase, seconds: float):
+        pass
+    # enddef
+
+    def on_retry(self, market: Union[Market, Explorer], id: str, num_retry: int, error: BaseException):
+        pass
+    # enddef
+
+    def on_error(self, market: Union[Market, Explorer], field: Optional[str], error: BaseException):
+        pass
+    # enddef
+
+    def on_fetch(self, market: Union[Market, Explorer], id: str, seconds: float, error: Optional[BaseException]):
+        pass
+    # enddef
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+    # enddef
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+    # enddef
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('instrumentation', 'market', 'phase', 'started_at')
+
+    def __init__(self, instrumentation: 'Instrumentation', market: Optional[Union[Market, Explorer]], phase: Phase):
+        self.instrumentation = instrumentation
+        self.market = market
+        self.phase = phase
+    # enddef
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+    # enddef
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.instrumentation.record_phase(self.market, self.phase, time.perf_counter() - self.started_at)
+    # enddef
+
+
+class Instrumentation:
+    '''Dispatches the timings and errors of fetches to hooks.
+
+    Without hooks, it is disabled and timers cost a method call that returns a shared no-op.
+    '''
+
+    def __init__(self, hooks: Iterable[Hook] = ()):
+        self.hooks = list(hooks)
+    # enddef
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.hooks) > 0
+    # enddef
+
+    def add_hook(self, hook: Hook):
+        self.hooks.append(hook)
+    # enddef
+
+    def timer(self, market: Optional[Union[Market, Explorer]], phase: Phase) -> ContextManager:
+        '''A context manager recording how long its block takes as the phase.'''
+        if len(self.hooks) == 0:
+            return _NULL_TIMER
+        # endif
+
+        return _Timer(self, market, phase)
+    # enddef
+
+    def record_phase(self, market: Optional[Union[Market, Explorer]], phase: Phase, seconds: float):
+        for hook in self.hooks:
+            hook.on_phase(market, phase, seconds)
+        # endfor
+    # enddef
+
+    def record_retry(self, market: Union[Market, Explorer], id: str, num_retry: int, error: BaseException):
+        for hook in self.hooks:
+            hook.on_retry(market, id, num_retry, error)
+        # endfor
+    # enddef
+
+    def record_error(self, market: Union[Market, Explorer], field: Optional[str], error: BaseException):
+        for hook in self.hooks:
+            hook.on_error(market, field, error)
+        # endfor
+    # enddef
+
+    def record_fetch(self, market: Union[Market, Explorer], id: str, seconds: float, error: Optional[BaseException]):
+        for hook in self.hooks:
+            hook.on_fetch(market, id, seconds, error)
+        # endfor
+    # enddef
+
+
+# Shared by everything constructed without instrumentation.
+NULL_INSTRUMENTATION = Instrumentation()
+
+# Upper bounds of the histogram buckets in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, num_buckets: int):
+        self.counts = [0] * num_buckets
+        self.sum = 0.0
+        self.count = 0
+    # enddef
+
+
+def _label(market: Optional[Union[Market, Explorer]]) -> str:
+    return '' if market is None else market_name(market)
+# enddef
+
+
+def _escape(s: str) -> str:
+    return s.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+# enddef
+
+
+class MetricsHook(Hook):
+    '''Aggregates the events into histograms and counters, and exports them in the Prometheus text format.'''
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, prefix: str = 'nft_market'):
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+
+        self._lock = threading.Lock()
+        # (market, phase) -> histogram
+        self._phases = {}  # type: Dict[Tuple[str, str], _Histogram]
+        # (market, outcome) -> count
+        self._fetches = collections.Counter()  # type: Counter[Tuple[str, str]]
+        # market -> count
+        self._retries = collections.Counter()  # type: Counter[str]
+        # (market, field, error type) -> count
+        self._errors = collections.Counter()  # type: Counter[Tuple[str, str, str]]
+    # enddef
+
+    def on_phase(self, market: Optional[Union[Market, Explorer]], phase: Phase, seconds: float):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            key = (_label(market), phase.name)
+            histogram = self._phases.get(key)
+            if histogram is None:
+                histogram = self._phases[key] = _Histogram(len(self.buckets) + 1)
+            # endif
+            histogram.counts[i] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+        # endwith
+    # enddef
+
+    def on_retry(self, market: Union[Market, Explorer], id: str, num_retry: int, error: BaseException):
+        with self._lock:
+            self._retries[_label(market)] += 1
+        # endwith
+    # enddef
+
+    def on_error(self, market: Union[Market, Explorer], field: Optional[str], error: BaseException):
+        with self._lock:
+            self._errors[(_label(market), field or '', type(error).__name__)] += 1
+        # endwith
+    # enddef
+
+    def on_fetch(self, market: Union[Market, Explorer], id: str, seconds: float, error: Optional[BaseException]):
+        with self._lock:
+            self._fetches[(_label(market), 'success' if error is None else 'failure')] += 1
+        # endwith
+    # enddef
+
+    def phase_stats(self) -> Dict[Tuple[str, str], Tuple[int, float]]:
+        '''(market, phase) -> (count, total seconds)'''
+        with self._lock:
+            return {key: (h.count, h.sum) for key, h in self._phases.items()}
+        # endwith
+    # enddef
+
+    def to_prometheus(self) -> str:
+        p = self.prefix
+        lines = [
+            f'# HELP {p}_phase_seconds Time spent in each phase of fetches.',
+            f'# TYPE {p}_phase_seconds histogram',
+            ]
+        with self._lock:
+            for (market, phase), h in sorted(self._phases.items()):
+                labels = f'market="{_escape(market)}",phase="{phase}"'
+                cumulative = 0
+                for le, count in zip(self.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{p}_phase_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                # endfor
+                lines.append(f'{p}_phase_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f'{p}_phase_seconds_sum{{{labels}}} {h.sum}')
+                lines.append(f'{p}_phase_seconds_count{{{labels}}} {h.count}')
+            # endfor
+
+            lines += [f'# HELP {p}_fetches_total Fetches by outcome, after retries.', f'# TYPE {p}_fetches_total counter']
+            for (market, outcome), n in sorted(self._fetches.items()):
+                lines.append(f'{p}_fetches_total{{market="{_escape(market)}",outcome="{outcome}"}} {n}')
+            # endfor
+
+            lines += [f'# HELP {p}_retries_total Retries of fetches.', f'# TYPE {p}_retries_total counter']
+            for market, n in sorted(self._retries.items()):
+                lines.append(f'{p}_retries_total{{market="{_escape(market)}"}} {n}')
+            # endfor
+
+            lines += [f'# HELP {p}_errors_total Errors by field and type.', f'# TYPE {p}_errors_total counter']
+            for (market, field, error), n in sorted(self._errors.items()):
+                lines.append(f'{p}_errors_total{{market="{_escape(market)}",field="{field}",type="{error}"}} {n}')
+            # endfor
+        # endwith
+
+        return '\n'.join(lines) + '\n'
+    # enddef
+
+    def serve(self, port: int, host: str = '') -> 'http.server.HTTPServer':
+        '''Serve the metrics at http://<host>:<port>/metrics in a daemon thread. Call shutdown() of the server to stop.'''
+        import http.server
+
+        hook = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                # endif
+
+                body = hook.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            # enddef
+
+            def log_message(self, format, *args):
+                pass
+            # enddef
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='nft_market_metrics', daemon=True).start()
+        return server
+    # enddef
@@ -0,0 +1,373 @@
+import dataclasses
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import *
+
+from nft_market.market import Explorer, Market, market_name, parse_market
+from nft_market.nftinfo import NFTINFO_FIELDS, NFTInfo
+
+
+@dataclasses.dataclass
+class Job:
+    job_id: int
+    market: Union[Market, Explorer]
+    id: str
+    # Including the current one.
+    attempts: int
+
+
+@dataclasses.dataclass
+class DeadLetter:
+    job_id: int
+    market: Union[Market, Explorer]
+    id: str
+    attempts: int
+    error: str
+
+
+class JobQueue:
+    '''A queue of (market, id) to fetch, shared by a coordinator and workers.
+
+    A leased job is invisible to the other workers until the lease expires, so a job of a crashed worker is fetched
+    again. A failed job is retried until "max_attempts", and then dead-lettered.
+    '''
+    # The default duration of leases in seconds.
+    lease_seconds = 300
+
+    def put(self, pairs: Iterable[Tuple[Union[Market, Explorer], str]]) -> List[int]:
+        raise NotImplementedError
+    # enddef
+
+    def lease(self, owner: str, n: int = 1, lease_seconds: float = None) -> List[Job]:
+        raise NotImplementedError
+    # enddef
+
+    def extend(self, job: Job, owner: str, lease_seconds: float = None) -> bool:
+        '''Extend the lease of a job still held by the owner.'''
+        raise NotImplementedError
+    # enddef
+
+    def complete(self, job: Job, owner: str, nft: NFTInfo) -> bool:
+        '''Store the result of a job. False if the lease has been lost, e.g. expired and taken by another worker.'''
+        raise NotImplementedError
+    # enddef
+
+    def fail(self, job: Job, owner: str, error: BaseException, retry_in: float = 0, retry: bool = True) -> bool:
+        '''Give the job back to be retried after "retry_in" seconds, or dead-letter it if it should not be retried.'''
+        raise NotImplementedError
+    # enddef
+
+    def results(self, after: int = 0) -> Iterator[Tuple[int, Union[Market, Explorer], NFTInfo]]:
+        '''(job_id, market, NFTInfo) of the completed jobs with job_id > "after".'''
+        raise NotImplementedError
+    # enddef
+
+    def dead_letters(self) -> List[DeadLetter]:
+        raise NotImplementedError
+    # enddef
+
+    def requeue_dead(self) -> int:
+        '''Put the dead-lettered jobs back with their attempts reset.'''
+        raise NotImplementedError
+    # enddef
+
+    def stats(self) -> Dict[str, int]:
+        '''The number of jobs in each state: pending, leased, done and dead.'''
+        raise NotImplementedError
+    # enddef
+
+    def close(self):
+        pass
+    # enddef
+
+
+class SQLiteJobQueue(JobQueue):
+    '''A JobQueue in a SQLite file, shared by the processes of a host.
+
+    SQLite locking is unreliable on network file systems such as NFS. Implement JobQueue on a server for several hosts.
+    '''
+
+    def __init__(self, path: str, lease_seconds: float = 300, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        # Transactions are begun explicitly, so that a lease is atomic across processes.
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                market TEXT NOT NULL,
+                id TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL)''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_due ON jobs (state, available_at)')
+        # endwith
+    # enddef
+
+    def __enter__(self) -> 'SQLiteJobQueue':
+        return self
+    # enddef
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    # enddef
+
+    def _transaction(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                value = func(self._conn)
+            except:
+                self._conn.execute('ROLLBACK')
+                raise
+            # endtry
+            self._conn.execute('COMMIT')
+        # endwith
+
+        return value
+    # enddef
+
+    def put(self, pairs: Iterable[Tuple[Union[Market, Explorer], str]]) -> List[int]:
+        now = time.time()
+        rows = [(market_name(market), id, now, now) for market, id in pairs]
+
+        def insert(conn: sqlite3.Connection) -> List[int]:
+            return [conn.execute('INSERT INTO jobs (market, id, available_at, updated_at) VALUES (?, ?, ?, ?)', row).lastrowid for row in rows]
+        # enddef
+
+        return self._transaction(insert)
+    # enddef
+
+    def lease(self, owner: str, n: int = 1, lease_seconds: float = None) -> List[Job]:
+        now = time.time()
+        expires = now + (lease_seconds if lease_seconds is not None else self.lease_seconds)
+
+        def take(conn: sqlite3.Connection) -> List[Job]:
+            # A job whose worker keeps crashing, e.g. on a page that kills the browser, ends up here rather than leased
+            # forever.
+            conn.execute('''UPDATE jobs SET state = 'dead', error = 'lease expired', owner = NULL, lease_expires = NULL, updated_at = ?
+                            WHERE state = 'leased' AND lease_expires <= ? AND attempts >= ?''', (now, now, self.max_attempts))
+            rows = conn.execute('''SELECT job_id, market, id, attempts FROM jobs
+                                   WHERE (state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires <= ?)
+                                   ORDER BY available_at, job_id LIMIT ?''', (now, now, n)).fetchall()
+            conn.executemany('''UPDATE jobs SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                                WHERE job_id = ?''', [(owner, expires, now, row[0]) for row in rows])
+            return [Job(job_id, parse_market(market), id, attempts + 1) for job_id, market, id, attempts in rows]
+        # enddef
+
+        return self._transaction(take)
+    # enddef
+
+    def extend(self, job: Job, owner: str, lease_seconds: float = None) -> bool:
+        expires = time.time() + (lease_seconds if lease_seconds is not None else self.lease_seconds)
+        return self._transaction(lambda conn: conn.execute(
+            '''UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND state = 'leased' AND owner = ?''',
+            (expires, job.job_id, owner)).rowcount > 0)
+    # enddef
+
+    def complete(self, job: Job, owner: str, nft: NFTInfo) -> bool:
+        result = json.dumps(dict(zip(NFTINFO_FIELDS, nft.to_tuple())), ensure_ascii=False)
+        return self._transaction(lambda conn: conn.execute(
+            '''UPDATE jobs SET state = 'done', result = ?, error = NULL, owner = NULL, lease_expires = NULL, updated_at = ?
+               WHERE job_id = ? AND state = 'leased' AND owner = ?''',
+            (result, time.time(), job.job_id, owner)).rowcount > 0)
+    # enddef
+
+    def fail(self, job: Job, owner: str, error: BaseException, retry_in: float = 0, retry: bool = True) -> bool:
+        now = time.time()
+        dead = not retry or job.attempts >= self.max_attempts
+        return self._transaction(lambda conn: conn.execute(
+            '''UPDATE jobs SET state = ?, available_at = ?, error = ?, owner = NULL, lease_expires = NULL, updated_at = ?
+               WHERE job_id = ? AND state = 'leased' AND owner = ?''',
+            ('dead' if dead else 'pending', now + retry_in, repr(error), now, job.job_id, owner)).rowcount > 0)
+    # enddef
+
+    def results(self, after: int = 0) -> Iterator[Tuple[int, Union[Market, Explorer], NFTInfo]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT job_id, market, result FROM jobs WHERE state = 'done' AND job_id > ? ORDER BY job_id",
+                                      (after,)).fetchall()
+        # endwith
+
+        for job_id, market, result in rows:
+            yield job_id, parse_market(market), NFTInfo(**json.loads(result))
+        # endfor
+    # enddef
+
+    def dead_letters(self) -> List[DeadLetter]:
+        with self._lock:
+            rows = self._conn.execute("SELECT job_id, market, id, attempts, error FROM jobs WHERE state = 'dead' ORDER BY job_id").fetchall()
+        # endwith
+
+        return [DeadLetter(job_id, parse_market(market), id, attempts, error) for job_id, market, id, attempts, error in rows]
+    # enddef
+
+    def requeue_dead(self) -> int:
+        now = time.time()
+        return self._transaction(lambda conn: conn.execute(
+            '''UPDATE jobs SET state = 'pending', attempts = 0, available_at = ?, updated_at = ? WHERE state = 'dead' ''',
+            (now, now)).rowcount)
+    # enddef
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall()
+        # endwith
+
+        stats = {'pending': 0, 'leased': 0, 'done': 0, 'dead': 0}
+        stats.update(rows)
+        return stats
+    # enddef
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        # endwith
+    # enddef
+
+
+class Worker:
+    '''Pulls jobs from a JobQueue, fetches them with a Retriever and writes the results back.
+
+    Run as many workers as needed, in processes sharing the queue. Failed jobs are retried by
+    the queue with the backoff of the RetryPolicy of the retriever, and errors it gives up on are dead-lettered at once.
+    '''
+
+    def __init__(self, retriever: Any, queue: JobQueue, owner: str = None, batch: int = None, poll_interval: float = 1,
+                 heartbeat: float = None):
+        '''
+        Args:
+            retriever: Retriever, CachedRetriever or anything with fetch_many. Its own retries should be few, since the
+                queue retries as well.
+            owner (str): The name of the worker in leases. Unique by host, process and instance by default.
+            batch (int): The number of jobs leased at once. The max_workers of the retriever by default.
+            heartbeat (float): How often the leases of the jobs being fetched are extended, in seconds. A third of the
+                lease_seconds of the queue by default, so that a batch running longer than a lease keeps its jobs.
+        '''
+        self.retriever = retriever
+        self.queue = queue
+        self.owner = owner if owner is not None else f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.batch = batch if batch is not None else retriever.max_workers
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat if heartbeat is not None else queue.lease_seconds / 3
+
+        self.num_completed = 0
+        self.num_failed = 0
+        # Results dropped because the lease had been lost, e.g. to another worker.
+        self.num_lost = 0
+    # enddef
+
+    def _extend_leases(self, pending: Dict[int, Job], lock: threading.Lock, done: threading.Event):
+        while not done.wait(self.heartbeat):
+            with lock:
+                jobs = list(pending.values())
+            # endwith
+            for job in jobs:
+                self.queue.extend(job, self.owner)
+            # endfor
+        # endwhile
+    # enddef
+
+    def _lost(self, job: Job):
+        self.num_lost += 1
+        print(f'[Warning] Job {job.job_id} "{market_name(job.market)}:{job.id}" lost its lease, and the result is dropped',
+              file=sys.stderr)
+    # enddef
+
+    def run_once(self) -> int:
+        '''Lease a batch of jobs and process them. Return the number of the jobs.'''
+        jobs = self.queue.lease(self.owner, self.batch)
+        if len(jobs) == 0:
+            return 0
+        # endif
+
+        # The same pair may be queued more than once.
+        by_pair = {}  # type: Dict[Tuple[Union[Market, Explorer], str], List[Job]]
+        for job in jobs:
+            by_pair.setdefault((job.market, job.id), []).append(job)
+        # endfor
+        # Extend the leases of the jobs not finished yet in the background, since retries can outlast a lease.
+        pending = {job.job_id: job for job in jobs}
+        lock = threading.Lock()
+        done = threading.Event()
+        thread = threading.Thread(target=self._extend_leases, args=(pending, lock, done), name='nft_market_heartbeat', daemon=True)
+        thread.start()
+
+        retry = getattr(self.retriever, 'retry', None)
+        try:
+            for result in self.retriever.fetch_many([(job.market, job.id) for job in jobs]):
+                job = by_pair[(result.market, result.id)].pop()
+                with lock:
+                    del pending[job.job_id]
+                # endwith
+
+                if result.ok:
+                    if self.queue.complete(job, self.owner, result.nft):
+                        self.num_completed += 1
+                    else:
+                        self._lost(job)
+                    # endif
+                else:
+                    should_retry = retry.should_retry(result.error) if retry is not None else True
+                    retry_in = retry.backoff(job.attempts - 1) if retry is not None else 0
+                    if self.queue.fail(job, self.owner, result.error, retry_in=retry_in, retry=should_retry):
+                        self.num_failed += 1
+                    else:
+                        self._lost(job)
+                    # endif
+                    if getattr(self.retriever, 'verbose', False):
+                        print(f'[Warning] Job {job.job_id} "{market_name(job.market)}:{job.id}" failed [{job.attempts}]: {result.error!r}',
+                              file=sys.stderr)
+                    # endif
+                # endif
+            # endfor
+        finally:
+            done.set()
+            thread.join()
+        # endtry
+
+        return len(jobs)
+    # enddef
+
+    def run(self, stop: threading.Event = None, max_jobs: int = None, exit_when_empty: bool = False) -> int:
+        '''Process jobs until "stop" is set, "max_jobs" are processed, or the queue is drained with "exit_when_empty".
+
+        Returns:
+            (int): The number of the jobs processed.
+        '''
+        num_jobs = 0
+        while (stop is None or not stop.is_set()) and (max_jobs is None or num_jobs < max_jobs):
+            n = self.run_once()
+            num_jobs += n
+            if n == 0:
+                if exit_when_empty:
+                    stats = self.queue.stats()
+                    if stats['pending'] == 0 and stats['leased'] == 0:
+                        break
+                    # endif
+                # endif
+
+                if stop is not None:
+                    stop.wait(self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+                # endif
+            # endif
+        # endwhile
+
+        return num_jobs
+    # enddef
@@ -1,4 +1,5 @@
 from enum import Enum, auto
+from typing import *
 
 
 class Market(Enum):
@@ -26,3 +27,28 @@ class Market(Enum):
 class Explorer(Enum):
     NFTgeek = auto()
     ICScan = auto()
+
+
+def market_name(market: Union[Market, Explorer, str]) -> str:
+    '''A string that identifies a market, e.g. "Market.OpenSea". Markets registered by strings are returned as is.'''
+    if isinstance(market, Enum):
+        return f'{type(market).__name__}.{market.name}'
+    else:
+        return str(market)
+    # endif
+# enddef
+
+
+def parse_market(name: str) -> Union[Market, Explorer, str]:
+    '''The inverse of market_name. A bare name such as "OpenSea" is also looked up in Market and Explorer.'''
+    kind, _, member = name.partition('.')
+    for enum in (Market, Explorer):
+        if kind == enum.__name__ and member in enum.__members__:
+            return enum[member]
+        elif member == '' and name in enum.__members__:
+            return enum[name]
+        # endif
+    # endfor
+
+    return name
+# enddef
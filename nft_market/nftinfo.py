@@ -1,14 +1,165 @@
 import dataclasses
+import re
 import sys
 import warnings
 from typing import *
 
-from selenium.webdriver.common.by import By
-from selenium.webdriver.remote.webdriver import WebDriver
+from nft_market.instrument import Instrumentation, NULL_INSTRUMENTATION, Phase
+from nft_market.market import Explorer, Market
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+# endif
+
+
+# Resolve all the XPaths in a single WebDriver round trip.
+# Selectors of the form "json:<dotted.path>" are looked up in the __NEXT_DATA__ JSON of Next.js pages.
+_FIND_TEXTS_SCRIPT = '''
+var xpaths = arguments[0];
+var texts = {};
+var nextData;
+for (var i = 0; i < xpaths.length; i++) {
+    var text = null;
+    if (xpaths[i].indexOf('json:') === 0) {
+        if (nextData === undefined) {
+            var script = document.getElementById('__NEXT_DATA__');
+            try {
+                nextData = script === null ? null : JSON.parse(script.textContent);
+            } catch (e) {
+                nextData = null;
+            }
+        }
+        var value = nextData;
+        var keys = xpaths[i].substring(5).split('.');
+        for (var j = 0; j < keys.length && value !== null && value !== undefined; j++) {
+            value = typeof value === 'object' && keys[j] in value ? value[keys[j]] : null;
+        }
+        text = value === null || value === undefined ? null : String(value);
+    } else {
+        var node = null;
+        try {
+            node = document.evaluate(xpaths[i], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        } catch (e) {
+        }
+        if (node !== null) {
+            text = node.innerText !== undefined ? node.innerText : node.textContent;
+            text = text === null ? null : text.trim();
+        }
+    }
+    texts[xpaths[i]] = text;
+}
+return texts;
+'''
+
+_NUMBER = re.compile(r'''
+    ^\s*
+    [<>\u2264\u2265~]?\s*                            # bound, e.g. "<0.01"
+    (?:W?ETH|SOL|ICP|BNB|\u25ce|\u039e|\$)?\s*       # currency mark before the number, e.g. "ETH 0.5"
+    (?P<number>[-+]?(?:(?:\d{1,3}(?:[,\u00a0\u2009\u202f\ ]\d{3})+|\d+)(?:\.\d*)?|\.\d+))
+                                                     # thousands separators between groups of 3 digits only, so that
+                                                     # two numbers, e.g. "15\n20", are not read as one
+    \s*(?P<suffix>[kKmMB])?
+    \s*(?:W?ETH|SOL|ICP|BNB|\u25ce|\u039e|\$)?       # currency mark after the number
+    \s*$
+    ''', re.VERBOSE)
+_SUFFIXES = {'k': 1e3, 'K': 1e3, 'm': 1e6, 'M': 1e6, 'B': 1e9}
+_SEPARATORS = str.maketrans('', '', ', \t\n\u00a0\u2009\u202f')
+
+
+def _parse_number(s: str) -> float:
+    m = _NUMBER.match(s)
+    if m is None:
+        raise ValueError(f'Not a number: {s!r}')
+    # endif
+
+    f = float(m.group('number').translate(_SEPARATORS))
+    suffix = m.group('suffix')
+    if suffix is not None:
+        f *= _SUFFIXES[suffix]
+    # endif
+
+    return f
+# enddef
+
+
+class FieldError(ValueError):
+    def __init__(self, id: str, field: str, cause: Any):
+        super().__init__(f'ID: {id}, Cause: {field}, {cause}')
+        self.id = id
+        self.field = field
+    # enddef
+
+
+class MissingFieldError(FieldError):
+    '''The element of a field is missing or empty, e.g. because the page has not been rendered yet.'''
+    pass
+
+
+class ParseError(FieldError):
+    '''The text of a field cannot be parsed.'''
+    pass
+
+
+# The fields of NFTInfo in order, e.g. of to_tuple().
+NFTINFO_FIELDS = ('id', 'name', 'num_supply', 'num_listing', 'num_owners', 'floor', 'volume', 'days_from_last_trade')
+
+
+class _NFTInfoBase:
+    # Methods shared by NFTInfo and FrozenNFTInfo. Both are slotted to hold millions of snapshots in memory.
+    __slots__ = ()
+
+    def __post_init__(self):
+        # One cheap check instead of an assert per field.
+        if self.id is None or self.name is None or self.floor is None or self.volume is None:
+            field = next(field for field in ('id', 'name', 'floor', 'volume') if getattr(self, field) is None)
+            raise MissingFieldError(self.id, field, 'None is not allowed.')
+        # endif
+    # enddef
+
+    @property
+    def num_items_all(self):
+        warnings.warn('The property "num_items_all" has been deprecated. It will be no longer available in future updates. Please use "num_supply" instead.')
+
+        return self.num_supply
+    # enddef
+
+    def to_tuple(self) -> Tuple:
+        '''The fields in the order of NFTINFO_FIELDS. Faster than dataclasses.astuple, which deep-copies.'''
+        return (self.id, self.name, self.num_supply, self.num_listing, self.num_owners, self.floor, self.volume, self.days_from_last_trade)
+    # enddef
+
+    @classmethod
+    def from_tuple(cls, t: Sequence) -> '_NFTInfoBase':
+        return cls(*t)
+    # enddef
+
+    @classmethod
+    def from_tuples(cls, rows: Iterable[Sequence]) -> List['_NFTInfoBase']:
+        '''Build many at once, e.g. from rows of a database.'''
+        return [cls(*row) for row in rows]
+    # enddef
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, Sequence]) -> List['_NFTInfoBase']:
+        '''Build many at once from columns keyed by the field names, e.g. of a data frame.'''
+        return cls.from_tuples(zip(*(columns[field] for field in NFTINFO_FIELDS)))
+    # enddef
+
+    def __getstate__(self) -> Tuple:
+        return self.to_tuple()
+    # enddef
+
+    def __setstate__(self, state: Tuple):
+        for field, value in zip(NFTINFO_FIELDS, state):
+            object.__setattr__(self, field, value)
+        # endfor
+    # enddef
 
 
 @dataclasses.dataclass
-class NFTInfo:
+class NFTInfo(_NFTInfoBase):
+    __slots__ = NFTINFO_FIELDS
+
     id: str
     name: str
     num_supply: Optional[int]
@@ -18,26 +169,51 @@ class NFTInfo:
     volume: float
     days_from_last_trade: Optional[int]
 
-    def __post_init__(self):
-        assert self.id is not None, self.id
-        # assert self.name is not None and len(self.name) > 0, self.name
-        assert self.name is not None, self.name
-        assert self.floor is not None, self.floor
-        assert self.volume is not None, self.volume
+    def freeze(self) -> 'FrozenNFTInfo':
+        return FrozenNFTInfo(*self.to_tuple())
     # enddef
 
-    @property
-    def num_items_all(self):
-        warnings.warn('The property "num_items_all" has been deprecated. It will be no longer available in future updates. Please use "num_supply" instead.')
 
-        return self.num_supply
+@dataclasses.dataclass(frozen=True)
+class FrozenNFTInfo(_NFTInfoBase):
+    '''An immutable and hashable NFTInfo, e.g. for keys of dicts and sets.'''
+    __slots__ = NFTINFO_FIELDS
+
+    id: str
+    name: str
+    num_supply: Optional[int]
+    num_listing: Optional[int]
+    num_owners: Optional[int]
+    floor: float
+    volume: float
+    days_from_last_trade: Optional[int]
+
+    def thaw(self) -> NFTInfo:
+        return NFTInfo(*self.to_tuple())
     # enddef
 
 
 class NFTInfoBuilder:
-    def __init__(self, driver: WebDriver, id: str):
+    __slots__ = ('driver', 'id', 'timeout', 'instrumentation', 'market', '_selectors', '_texts', '_name', '_num_supply', '_num_listing', '_num_owners', '_floor', '_volume',
+                 '_days_from_last_trade')
+
+    def __init__(self, driver: 'WebDriver', id: str, timeout: float = None, instrumentation: Instrumentation = None,
+                 market: Union[Market, Explorer] = None):
+        '''
+        Args:
+            timeout (float): If given, build() waits up to this many seconds until all the declared XPaths hold non-empty text.
+            instrumentation (nft_market.Instrumentation): Where the timings and errors of the market are recorded.
+        '''
         self.driver = driver
         self.id = id
+        self.timeout = timeout
+        self.instrumentation = instrumentation if instrumentation is not None else NULL_INSTRUMENTATION
+        self.market = market
+
+        # field -> (xpath, post)
+        self._selectors = {}  # type: Dict[str, Tuple[str, Optional[Callable[[str], str]]]]
+        # xpath -> text, or None if missing
+        self._texts = {}  # type: Dict[str, Optional[str]]
 
         # properties
         self._name = ...
@@ -50,14 +226,10 @@ class NFTInfoBuilder:
     # enddef
 
     def _text2float(self, s: str) -> float:
-        s_rep = s.replace(',', '').replace('<', '').replace('>', '').replace('$', '') \
-            .replace('k', '*1000').replace('K', '*1000') \
-            .replace('m', '*1000000').replace('M', '*1000000') \
-            .replace('B', '*1000000000')
         try:
-            f = float(eval(s_rep))
+            f = _parse_number(s)
         except Exception as e:
-            print(f"ID: {self.id}, orig: '{s}', replaced: {s_rep}", file=sys.stderr)
+            print(f"ID: {self.id}, orig: '{s}'", file=sys.stderr)
             raise e
         # endtry
 
@@ -68,146 +240,143 @@ class NFTInfoBuilder:
         return int(self._text2float(s))
     # enddef
 
-    def _find_text(self, xpath: str) -> str:
-        return self.driver.find_element(by=By.XPATH, value=xpath).text
+    def _find_texts(self, xpaths: List[str]) -> Dict[str, Optional[str]]:
+        return self.driver.execute_script(_FIND_TEXTS_SCRIPT, xpaths)
     # enddef
 
-    def build(self) -> NFTInfo:
-        nft = NFTInfo(id=self.id,
-                      name=self._name,
-                      num_supply=self._num_supply,
-                      num_listing=self._num_listing,
-                      num_owners=self._num_owners,
-                      floor=self._floor,
-                      volume=self._volume,
-                      days_from_last_trade=self._days_from_last_trade)
-
-        return nft
+    def _is_ready(self, driver: 'WebDriver') -> bool:
+        self._texts = self._find_texts(self._xpaths())
+        return all(text is not None and len(text) > 0 for text in self._texts.values())
     # enddef
 
-    def name(self, xpath: str, post: Callable[str, str] = None) -> 'NFTInfoBuilder':
-        try:
-            s = self._find_text(xpath)
+    def _wait_ready(self):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
 
-            if post is not None:
-                s = post(s)
-            # endif
-        except Exception as e:
-            raise ValueError(f'ID: {self.id}, Cause: name, {e}')
+        try:
+            WebDriverWait(self.driver, self.timeout, poll_frequency=0.25).until(self._is_ready)
+        except TimeoutException:
+            # Missing fields are reported one by one below.
+            pass
         # endtry
+    # enddef
 
-        self._name = s
-        return self
+    def _xpaths(self) -> List[str]:
+        return [xpath for xpath, _ in self._selectors.values()]
     # enddef
 
-    def num_supply(self, xpath: str, post: Callable[str, str] = None) -> 'NFTInfoBuilder':
-        try:
-            i = self._find_text(xpath)
+    def _convert(self, field: str, s: Optional[str]) -> Any:
+        if field == 'name':
+            return s
+        elif field in ('num_supply', 'num_listing', 'num_owners'):
+            return None if s is None else self._text2int(s)
+        elif field in ('floor', 'volume'):
+            return None if s is None else self._text2float(s)
+        elif field == 'days_from_last_trade':
+            return int(s)
+        else:
+            raise NotImplementedError(field)
+        # endif
+    # enddef
 
-            if post is not None:
-                i = post(i)
-                # endif
+    def resolve(self) -> Dict[str, Any]:
+        '''Extract and parse the declared fields, and return them by name.'''
+        instrumentation = self.instrumentation
+        if self.timeout is not None:
+            with instrumentation.timer(self.market, Phase.Wait):
+                self._wait_ready()
+            # endwith
+        else:
+            with instrumentation.timer(self.market, Phase.Extract):
+                self._texts = self._find_texts(self._xpaths())
+            # endwith
+        # endif
+
+        with instrumentation.timer(self.market, Phase.Parse):
+            try:
+                return self._parse()
+            except FieldError as e:
+                instrumentation.record_error(self.market, e.field, e)
+                raise
+            # endtry
+        # endwith
+    # enddef
 
-            if i is not None:
-                i = self._text2int(i)
+    def _parse(self) -> Dict[str, Any]:
+        values = {}
+        for field, (xpath, post) in self._selectors.items():
+            text = self._texts.get(xpath)
+            if text is None:
+                raise MissingFieldError(self.id, field, f'No such element: {xpath}')
             # endif
-        except Exception as e:
-            raise ValueError(f'ID: {self.id}, Cause: num_supply, {e}')
-        # endtry
-
-        self._num_supply = i
-        return self
-    # enddef
 
-    def num_listing(self, xpath: str, post: Callable[str, str] = None) -> 'NFTInfoBuilder':
-        try:
-            i = self._find_text(xpath)
+            try:
+                s = text
+                if post is not None:
+                    s = post(s)
+                # endif
 
-            if post is not None:
-                i = post(i)
+                value = self._convert(field, s)
+            except Exception as e:
+                if len(text.strip()) == 0:
+                    raise MissingFieldError(self.id, field, 'Empty text')
                 # endif
+                raise ParseError(self.id, field, e)
+            # endtry
 
-            if i is not None:
-                i = self._text2int(i)
-            # endif
-        except Exception as e:
-            raise ValueError(f'ID: {self.id}, Cause: num_listing, {e}')
-        # endtry
+            setattr(self, f'_{field}', value)
+            values[field] = value
+        # endfor
 
-        self._num_listing = i
-        return self
+        return values
     # enddef
 
-    def num_owners(self, xpath: str, post: Callable[str, str] = None) -> 'NFTInfoBuilder':
-        try:
-            i = self._find_text(xpath)
+    def build(self) -> NFTInfo:
+        self.resolve()
 
-            if post is not None:
-                i = post(i)
-            # endif
+        nft = NFTInfo(id=self.id,
+                      name=self._name,
+                      num_supply=self._num_supply,
+                      num_listing=self._num_listing,
+                      num_owners=self._num_owners,
+                      floor=self._floor,
+                      volume=self._volume,
+                      days_from_last_trade=self._days_from_last_trade)
 
-            if i is not None:
-                i = self._text2int(i)
-            # endif
-        except Exception as e:
-            raise ValueError(f'ID: {self.id}, Cause: num_owners, {e}')
-        # endtry
+        return nft
+    # enddef
 
-        self._num_owners = i
+    def name(self, xpath: str, post: Callable[[str], str] = None) -> 'NFTInfoBuilder':
+        self._selectors['name'] = (xpath, post)
         return self
     # enddef
 
-    def floor(self, xpath: str, post: Callable[str, str] = None) -> 'NFTInfoBuilder':
-        try:
-            f = self._find_text(xpath)
-
-            if post is not None:
-                f = post(f)
-            # endif
-
-            if f is not None:
-                f = self._text2float(f)
-            # endif
-        except Exception as e:
-            raise ValueError(f'ID: {self.id}, Cause: floor, {e}')
-        # endtry
-
-        self._floor = f
+    def num_supply(self, xpath: str, post: Callable[[str], str] = None) -> 'NFTInfoBuilder':
+        self._selectors['num_supply'] = (xpath, post)
         return self
     # enddef
 
-    def volume(self, xpath: str, post: Callable[str, str] = None) -> 'NFTInfoBuilder':
-        try:
-            f = self._find_text(xpath)
-
-            if post is not None:
-                f = post(f)
-            # endif
-
-            if f is not None:
-                f = self._text2float(f)
-            # endif
-        except Exception as e:
-            raise ValueError(f'ID: {self.id}, Cause: volume, {e}')
-        # endtry
-
-        self._volume = f
+    def num_listing(self, xpath: str, post: Callable[[str], str] = None) -> 'NFTInfoBuilder':
+        self._selectors['num_listing'] = (xpath, post)
         return self
     # enddef
 
-    def days_from_last_trade(self, xpath: str, post: Callable[str, str] = None) -> 'NFTInfoBuilder':
-        try:
-            f = self._find_text(xpath)
+    def num_owners(self, xpath: str, post: Callable[[str], str] = None) -> 'NFTInfoBuilder':
+        self._selectors['num_owners'] = (xpath, post)
+        return self
+    # enddef
 
-            if post is not None:
-                f = post(f)
-            # endif
+    def floor(self, xpath: str, post: Callable[[str], str] = None) -> 'NFTInfoBuilder':
+        self._selectors['floor'] = (xpath, post)
+        return self
+    # enddef
 
-            f = int(f)
-        except Exception as e:
-            raise ValueError(f'ID: {self.id}, Cause: days_from_last_trade, {e}')
-        # endtry
+    def volume(self, xpath: str, post: Callable[[str], str] = None) -> 'NFTInfoBuilder':
+        self._selectors['volume'] = (xpath, post)
+        return self
+    # enddef
 
-        self._days_from_last_trade = f
+    def days_from_last_trade(self, xpath: str, post: Callable[[str], str] = None) -> 'NFTInfoBuilder':
+        self._selectors['days_from_last_trade'] = (xpath, post)
         return self
     # enddef
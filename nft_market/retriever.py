@@ -1,19 +1,30 @@
-import datetime
+import collections
+import dataclasses
+import functools
 import sys
+import threading
 import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from enum import Enum, auto
 from typing import *
 from warnings import warn
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from webdriver_manager.chrome import ChromeDriverManager
+from nft_market.instrument import Instrumentation, NULL_INSTRUMENTATION, Phase
+from nft_market.market import Explorer, Market, market_name
+from nft_market.nftinfo import FieldError, NFTInfo, NFTInfoBuilder
+from nft_market.retry import RetryPolicy
+from nft_market.spec import FIELDS, MarketSpec, Page, REGISTRY, Resource
 
-from nft_market.market import Explorer, Market
-from nft_market.nftinfo import NFTInfo, NFTInfoBuilder
+# selenium and webdriver_manager are imported when a browser is launched, since importing them takes longer than the
+# rest of the package, and Engine.HTTP and the data types do not need them.
+if TYPE_CHECKING:
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.firefox.options import Options as FirefoxOptions
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+    from nft_market.http_engine import HTTPClient
+# endif
 
 
 class Browser(Enum):
@@ -21,28 +32,137 @@ class Browser(Enum):
     Chrome = auto()
 
 
-class _WebFetcher:
-    def __init__(self, url: str, browser: Browser, sec_wait: int, headless: bool, serv: dict[str, Any] = None):
+class Engine(Enum):
+    # Load pages in a browser.
+    Selenium = auto()
+    # Parse server-rendered pages without JavaScript. Falls back to Selenium on failure.
+    HTTP = auto()
+
+
+class Wait(Enum):
+    # Sleep for sec_wait seconds after loading a page.
+    Sleep = auto()
+    # Wait until the fields of a market hold non-empty text, up to sec_wait seconds.
+    Ready = auto()
+
+
+_chromedriver_paths = {}  # type: Dict[Optional[str], str]
+_chromedriver_lock = threading.Lock()
+
+
+def _chromedriver_path(cache_dir: str = None) -> str:
+    # Resolve the driver once per process and cache directory, since webdriver_manager checks versions,
+    # touches the filesystem and possibly the network on every install().
+    from webdriver_manager.chrome import ChromeDriverManager
+    from webdriver_manager.core.driver_cache import DriverCacheManager
+
+    with _chromedriver_lock:
+        if cache_dir not in _chromedriver_paths:
+            if cache_dir is None:
+                manager = ChromeDriverManager()
+            else:
+                manager = ChromeDriverManager(cache_manager=DriverCacheManager(root_dir=cache_dir))
+            # endif
+            _chromedriver_paths[cache_dir] = manager.install()
+        # endif
+
+        return _chromedriver_paths[cache_dir]
+    # endwith
+# enddef
+
+
+class _Session:
+    def __init__(self, driver: 'WebDriver', blocked: FrozenSet[Resource] = frozenset(), blocked_urls: Sequence[str] = ()):
+        self.driver = driver
+        self.blocked = blocked
+        # URL patterns blocked through the DevTools protocol of Chrome.
+        self.blocked_urls = list(blocked_urls)
+        self.num_pages = 0
+        self.broken = False
+    # enddef
+
+    def block_urls(self):
+        '''Block "blocked_urls" in the current tab. The DevTools protocol applies to one target, i.e. tab, at a time.'''
+        if len(self.blocked_urls) > 0:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked_urls})
+        # endif
+    # enddef
+
+    def is_alive(self) -> bool:
+        try:
+            _ = self.driver.current_url
+        except Exception:
+            return False
+        # endtry
+
+        return True
+    # enddef
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except:
+            pass
+        # endtry
+    # enddef
+
+
+# Preferences of Firefox to block each kind of resource.
+_FIREFOX_PREFS = {
+    Resource.Image: {'permissions.default.image': 2},
+    Resource.Media: {'media.autoplay.default': 5, 'media.preload.default': 0},
+    Resource.Font: {'browser.display.use_document_fonts': 0, 'gfx.downloadable_fonts.enabled': False},
+    Resource.Tracker: {'privacy.trackingprotection.enabled': True,
+                       'privacy.trackingprotection.socialtracking.enabled': True,
+                       'privacy.trackingprotection.cryptomining.enabled': True},
+    }
+# URL patterns blocked through the DevTools protocol of Chrome.
+_CHROME_BLOCKED_URLS = {
+    Resource.Image: ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico'],
+    Resource.Media: ['*.mp4', '*.webm', '*.mov', '*.m3u8', '*.mp3', '*.ogg'],
+    Resource.Font: ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    Resource.Tracker: ['*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*facebook.net*', '*hotjar.com*',
+                       '*segment.io*', '*segment.com*', '*mixpanel.com*', '*amplitude.com*', '*intercom.io*', '*fullstory.com*'],
+    }
+
+
+class _SessionPool:
+    def __init__(self, browser: Browser, headless: bool, serv: dict[str, Any] = None, size: int = 1, max_pages: int = 50,
+                 driver_cache_dir: str = None, instrumentation: Instrumentation = NULL_INSTRUMENTATION):
+        if size < 1:
+            raise ValueError(f'size must be positive: {size}')
+        # endif
+        if browser not in (Browser.Firefox, Browser.Chrome):
+            raise NotImplementedError(browser)
+        # endif
+
         self.browser = browser
-        self.url = url
-        self.sec_wait = sec_wait
+        self.headless = headless
+        self.serv = serv
+        self.driver_cache_dir = driver_cache_dir
+        self.size = size
+        self.max_pages = max_pages
+        self.instrumentation = instrumentation
+
+        self._idle = []  # type: List[_Session]
+        self._num_sessions = 0
+        self._closed = False
+        self._cond = threading.Condition()
+    # enddef
+
+    def _options(self, blocked: FrozenSet[Resource]) -> Union['FirefoxOptions', 'ChromeOptions']:
+        from selenium.webdriver.chrome.options import Options as ChromeOptions
+        from selenium.webdriver.firefox.options import Options as FirefoxOptions
 
         if self.browser == Browser.Firefox:
             options = FirefoxOptions()
-            if serv is not None:
-                self.serv = FirefoxService(**serv)
-            else:
-                self.serv = None
-            # endif
-        elif self.browser == Browser.Chrome:
-            options = ChromeOptions()
-            self.serv = ChromeService(ChromeDriverManager().install())
         else:
-            raise NotImplementedError(self.browser)
+            options = ChromeOptions()
         # endif
 
         options.accept_insecure_certs = True
-        if headless:
+        if self.headless:
             if self.browser == Browser.Firefox:
                 options.add_argument("-headless")
             elif self.browser == Browser.Chrome:
@@ -56,677 +176,830 @@ class _WebFetcher:
         options.add_argument('--proxy-server="direct://"')
         options.add_argument('--proxy-bypass-list=*')
         options.add_argument('--start-maximized')
-        self.options = options
+
+        if self.browser == Browser.Firefox:
+            for resource in blocked:
+                for key, value in _FIREFOX_PREFS[resource].items():
+                    options.set_preference(key, value)
+                # endfor
+            # endfor
+        else:
+            if Resource.Image in blocked:
+                options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+            # endif
+            if Resource.Media in blocked:
+                options.add_argument('--autoplay-policy=user-gesture-required')
+            # endif
+        # endif
+
+        return options
     # enddef
 
-    def __enter__(self):
+    def _launch(self, blocked: FrozenSet[Resource] = frozenset()) -> _Session:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service as ChromeService
+        from selenium.webdriver.firefox.service import Service as FirefoxService
+
+        options = self._options(blocked)
         if self.browser == Browser.Firefox:
             if self.serv is not None:
-                self.driver = webdriver.Firefox(options=self.options, service=self.serv)
+                driver = webdriver.Firefox(options=options, service=FirefoxService(**self.serv))
             else:
-                self.driver = webdriver.Firefox(options=self.options)
+                driver = webdriver.Firefox(options=options)
             # endif
-        elif self.browser == Browser.Chrome:
+        else:
             # import chromedriver_binary
             # _ = chromedriver_binary.chromedriver_filename
 
-            self.driver = webdriver.Chrome(options=self.options, service=self.serv)
-        else:
-            raise NotImplementedError(self.browser)
+            serv = dict(self.serv or {})
+            if serv.get('executable_path') is None:
+                serv['executable_path'] = _chromedriver_path(self.driver_cache_dir)
+            # endif
+            driver = webdriver.Chrome(options=options, service=ChromeService(**serv))
         # endif
 
+        return self._session(driver, blocked)
+    # enddef
+
+    def _session(self, driver: 'WebDriver', blocked: FrozenSet[Resource]) -> _Session:
+        # Firefox blocks resources by its preferences, and Chrome by URL patterns in each tab.
+        urls = [url for resource in blocked for url in _CHROME_BLOCKED_URLS[resource]] if self.browser == Browser.Chrome else []
+        session = _Session(driver, blocked, urls)
         try:
-            self.driver.get(url=self.url)
-            self.driver.implicitly_wait(self.sec_wait)
-            time.sleep(self.sec_wait)
+            session.block_urls()
         except:
-            try:
-                self.driver.quit()
-            except:
-                pass
-            # endtry
+            session.quit()
+            raise
         # endtry
 
-        return self.driver
+        return session
     # enddef
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    def acquire(self, blocked: FrozenSet[Resource] = frozenset()) -> _Session:
+        '''Check out a session whose browser blocks exactly the given resources.'''
+        stale = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError('The session pool has already been closed.')
+                # endif
+
+                matched = [i for i, s in enumerate(self._idle) if s.blocked == blocked]
+                if len(matched) > 0:
+                    session = self._idle.pop(matched[-1])
+                    break
+                elif self._num_sessions < self.size:
+                    session = None
+                    self._num_sessions += 1
+                    break
+                elif len(self._idle) > 0:
+                    # Replace the least recently used session blocking other resources.
+                    session = None
+                    stale = self._idle.pop(0)
+                    break
+                # endif
+
+                self._cond.wait()
+            # endwhile
+        # endwith
+
+        if stale is not None:
+            stale.quit()
+        # endif
+
         try:
-            self.driver.quit()
+            if session is not None and not session.is_alive():
+                session.quit()
+                session = None
+            # endif
+
+            if session is None:
+                with self.instrumentation.timer(None, Phase.Launch):
+                    session = self._launch(blocked)
+                # endwith
+            # endif
         except:
-            pass
+            with self._cond:
+                self._num_sessions -= 1
+                self._cond.notify_all()
+            # endwith
+            raise
         # endtry
-    # enddef
 
+        return session
+    # enddef
 
-class Retriever:
-    def __init__(self, browser: Browser, sec_wait: int = 10, num_retry: int = 5, verbose: bool = False, headless: bool = True, serv: dict[str, Any] = None):
-        self.option = {
-            'browser': browser,
-            'sec_wait': sec_wait,
-            'headless': headless,
-            'serv': serv,
-            }
-        self.sec_wait_original = sec_wait
-        self.sec_wait = sec_wait
-        self.num_retry = num_retry
-        self.verbose = verbose
+    def grow(self, size: int):
+        '''Allow up to "size" sessions, which are launched as they are acquired. The pool never shrinks.'''
+        with self._cond:
+            if size > self.size:
+                self.size = size
+                self._cond.notify_all()
+            # endif
+        # endwith
     # enddef
 
-    def fetch(self, market: Union[Market, Explorer], id: str) -> NFTInfo:
-        '''Fetch the current information of the specific NFT.
-        Args:
-            market (nft_market.Market): One of the enums of nft_market.Market
-            id (str): The ID of the NFT. You can find it on the URL on the marketplace.
+    def release(self, session: _Session):
+        recycle = session.broken or session.num_pages >= self.max_pages
 
-        Returns:
-            (nft_market.NFTInfo)
-        '''
-        if market == Market.OpenSea:
-            func = self._retrieve_opensea
-        elif market == Explorer.NFTgeek:
-            func = self._retrieve_nftgeek
-        elif market == Explorer.ICScan:
-            func = self._retrieve_icscan
-        elif market == Market.tofuNFT:
-            func = self._retrieve_tofunft
-        elif market == Market.PancakeSwap:
-            func = self._retrieve_pancakeswap
-        elif market == Market.Rarible:
-            func = self._retrieve_rarible
-        elif market == Market.GhostMarket:
-            func = self._retrieve_ghostmarket
-        elif market == Market.Cryptocom:
-            func = self._retrieve_cryptocom
-        elif market == Market.Gem:
-            func = self._retrieve_gem
-        elif market == Market.NFTrade:
-            func = self._retrieve_nftrade
-        elif market == Market.Solanart:
-            func = self._retrieve_solanart
-        elif market == Market.MagicEden:
-            func = self._retrieve_magiceden
-        elif market == Market.XANALIA:
-            func = self._retrieve_xanalia
-        elif market == Market.Coinbase:
-            func = self._retrieve_coinbase
-        elif market == Market.NiftyGateway:
-            func = self._retrieve_niftygateway
-        # deprecated
-        elif market == Market.Entrepot:
-            warn(f'Please replace NFTGeek instead.')
-            func = self._retrieve_entrepot
-        elif market == Market.CetoSwap:
-            warn(f'Please replace NFTGeek instead.')
-            func = self._retrieve_cetoswap
-        elif market == Market.CCC:
-            warn(f'Please replace NFTGeek instead.')
-            func = self._retrieve_ccc
-        elif market == Market.Jelly:
-            warn(f'Please replace NFTGeek instead.')
-            func = self._retrieve_jelly
-        elif market == Market.YUMI:
-            warn(f'Please replace NFTGeek instead.')
-            func = self._retrieve_yumi
-        else:
-            raise NotImplementedError(market)
+        with self._cond:
+            if recycle or self._closed:
+                self._num_sessions -= 1
+            else:
+                self._idle.append(session)
+            # endif
+            self._cond.notify_all()
+        # endwith
+
+        if recycle or self._closed:
+            session.quit()
         # endif
+    # enddef
 
-        num_retry = 0
-        error = NotImplemented
-        while num_retry <= self.num_retry:
-            nft, error = func(id)
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._num_sessions -= len(idle)
+            self._cond.notify_all()
+        # endwith
 
-            if nft is not None:
-                # assert error is None, f'nft: {nft}, error: {error}'
-                if error is not None:
-                    print(f'[Warning] {error}', file=sys.stderr)
-                # endif
+        for session in idle:
+            session.quit()
+        # endfor
+    # enddef
 
-                return nft
-            else:
-                assert error is not None, f'nft: {nft}, error: {error}'
 
-                num_retry += 1
-                self.sec_wait += self.sec_wait_original
-                time.sleep(self.sec_wait)
+class _WebFetcher:
+    '''Load one or more URLs in a pooled session.
 
-                if self.verbose:
-                    print(f'An error in "{id}" [{num_retry}/{self.num_retry + 1}]', file=sys.stderr)
+    With several URLs, every URL but the first is opened in a new tab before the first one is loaded in the current
+    tab, so that all of them load in parallel. Use switch() to move between them.
+    '''
+
+    def __init__(self, pool: _SessionPool, url: Union[str, Sequence[str]], sec_wait: int, wait: Wait = Wait.Sleep,
+                 blocked: FrozenSet[Resource] = frozenset(), market: Union[Market, Explorer] = None):
+        self.pool = pool
+        self.urls = [url] if isinstance(url, str) else list(url)
+        self.sec_wait = sec_wait
+        self.wait = wait
+        self.blocked = blocked
+        self.market = market
+        self.instrumentation = pool.instrumentation
+    # enddef
+
+    def __enter__(self):
+        with self.instrumentation.timer(self.market, Phase.Acquire):
+            self.session = self.pool.acquire(self.blocked)
+        # endwith
+        self.session.num_pages += len(self.urls)
+        self.driver = self.session.driver
+        self.handles = [None] * len(self.urls)  # type: List[Optional[str]]
+        self.deadline = time.monotonic() + self.sec_wait
+
+        try:
+            with self.instrumentation.timer(self.market, Phase.Load):
+                self.handles[0] = self.driver.current_window_handle
+                for i in range(1, len(self.urls)):
+                    self.handles[i] = self._open_tab(self.urls[i])
+                # endfor
+                if len(self.urls) > 1:
+                    self.driver.switch_to.window(self.handles[0])
                 # endif
+
+                self.driver.get(url=self.urls[0])
+            # endwith
+            self.deadline = time.monotonic() + self.sec_wait
+            if self.wait == Wait.Sleep:
+                self.driver.implicitly_wait(self.sec_wait)
+                with self.instrumentation.timer(self.market, Phase.Wait):
+                    time.sleep(self.sec_wait)
+                # endwith
+            else:
+                # NFTInfoBuilder waits for the fields explicitly.
+                self.driver.implicitly_wait(0)
             # endif
-        # endwhile
+        except:
+            # The session will be recycled on release.
+            self.session.broken = True
+        # endtry
 
-        raise error
+        return self.driver
     # enddef
 
-    def _retrieve_opensea(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://opensea.io/collection/{id}'
+    def _open_tab(self, url: str) -> Optional[str]:
+        handles = set(self.driver.window_handles)
+        if len(self.session.blocked_urls) == 0:
+            self.driver.execute_script('window.open(arguments[0], "_blank");', url)
+        else:
+            # Open a blank tab, block the URLs in it, and then start loading without waiting for the page, as window.open does.
+            self.driver.execute_script('window.open("about:blank", "_blank");')
+        # endif
+        new_handles = [handle for handle in self.driver.window_handles if handle not in handles]
+        if len(new_handles) == 0:
+            return None
+        # endif
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="main"]/div/div/div/div[3]/div/div/div[1]/div/div[2]/h1') \
-                    .num_supply('//*[@id="main"]/div/div/div/div[5]/div/div[1]/div/div[1]/div[1]/span/div[2]/span/div/span[1]/div/div[2]/span/div/div[2]/span') \
-                    .floor('//*[@id="main"]/div/div/div/div[5]/div/div[1]/div/div[2]/div[3]/div/div[6]/a/div/span[1]/div', post=lambda s: s.split('\n')[0]) \
-                    .volume('//*[@id="main"]/div/div/div/div[5]/div/div[1]/div/div[2]/div[3]/div/div[3]/a/div/span[1]/div', post=lambda s: s.split('\n')[0]) \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+        if len(self.session.blocked_urls) > 0:
+            self.driver.switch_to.window(new_handles[0])
+            self.session.block_urls()
+            self.driver.execute_script('window.location.href = arguments[0];', url)
+        # endif
 
-        return nft, error
+        return new_handles[0]
     # enddef
 
-    def _retrieve_entrepot(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://entrepot.app/marketplace/{id}'
-
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            for c1 in [2, 3]:
-                error = None
-                try:
-                    nft = NFTInfoBuilder(driver, id) \
-                        .name('//*[@id="root"]/main/div/div[1]/div/div[1]/div/div[3]/h1') \
-                        .num_listing('//*[@id="root"]/main/div/div[1]/div/div[1]/div/div[2]/div[1]/div/div[2]/strong') \
-                        .floor(f'//*[@id="mainListings"]/div[2]/div/div[2]/div[2]/div/div[1]/div/a/div[{c1}]/div/div[4]/p') \
-                        .volume('//*[@id="root"]/main/div/div[1]/div/div[1]/div/div[2]/div[1]/div/div[1]/strong') \
-                        .build()
-                    break
-                except Exception as e:
-                    error = e
-                    continue
-                # endtry
-            # endfor
-        # endwith
+    def remaining(self) -> float:
+        '''Seconds left until sec_wait seconds have passed since the first URL was loaded.'''
+        return max(0.0, self.deadline - time.monotonic())
+    # enddef
 
-        return nft, error
+    def switch(self, i: int):
+        '''Switch to the tab of the i-th URL.'''
+        if self.handles[i] is not None:
+            self.driver.switch_to.window(self.handles[i])
+        else:
+            # The tab could not be opened, e.g. by a popup blocker. Load the URL in the first tab instead.
+            self.driver.switch_to.window(self.handles[0])
+            with self.instrumentation.timer(self.market, Phase.Load):
+                self.driver.get(url=self.urls[i])
+            # endwith
+            if self.wait == Wait.Sleep:
+                with self.instrumentation.timer(self.market, Phase.Wait):
+                    time.sleep(self.sec_wait)
+                # endwith
+            else:
+                self.deadline = time.monotonic() + self.sec_wait
+            # endif
+        # endif
     # enddef
 
-    def _retrieve_tofunft(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://tofunft.com/collection/{id}/items'
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.session.broken = True
+        # endif
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
+        if len(self.urls) > 1 and not self.session.broken:
             try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="__next"]/div[2]/div[1]/div[1]/h1') \
-                    .num_listing('//*[@id="__next"]/div[2]/div[1]/div[2]/div[1]/div[3]/div[2]') \
-                    .num_owners('//*[@id="__next"]/div[2]/div[1]/div[2]/div[1]/div[2]/div[2]') \
-                    .floor('//*[@id="__next"]/div[2]/div[1]/div[2]/div[1]/div[5]/div[2]') \
-                    .volume('//*[@id="__next"]/div[2]/div[1]/div[2]/div[1]/div[4]/div[2]') \
-                    .build()
-            except Exception as e:
-                error = e
+                for handle in self.handles[1:]:
+                    if handle is not None:
+                        self.driver.switch_to.window(handle)
+                        self.driver.close()
+                    # endif
+                # endfor
+                self.driver.switch_to.window(self.handles[0])
+            except:
+                self.session.broken = True
             # endtry
-        # endwith
+        # endif
 
-        return nft, error
+        self.pool.release(self.session)
     # enddef
 
-    def _retrieve_pancakeswap(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://pancakeswap.finance/nfts/collections/{id}'
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[1]/h1') \
-                    .num_supply('//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[2]/div/div[1]/div[2]') \
-                    .num_listing('//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[2]/div/div[2]/div[2]') \
-                    .floor('//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[2]/div/div[3]/div[2]') \
-                    .volume('//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[2]/div/div[4]/div[2]') \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+@dataclasses.dataclass
+class FetchResult:
+    market: Union[Market, Explorer]
+    id: str
+    nft: Optional[NFTInfo]
+    error: Optional[Exception]
 
-        return nft, error
+    @property
+    def ok(self) -> bool:
+        return self.error is None
     # enddef
 
-    def _retrieve_rarible(self, id: str) -> Tuple[NFTInfo, Exception]:
-        if id.startswith('0x'):
-            url = f'https://rarible.com/collection/{id}'
+
+class FetchBatch:
+    '''An iterator over the results of Retriever.fetch_many in the order of completion.
+
+    Failed fetches are yielded as well, and are also collected in "failures" as they complete.
+    With a window, the pairs are read as the results come out, and "pairs" holds the pairs read so far.
+    '''
+
+    def __init__(self, retriever: 'Retriever', pairs: Iterable[Tuple[Union[Market, Explorer], str]], max_workers: int,
+                 market_limits: Dict[Union[Market, Explorer], int], tabs: int = 1, window: int = None):
+        # Nothing would ever run with a limit of 0, and the loop would spin.
+        if max_workers < 1:
+            raise ValueError(f'max_workers must be positive: {max_workers}')
+        # endif
+        for market, limit in market_limits.items():
+            if limit < 1:
+                raise ValueError(f'The limit of {market_name(market)} must be positive: {limit}')
+            # endif
+        # endfor
+        if tabs < 1:
+            raise ValueError(f'tabs must be positive: {tabs}')
+        # endif
+        if window is not None and window < 1:
+            raise ValueError(f'window must be positive: {window}')
+        # endif
+
+        self.retriever = retriever
+        if window is None:
+            self.pairs = list(pairs)
+            self._unread = iter(self.pairs)
         else:
-            # Seems that "named" projects have a different URL schema.
-            url = f'https://rarible.com/{id}/items'
+            self.pairs = []  # type: List[Tuple[Union[Market, Explorer], str]]
+            self._unread = iter(pairs)
         # endif
+        self.max_workers = max_workers
+        self.market_limits = market_limits
+        self.tabs = tabs
+        self.window = window
+
+        self.num_succeeded = 0
+        self.failures = []  # type: List[FetchResult]
+        self._iter = self._run()
+    # enddef
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[2]/div/div/span') \
-                    .num_supply('//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[3]/div/div[1]/div[3]/div/span') \
-                    .num_owners('//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[3]/div/div[1]/div[4]/div/span') \
-                    .floor('//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[3]/div/div[1]/div[1]/div/span',
-                           post=lambda s: s.replace('ETH', '')) \
-                    .volume('//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[3]/div/div[1]/div[2]/div/span',
-                            post=lambda s: s.replace('ETH', '')) \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+    def __iter__(self) -> Iterator[FetchResult]:
+        return self
+    # enddef
 
-        return nft, error
+    def __next__(self) -> FetchResult:
+        return next(self._iter)
     # enddef
 
-    def _retrieve_ghostmarket(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://ghostmarket.io/collection/{id}/?tab=nfts'
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'total': len(self.pairs),
+            'succeeded': self.num_succeeded,
+            'failed': len(self.failures),
+            'errors': {f'{market_name(r.market)}:{r.id}': repr(r.error) for r in self.failures},
+            }
+    # enddef
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            for c_floor in ['span/div[2]/', '', ]:
-                error = None
-                try:
-                    nft = NFTInfoBuilder(driver, id) \
-                        .name('//*[@id="__layout"]/div/section/div/div[1]/div[3]/span[1]') \
-                        .num_supply('//*[@id="__layout"]/div/section/div/div[2]/div[1]/div/div[1]/span/div[2]/div/div/div[1]') \
-                        .num_owners('//*[@id="__layout"]/div/section/div/div[2]/div[1]/div/div[2]/span/div[2]/div/div/div[1]') \
-                        .floor(f'//*[@id="__layout"]/div/section/div/div[2]/div[1]/div/div[3]/{c_floor}div/div/div[1]') \
-                        .volume(f'//*[@id="__layout"]/div/section/div/div[2]/div[1]/div/div[4]/{c_floor}div/div/div[1]') \
-                        .build()
-                    break
-                except Exception as e:
-                    error = e
-                    continue
-                # endtry
-            # endfor
-        # endwith
+    def _fetch(self, market: Union[Market, Explorer], id: str) -> FetchResult:
+        try:
+            return FetchResult(market, id, self.retriever.fetch(market, id), None)
+        except Exception as e:
+            return FetchResult(market, id, None, e)
+        # endtry
+    # enddef
 
-        return nft, error
+    def _fetch_group(self, market: Union[Market, Explorer], ids: List[str]) -> List[FetchResult]:
+        if len(ids) == 1:
+            return [self._fetch(market, ids[0])]
+        # endif
+
+        try:
+            return self.retriever.fetch_tabs(market, ids)
+        except Exception as e:
+            return [FetchResult(market, id, None, e) for id in ids]
+        # endtry
     # enddef
 
-    def _retrieve_cryptocom(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://crypto.com/nft/collection/{id}'
+    def _run(self) -> Iterator[FetchResult]:
+        pending = {}  # type: Dict[Union[Market, Explorer], Deque[str]]
+        num_running = collections.Counter()  # type: Counter[Union[Market, Explorer]]
+        running = {}  # type: Dict[Future, Union[Market, Explorer]]
+        # The number of IDs read and not yielded yet, i.e. pending or running.
+        num_unfinished = 0
+        exhausted = False
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="root"]/div[1]/div/div[3]/div/div[1]/div[2]') \
-                    .num_listing('//*[@id="root"]/div[1]/div/div[3]/div/div[3]/div/div[1]/span') \
-                    .num_owners('//*[@id="root"]/div[1]/div/div[3]/div/div[3]/div/div[2]/span') \
-                    .floor('//*[@id="root"]/div[1]/div/div[3]/div/div[3]/div/div[3]/div/div[2]/div/span[2]/div') \
-                    .volume('//*[@id="root"]/div[1]/div/div[3]/div/div[3]/div/div[4]/div/span[2]/div') \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='nft_market')
+        try:
+            while True:
+                # Read the pairs up to the window.
+                while not exhausted and (self.window is None or num_unfinished < self.window):
+                    pair = next(self._unread, None)
+                    if pair is None:
+                        exhausted = True
+                        break
+                    # endif
+                    if self.window is not None:
+                        self.pairs.append(pair)
+                    # endif
+
+                    market, id = pair
+                    pending.setdefault(market, collections.deque()).append(id)
+                    num_unfinished += 1
+                # endwhile
+                if len(pending) == 0 and len(running) == 0:
+                    break
+                # endif
 
-        return nft, error
+                # Submit as many pairs as the worker and per-market limits allow, up to "tabs" IDs of a market at once.
+                for market in list(pending):
+                    ids = pending[market]
+                    limit = self.market_limits.get(market, self.max_workers)
+                    while len(ids) > 0 and len(running) < self.max_workers and num_running[market] < limit:
+                        num_running[market] += 1
+                        group = [ids.popleft() for _ in range(min(self.tabs, len(ids)))]
+                        running[executor.submit(self._fetch_group, market, group)] = market
+                    # endwhile
+
+                    if len(ids) == 0:
+                        del pending[market]
+                    # endif
+                # endfor
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    num_running[running.pop(future)] -= 1
+
+                    for result in future.result():
+                        num_unfinished -= 1
+                        if result.ok:
+                            self.num_succeeded += 1
+                        else:
+                            self.failures.append(result)
+                        # endif
+
+                        yield result
+                    # endfor
+                # endfor
+            # endwhile
+        finally:
+            executor.shutdown(wait=False)
+        # endtry
     # enddef
 
-    def _retrieve_gem(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://www.gem.xyz/collection/{id}'
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="app"]/div/div[2]/div[2]/div[1]/div/div[1]/div/div[1]/div[1]/div') \
-                    .num_listing('//*[@id="app"]/div/div[2]/div[2]/div[1]/div/div[2]/div/div[1]/div[2]/div[1]/div/div[2]/div[1]',
-                                 lambda s: s.replace('results', '')) \
-                    .floor('//*[@id="app"]/div/div[2]/div[2]/div[1]/div/div[1]/div/div[1]/div[2]/span[3]/span[2]') \
-                    .volume('//*[@id="app"]/div/div[2]/div[2]/div[1]/div/div[1]/div/div[1]/div[2]/span[1]/span[2]') \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+class _Attempts:
+    '''The bookkeeping of the attempts of one fetch: warnings, the retry policy and instrumentation.
 
-        return nft, error
-    # enddef
+    Shared by Retriever and AsyncRetriever, which differ only in how they run an attempt and wait for the next one.
+    '''
 
-    def _retrieve_nftrade(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://nftrade.com/assets/{id}'
+    def __init__(self, retriever: 'Retriever', market: Union[Market, Explorer], id: str, started_at: float = None):
+        self.retriever = retriever
+        self.market = market
+        self.id = id
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.num_retry = 0
+    # enddef
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="__next"]/div/main/div/div/div[1]/div[1]/div[3]/div[1]/div[2]/div[1]/div[1]') \
-                    .floor('//*[@id="__next"]/div/main/div/div/div[1]/div[1]/div[4]/div[2]/div[1]/div[2]') \
-                    .volume('//*[@id="__next"]/div/main/div/div/div[1]/div[1]/div[4]/div[2]/div[4]/div[2]') \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+    def succeeded(self, nft: NFTInfo, error: Optional[Exception]) -> NFTInfo:
+        # An error with an NFT is of a page that is not required.
+        if error is not None:
+            print(f'[Warning] {error}', file=sys.stderr)
+        # endif
 
-        return nft, error
+        self._finished(None)
+        return nft
     # enddef
 
-    def _retrieve_solanart(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://solanart.io/collections/{id}?tab=items'
+    def failed(self, error: Exception) -> Optional[float]:
+        '''Return the seconds to wait before the next attempt, or None to give up.'''
+        retriever = self.retriever
+        instrumentation = retriever.instrumentation
+        if instrumentation.enabled and not isinstance(error, FieldError):
+            # Errors of fields are recorded by NFTInfoBuilder.
+            instrumentation.record_error(self.market, None, error)
+        # endif
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[1]/h2') \
-                    .num_supply('//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[2]/div[1]/div[1]') \
-                    .num_owners('//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[2]/div[3]/div[1]') \
-                    .floor('//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[2]/div[5]/div[1]',
-                           self._remove_sol_mark) \
-                    .volume('//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[2]/div[7]/div[1]',
-                            self._remove_sol_mark) \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+        self.num_retry += 1
+        sec_wait = retriever.retry.next_wait(self.num_retry, error, self.started_at)
+        if sec_wait is None:
+            self._finished(error)
+            return None
+        # endif
 
-        return nft, error
+        if retriever.verbose:
+            print(f'An error in "{self.id}" [{self.num_retry}/{retriever.retry.num_retry + 1}]: {error}', file=sys.stderr)
+        # endif
+        instrumentation.record_retry(self.market, self.id, self.num_retry, error)
+        return sec_wait
     # enddef
 
-    @staticmethod
-    def _remove_sol_mark(s: str) -> str:
-        return s.strip(" ◎")
+    def _finished(self, error: Optional[Exception]):
+        instrumentation = self.retriever.instrumentation
+        if instrumentation.enabled:
+            seconds = time.monotonic() - self.started_at
+            instrumentation.record_phase(self.market, Phase.Fetch, seconds)
+            instrumentation.record_fetch(self.market, self.id, seconds, error)
+        # endif
+    # enddef
 
-    def _retrieve_magiceden(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://magiceden.io/marketplace/{id}'
+    def backoff(self) -> ContextManager:
+        '''A context manager timing the wait before the next attempt.'''
+        return self.retriever.instrumentation.timer(self.market, Phase.Backoff)
+    # enddef
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="root"]/div/div/div/div[3]/div[2]/div[1]/div/h1') \
-                    .num_listing('//*[@id="root"]/div/div/div/div[3]/div[2]/div[1]/div/div[4]/div/div/div[4]/div/span[2]') \
-                    .floor('//*[@id="root"]/div/div/div/div[3]/div[2]/div[1]/div/div[4]/div/div/div[1]/div/span[2]',
-                           self._remove_sol_mark) \
-                    .volume('//*[@id="root"]/div/div/div/div[3]/div[2]/div[1]/div/div[4]/div/div/div[2]/div/span[2]',
-                            self._remove_sol_mark) \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
 
-        return nft, error
+class Retriever:
+    def __init__(self, browser: Browser, sec_wait: int = 10, num_retry: int = 5, verbose: bool = False, headless: bool = True, serv: dict[str, Any] = None,
+                 pool_size: int = 1, max_pages: int = 50, wait: Wait = Wait.Sleep, specs: Mapping[Hashable, MarketSpec] = None,
+                 engines: Mapping[Hashable, Engine] = None, retry: RetryPolicy = None, driver_cache_dir: str = None,
+                 lean: Union[bool, Iterable[Resource]] = False, instrumentation: Instrumentation = None):
+        '''
+        Args:
+            instrumentation (nft_market.Instrumentation): Where the timings of the phases of fetches, retries and errors
+                are recorded. Nothing is recorded by default.
+            lean (Union[bool, Iterable[nft_market.Resource]]): Resources that browsers do not load, or True for all of them.
+                Resources in MarketSpec.allow are still loaded for the market.
+            serv (dict[str, Any]): Arguments of the Service of the driver. With "executable_path", the driver
+                at the path is used as is, without being looked up or downloaded (e.g. for offline use).
+            driver_cache_dir (str): Where webdriver_manager caches ChromeDriver.
+            retry (nft_market.RetryPolicy): How to retry a failed fetch. Defaults to num_retry retries with
+                exponential backoff from sec_wait seconds.
+            engines (Mapping[Hashable, nft_market.Engine]): The engine for each market. Engine.Selenium by default.
+            specs (Mapping[Hashable, nft_market.MarketSpec]): Specs of markets to use instead of nft_market.REGISTRY.
+            wait (nft_market.Wait): How to wait for a page after loading it. With Wait.Ready, sec_wait is the timeout.
+            pool_size (int): The maximum number of browser sessions kept alive at the same time.
+            max_pages (int): The number of pages a session loads before it is recycled.
+        '''
+        self.option = {
+            'browser': browser,
+            'sec_wait': sec_wait,
+            'headless': headless,
+            'serv': serv,
+            'wait': wait,
+            }
+        self.sec_wait = sec_wait
+        self.num_retry = num_retry
+        self.retry = retry if retry is not None else RetryPolicy(num_retry=num_retry, base=sec_wait)
+        self.verbose = verbose
+        self._specs = REGISTRY if specs is None else specs
+        self._engines = engines or {}
+        self._lean = frozenset(Resource if lean is True else (lean or []))
+        # lxml is imported only for the HTTP engine, which falls back to the browser without it.
+        self._http = None  # type: Optional[HTTPClient]
+        if Engine.HTTP in self._engines.values():
+            from nft_market import http_engine
+
+            if http_engine.is_available():
+                self._http = http_engine.HTTPClient(timeout=sec_wait)
+            # endif
+        # endif
+        self.instrumentation = instrumentation if instrumentation is not None else NULL_INSTRUMENTATION
+
+        self._pool = _SessionPool(browser, headless, serv, size=pool_size, max_pages=max_pages, driver_cache_dir=driver_cache_dir,
+                                  instrumentation=self.instrumentation)
+        # Quit the browsers even if close() is never called.
+        self._finalizer = weakref.finalize(self, self._pool.close)
     # enddef
 
-    def _retrieve_xanalia(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://www.xanalia.com/{id}'
+    def __enter__(self) -> 'Retriever':
+        return self
+    # enddef
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="home-page"]/div/div/div/div[2]/div/div[1]') \
-                    .num_supply('//*[@id="home-page"]/div/div/div/div[2]/div/div[2]/div[1]/h5') \
-                    .num_owners('//*[@id="home-page"]/div/div/div/div[2]/div/div[2]/div[2]/h5') \
-                    .floor('//*[@id="home-page"]/div/div/div/div[2]/div/div[2]/div[3]/h5') \
-                    .volume('//*[@id="home-page"]/div/div/div/div[2]/div/div[2]/div[4]/h5') \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    # enddef
 
-        return nft, error
+    def close(self):
+        '''Quit all the browser sessions owned by this retriever.'''
+        self._finalizer()
+        if self._http is not None:
+            self._http.close()
+        # endif
     # enddef
 
-    def _retrieve_cetoswap(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://7pnex-saaaa-aaaai-qbhwa-cai.raw.ic0.app/#/nftmarket/{id}'
+    @property
+    def max_workers(self) -> int:
+        '''The number of fetches run at the same time by default, i.e. the size of the session pool.'''
+        return self._pool.size
+    # enddef
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[1]') \
-                    .num_supply('//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[5]/div/div/div/div[1]') \
-                    .num_listing('//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[1]/div/div/div/div[1]') \
-                    .num_owners('//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[2]/div/div/div/div[1]') \
-                    .floor('//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[3]/div/div/div/div[1]/div/div') \
-                    .volume('//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[4]/div/div/div/div[1]/div/div') \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+    def _open(self, url: Union[str, Sequence[str]], blocked: FrozenSet[Resource] = frozenset(), market: Union[Market, Explorer] = None) -> _WebFetcher:
+        return _WebFetcher(self._pool, url, self.option['sec_wait'], self.option['wait'], blocked, market)
+    # enddef
 
-        return nft, error
+    def _builder(self, driver: 'WebDriver', id: str, timeout: float = None, market: Union[Market, Explorer] = None) -> NFTInfoBuilder:
+        if self.option['wait'] != Wait.Ready:
+            timeout = None
+        elif timeout is None:
+            timeout = self.option['sec_wait']
+        # endif
+
+        return NFTInfoBuilder(driver, id, timeout, self.instrumentation, market)
     # enddef
 
-    def _retrieve_coinbase(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://nft.coinbase.com/collection/{id}'
+    def _retriever_of(self, market: Union[Market, Explorer]) -> Callable[[str], Tuple[NFTInfo, Exception]]:
+        spec = self._specs.get(market)
+        if spec is None:
+            raise NotImplementedError(market)
+        # endif
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/h1/span/span[1]') \
-                    .num_listing('//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/div[2]/div/div[1]/span[1]') \
-                    .num_owners('//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/div[2]/div/div[2]/span[1]') \
-                    .floor('//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/div[2]/div/div[3]/span[1]/div/div/div/span[1]',
-                           lambda s: s.replace('ETH', '')) \
-                    .volume('//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/div[2]/div/div[4]/span[1]',
-                            lambda s: s.replace('ETH', '')) \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+        if spec.deprecated:
+            warn(f'Please replace NFTGeek instead.')
+        # endif
 
-        return nft, error
+        return functools.partial(self._retrieve, spec, engine=self._engines.get(market, Engine.Selenium), market=market)
     # enddef
 
-    def _retrieve_ccc(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://skeh5-daaaa-aaaai-aar4q-cai.raw.ic0.app/#/collection/{id}'
-
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[2]/h2') \
-                    .num_supply('//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[5]/div[2]') \
-                    .num_listing('//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[2]/div[2]') \
-                    .num_owners('//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[4]/div[2]',
-                                lambda s: None if s == 'N/A' else s) \
-                    .floor('//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[3]/div[2]/div') \
-                    .volume('//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[1]/div[2]/div') \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+    def fetch(self, market: Union[Market, Explorer], id: str) -> NFTInfo:
+        '''Fetch the current information of the specific NFT.
+        Args:
+            market (nft_market.Market): One of the enums of nft_market.Market
+            id (str): The ID of the NFT. You can find it on the URL on the marketplace.
 
-        return nft, error
+        Returns:
+            (nft_market.NFTInfo)
+        '''
+        return self._fetch(market, id, self._retriever_of(market))
     # enddef
 
-    def _retrieve_niftygateway(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://niftygateway.com/marketplace/collectible/{id}'
+    def _fetch(self, market: Union[Market, Explorer], id: str, func: Callable[[str], Tuple[NFTInfo, Exception]],
+               first: Tuple[NFTInfo, Exception] = None, started_at: float = None) -> NFTInfo:
+        # Retry func(id) as the policy allows. "first" is the result of the first attempt if it has been made elsewhere.
+        attempts = _Attempts(self, market, id, started_at)
+        while True:
+            if first is not None:
+                (nft, error), first = first, None
+            else:
+                nft, error = func(id)
+            # endif
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="root"]/div/div[1]/div/div/div[2]/div[1]/div/div[2]/h2') \
-                    .num_listing('//*[@id="tabpanel-0"]/div/div[1]/div/div[1]/p/b') \
-                    .num_owners('//*[@id="root"]/div/div[1]/div/div/div[2]/div[2]/div/div[3]/div[1]/div/h4/span') \
-                    .floor('//*[@id="root"]/div/div[1]/div/div/div[2]/div[2]/div/div[3]/div[2]/div/h4/span',
-                           lambda s: s.split(' ')[0]) \
-                    .volume('//*[@id="root"]/div/div[1]/div/div/div[2]/div[2]/div/div[3]/div[4]/div/h4/span',
-                            lambda s: s.split(' ')[0]) \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+            if nft is not None:
+                return attempts.succeeded(nft, error)
+            # endif
+            assert error is not None, f'nft: {nft}, error: {error}'
 
-        return nft, error
+            sec_wait = attempts.failed(error)
+            if sec_wait is None:
+                raise error
+            # endif
+            with attempts.backoff():
+                time.sleep(sec_wait)
+            # endwith
+        # endwhile
     # enddef
 
-    def _retrieve_jelly(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = 'https://jelly.xyz/'
+    def fetch_tabs(self, market: Union[Market, Explorer], ids: Sequence[str]) -> List[FetchResult]:
+        '''Fetch the information of several NFTs of a market in the tabs of a single browser.
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="theme-root-element"]/div[3]/div[1]/div/div[2]/div[1]/div[2]/h2') \
-                    .num_supply('//*[@id="radix-6-content-items"]/div/div[2]/div/div[1]/div[1]/div[1]/div[1]/div[2]') \
-                    .num_owners('//*[@id="radix-6-content-items"]/div/div[2]/div/div[1]/div[1]/div[1]/div[2]/div[2]') \
-                    .floor('//*[@id="radix-6-content-items"]/div/div[2]/div/div[1]/div[1]/div[1]/div[3]/div[2]') \
-                    .volume('//*[@id="radix-6-content-items"]/div/div[2]/div/div[1]/div[1]/div[1]/div[4]/div[2]') \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+        All the pages are opened in parallel tabs, and extracted in turn once ready. The NFTs that fail are retried
+        one by one as by fetch.
 
-        return nft, error
-    # enddef
+        Returns:
+            (List[nft_market.FetchResult]): In the order of "ids".
+        '''
+        func = self._retriever_of(market)
+        spec = self._specs[market]
 
-    def _retrieve_yumi(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://tppkg-ziaaa-aaaal-qatrq-cai.raw.ic0.app/market/collection-nft-list?id={id}'
+        started_at = time.monotonic()
+        try:
+            firsts = self._retrieve_many(spec, ids, self._engines.get(market, Engine.Selenium), market)
+        except Exception as e:
+            firsts = [(None, e)] * len(ids)
+        # endtry
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
+        results = []
+        for id, first in zip(ids, firsts):
             try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="App"]/section/div/div/div/div/div[1]/div[2]/div[2]') \
-                    .num_listing('//*[@id="App"]/section/div/div/div/div/div[1]/div[3]/div[1]/span[1]') \
-                    .num_owners('//*[@id="App"]/section/div/div/div/div/div[1]/div[3]/div[2]/span[1]') \
-                    .floor('//*[@id="App"]/section/div/div/div/div/div[1]/div[3]/div[3]/span[1]') \
-                    .volume('//*[@id="App"]/section/div/div/div/div/div[1]/div[3]/div[4]/span[1]') \
-                    .build()
+                results.append(FetchResult(market, id, self._fetch(market, id, func, first, started_at), None))
             except Exception as e:
-                error = e
+                results.append(FetchResult(market, id, None, e))
             # endtry
-        # endwith
+        # endfor
 
-        return nft, error
+        return results
     # enddef
 
-    def _retrieve_nftgeek(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url_base = f'https://t5t44-naaaa-aaaah-qcutq-cai.raw.ic0.app/collection/{id}'
-        url = f'{url_base}/summary'
+    def fetch_many(self, pairs: Iterable[Tuple[Union[Market, Explorer], str]], max_workers: int = None,
+                   market_limits: Dict[Union[Market, Explorer], int] = None, tabs: int = 1, window: int = None) -> FetchBatch:
+        '''Fetch the information of many NFTs concurrently.
+        Args:
+            pairs (Iterable[Tuple[Market, str]]): Pairs of a market and the ID of an NFT.
+            max_workers (int): The number of concurrent fetches. Defaults to the size of the session pool, which grows to
+                max_workers sessions otherwise.
+            market_limits (Dict[Market, int]): The maximum number of concurrent fetches for each market.
+            tabs (int): The number of NFTs of the same market fetched at once in the tabs of one browser (see
+                fetch_tabs). A fetch of several tabs counts as one towards max_workers and market_limits.
+            window (int): The maximum number of pairs read ahead of their results. By default, all the pairs are read
+                at once. With a window, a long or endless iterable is read as the results come out.
+
+        Returns:
+            (nft_market.FetchBatch): An iterator of nft_market.FetchResult in the order of completion.
+        '''
+        if max_workers is None:
+            max_workers = self.max_workers
+        # endif
 
-        concat_space = lambda s: s.replace(' ', '')
+        batch = FetchBatch(self, pairs, max_workers, market_limits or {}, tabs, window)
+        # A fetch holds a session, so the workers beyond the pool would only wait for one.
+        self.reserve(max_workers)
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="root"]/div[2]/div[2]/div/div/div[1]/div/div/span[1]') \
-                    .num_supply('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div[1]/div/div[2]/span',
-                                post=concat_space) \
-                    .num_listing('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div[6]/div/div[2]/span',
-                                 post=concat_space) \
-                    .floor('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div[2]/div/div[2]/span/span',
-                           post=concat_space) \
-                    .volume('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div[4]/div/div[2]/span',
-                            post=concat_space) \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
-        # endwith
+        return batch
+    # enddef
 
-        if error is None:
-            url_holders = f'{url_base}/holders'
-            with _WebFetcher(url_holders, **self.option) as driver:
-                try:
-                    nft_holders = NFTInfoBuilder(driver, id) \
-                        .name('//*[@id="root"]/div[2]/div[2]/div/div/div[1]/div/div/span[1]') \
-                        .num_owners('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div/div/div[2]',
-                                    post=concat_space) \
-                        .build()
-                    nft.num_owners = nft_holders.num_owners
-                except Exception as e:
-                    error = e
-                # endtry
-            # endwith
+    def reserve(self, num_sessions: int):
+        '''Let the session pool grow to "num_sessions" browser sessions, e.g. for as many concurrent fetches.'''
+        self._pool.grow(num_sessions)
+    # enddef
 
-            url_transactions = f'{url_base}/transactions'
-            with _WebFetcher(url_transactions, **self.option) as driver:
-                try:
-                    nft_transactions = NFTInfoBuilder(driver, id) \
-                        .name('//*[@id="root"]/div[2]/div[2]/div/div/div[1]/div/div/span[1]') \
-                        .days_from_last_trade('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[5]/div[2]/div/div/div/div/div/table/tbody/tr[2]/td[8]',
-                                              post=lambda s: (datetime.date.today() - datetime.datetime.strptime(f'{s} UTC', '%Y/%m/%d %I:%M:%S.%f %p %Z').date()) \
-                                                             / datetime.timedelta(days=1)) \
-                        .build()
-                    nft.days_from_last_trade = nft_transactions.days_from_last_trade
-                except Exception as e:
-                    error = e
-                # endtry
-            # endwith
+    def _retrieve(self, spec: MarketSpec, id: str, engine: Engine = Engine.Selenium, market: Union[Market, Explorer] = None) -> Tuple[NFTInfo, Exception]:
+        return self._retrieve_many(spec, [id], engine, market)[0]
+    # enddef
+
+    def _retrieve_many(self, spec: MarketSpec, ids: Sequence[str], engine: Engine = Engine.Selenium,
+                       market: Union[Market, Explorer] = None) -> List[Tuple[NFTInfo, Exception]]:
+        # (index of id, index of page) -> (values, error)
+        results = {}  # type: Dict[Tuple[int, int], Tuple[Dict[str, Any], Exception]]
+        if engine == Engine.HTTP and self._http is not None:
+            for j, id in enumerate(ids):
+                for i, page in enumerate(spec.pages):
+                    page_values, page_error = self._retrieve_page_http(page, id, market)
+                    if page_values is not None:
+                        results[(j, i)] = page_values, page_error
+                    elif self.verbose:
+                        print(f'[Warning] Falling back to the browser: {page_error}', file=sys.stderr)
+                    # endif
+                # endfor
+            # endfor
+        # endif
+
+        # The pages left are loaded in the tabs of one browser.
+        keys = [(j, i) for j in range(len(ids)) for i in range(len(spec.pages)) if (j, i) not in results]
+        if len(keys) > 0:
+            blocked = self._lean - spec.allow
+            results.update(zip(keys, self._retrieve_tabs([(spec.pages[i], ids[j]) for j, i in keys], blocked, market)))
         # endif
 
+        return [self._merge(spec, id, [results[(j, i)] for i in range(len(spec.pages))]) for j, id in enumerate(ids)]
+    # enddef
+
+    def _merge(self, spec: MarketSpec, id: str, results: List[Tuple[Dict[str, Any], Exception]]) -> Tuple[NFTInfo, Exception]:
+        values = {field: None for field in FIELDS}
+        error = None
+        for page, (page_values, page_error) in zip(spec.pages, results):
+            if page_values is None:
+                error = page_error
+                if page.required:
+                    return None, error
+                # endif
+            else:
+                values.update(page_values)
+            # endif
+        # endfor
+
+        try:
+            nft = NFTInfo(id=id, **values)
+        except Exception as e:
+            return None, e
+        # endtry
+
         return nft, error
     # enddef
 
-    def _retrieve_icscan(self, id: str) -> Tuple[NFTInfo, Exception]:
-        url = f'https://icscan.io/nft/collection/{id}'
+    def _retrieve_tabs(self, jobs: Sequence[Tuple[Page, str]], blocked: FrozenSet[Resource] = frozenset(),
+                       market: Union[Market, Explorer] = None) -> List[Tuple[Dict[str, Any], Exception]]:
+        # Load all the (page, id) in parallel tabs, and extract from each of them in turn.
+        results = []
+        fetcher = self._open([page.format_url(id) for page, id in jobs], blocked, market)
+        with fetcher as driver:
+            for i, (page, id) in enumerate(jobs):
+                values = None
+                error = None
+                try:
+                    fetcher.switch(i)
+                except Exception as e:
+                    results.append((None, e))
+                    continue
+                # endtry
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
-            error = None
-            try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[1]/div[1]/div/div[1]') \
-                    .num_supply('//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[2]/div[1]/div[2]/div[2]') \
-                    .num_listing('//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[2]/div[1]/div[3]/div[2]') \
-                    .num_owners('//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[1]/div[2]/div[2]',
-                                post=lambda s: s.split('\n')[0]) \
-                    .floor('//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[1]/div[1]/div[2]',
-                           post=lambda s: s.split(' ')[0]) \
-                    .volume('//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[2]/div[2]/div[1]/div[2]',
-                            post=lambda s: s.replace('ICP', '')) \
-                    .build()
-            except Exception as e:
-                error = e
-            # endtry
+                for selectors in page.compiled:
+                    error = None
+                    try:
+                        builder = self._builder(driver, id, fetcher.remaining(), market)
+                        for field, xpath, post in selectors:
+                            getattr(builder, field)(xpath, post)
+                        # endfor
+                        values = builder.resolve()
+                        break
+                    except Exception as e:
+                        error = e
+                        continue
+                    # endtry
+                # endfor
+
+                results.append((values, error))
+            # endfor
         # endwith
 
-        return nft, error
+        return results
     # enddef
 
-    def _retrieve_empty(self, id: str) -> Tuple[NFTInfo, Exception]:
-        raise NotImplementedError
-        url = f'{id}'
+    def _retrieve_page_http(self, page: Page, id: str, market: Union[Market, Explorer] = None) -> Tuple[Dict[str, Any], Exception]:
+        try:
+            with self.instrumentation.timer(market, Phase.HTTP):
+                html = self._http.get(page.format_url(id))
+            # endwith
+        except Exception as e:
+            return None, e
+        # endtry
 
-        nft = None
-        with _WebFetcher(url, **self.option) as driver:
+        from nft_market.http_engine import HTTPBuilder
+
+        values = None
+        for selectors in page.compiled:
             error = None
             try:
-                nft = NFTInfoBuilder(driver, id) \
-                    .name('') \
-                    .num_supply('') \
-                    .num_listing('') \
-                    .num_owners('') \
-                    .floor('') \
-                    .volume('') \
-                    .build()
+                builder = HTTPBuilder(html, id, self.instrumentation, market)
+                for field, xpath, post in selectors:
+                    getattr(builder, field)(xpath, post)
+                # endfor
+                values = builder.resolve()
+                break
             except Exception as e:
                 error = e
+                continue
             # endtry
-        # endwith
+        # endfor
 
-        return nft, error
+        return values, error
     # enddef
@@ -0,0 +1,54 @@
+import dataclasses
+import random
+import time
+from typing import *
+
+from nft_market.nftinfo import ParseError
+
+
+@dataclasses.dataclass(frozen=True)
+class RetryPolicy:
+    '''How Retriever retries a failed fetch.
+
+    The n-th retry waits a random time up to min(cap, base * multiplier ** n) seconds ("full jitter").
+    Retries stop after "num_retry" retries, on errors not to be retried, or when the next attempt would
+    start after "deadline" seconds from the beginning of the fetch.
+    '''
+    num_retry: int = 5
+    base: float = 10
+    multiplier: float = 2
+    cap: float = 120
+    jitter: bool = True
+    deadline: Optional[float] = None
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,)
+    giveup_on: Tuple[Type[BaseException], ...] = (ParseError,)
+
+    def should_retry(self, error: BaseException) -> bool:
+        return isinstance(error, self.retry_on) and not isinstance(error, self.giveup_on)
+    # enddef
+
+    def backoff(self, num_retry: int) -> float:
+        sec = min(self.cap, self.base * self.multiplier ** num_retry)
+        if self.jitter:
+            sec = random.uniform(0, sec)
+        # endif
+
+        return sec
+    # enddef
+
+    def next_wait(self, num_retry: int, error: BaseException, started_at: float) -> Optional[float]:
+        '''Return the seconds to wait before the "num_retry"-th retry (from 1), or None to give up.
+
+        "started_at" is the time.monotonic() when the fetch started.
+        '''
+        if num_retry > self.num_retry or not self.should_retry(error):
+            return None
+        # endif
+
+        sec = self.backoff(num_retry - 1)
+        if self.deadline is not None and time.monotonic() + sec - started_at >= self.deadline:
+            return None
+        # endif
+
+        return sec
+    # enddef
@@ -0,0 +1,280 @@
+import collections
+import dataclasses
+import heapq
+import itertools
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import *
+
+from nft_market.market import Explorer, Market, market_name
+from nft_market.retriever import FetchResult
+
+
+class TokenBucket:
+    '''A thread-safe token bucket allowing "rate" requests per minute, in bursts of up to "burst".'''
+
+    def __init__(self, rate: float, burst: int = 1):
+        # Checked here rather than in the dispatcher thread, which would die of it silently.
+        if not rate > 0:
+            raise ValueError(f'rate must be positive: {rate}')
+        # endif
+        if burst < 1:
+            raise ValueError(f'burst must be at least 1: {burst}')
+        # endif
+
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    # enddef
+
+    def try_acquire(self, now: float = None) -> float:
+        '''Take a token, and return 0. If none is left, return the seconds until one is.'''
+        if now is None:
+            now = time.monotonic()
+        # endif
+
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate / 60)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            # endif
+
+            return (1 - self._tokens) * 60 / self.rate
+        # endwith
+    # enddef
+
+
+@dataclasses.dataclass
+class SchedulerMetrics:
+    '''Metrics of a Scheduler. Rates and lags are over the last "window" seconds.
+
+    The lag of a fetch is how late it starts after it is due, including the time held back by the budget of its market.
+    '''
+    num_fetched: int
+    num_failed: int
+    throughput: float  # fetches per minute
+    throughput_by_market: Dict[str, float]
+    lag_mean: float
+    lag_max: float
+    backlog: int  # fetches due but not started
+    in_flight: int
+    window: float
+
+
+@dataclasses.dataclass
+class _Entry:
+    market: Union[Market, Explorer]
+    id: str
+    interval: float
+    due: float
+
+
+class Scheduler:
+    '''Fetches a watchlist of NFTs continuously, each every "interval" seconds, on a pool of workers.
+
+    Due fetches are kept in a priority queue. Requests to each market are held within a per-minute budget, and a fetch
+    held back by its market does not hold back the others.
+    '''
+
+    def __init__(self, retriever: Any, watchlist: Iterable[Tuple[Union[Market, Explorer], str, float]] = (),
+                 budgets: Dict[Union[Market, Explorer], float] = None, burst: int = 1, max_workers: int = None,
+                 on_result: Callable[[FetchResult], None] = None, window: float = 60):
+        '''
+        Args:
+            retriever: Retriever, CachedRetriever or anything with fetch.
+            watchlist (Iterable[Tuple[Market, str, float]]): (market, id, interval in seconds)
+            budgets (Dict[Market, float]): Requests per minute to each market. Markets without a budget are not limited.
+            max_workers (int): The max_workers of the retriever by default.
+            on_result (Callable[[FetchResult], None]): Called from the workers with each result, including failures.
+        '''
+        if max_workers is None:
+            max_workers = retriever.max_workers
+        # endif
+
+        self.retriever = retriever
+        self.max_workers = max_workers
+        self.on_result = on_result
+        self.window = window
+        self._buckets = {market: TokenBucket(rate, burst) for market, rate in (budgets or {}).items()}
+
+        self._entries = {}  # type: Dict[Tuple[Union[Market, Explorer], str], _Entry]
+        # (time to start, seq, entry)
+        self._queue = []  # type: List[Tuple[float, int, _Entry]]
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._stopped = False
+        self._thread = None  # type: Optional[threading.Thread]
+        self._started_at = None  # type: Optional[float]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='nft_market_scheduler')
+
+        self._num_fetched = 0
+        self._num_failed = 0
+        # (finished at, market, lag)
+        self._recent = collections.deque()  # type: Deque[Tuple[float, Union[Market, Explorer], float]]
+
+        for market, id, interval in watchlist:
+            self.add(market, id, interval)
+        # endfor
+    # enddef
+
+    def __enter__(self) -> 'Scheduler':
+        self.start()
+        return self
+    # enddef
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+    # enddef
+
+    def add(self, market: Union[Market, Explorer], id: str, interval: float):
+        '''Fetch an NFT every "interval" seconds, starting now. Adding it again changes the interval.'''
+        with self._cond:
+            entry = _Entry(market, id, interval, due=time.monotonic())
+            self._entries[(market, id)] = entry
+            heapq.heappush(self._queue, (entry.due, next(self._counter), entry))
+            self._cond.notify_all()
+        # endwith
+    # enddef
+
+    def remove(self, market: Union[Market, Explorer], id: str):
+        # Entries left in the queue are skipped when they come out.
+        with self._cond:
+            self._entries.pop((market, id), None)
+        # endwith
+    # enddef
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._started_at = time.monotonic()
+                self._thread = threading.Thread(target=self._dispatch, name='nft_market_scheduler', daemon=True)
+                self._thread.start()
+            # endif
+        # endwith
+    # enddef
+
+    def stop(self, wait: bool = True):
+        '''Stop dispatching, and wait for the fetches in flight if "wait".'''
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        # endwith
+
+        if self._thread is not None and wait:
+            self._thread.join()
+        # endif
+        self._executor.shutdown(wait=wait)
+    # enddef
+
+    def _is_live(self, entry: _Entry) -> bool:
+        return self._entries.get((entry.market, entry.id)) is entry
+    # enddef
+
+    def _dispatch(self):
+        with self._cond:
+            while not self._stopped:
+                while len(self._queue) > 0 and not self._is_live(self._queue[0][2]):
+                    heapq.heappop(self._queue)
+                # endwhile
+
+                if len(self._queue) == 0 or self._in_flight >= self.max_workers:
+                    self._cond.wait()
+                    continue
+                # endif
+
+                now = time.monotonic()
+                start_at, _, entry = self._queue[0]
+                if start_at > now:
+                    self._cond.wait(start_at - now)
+                    continue
+                # endif
+
+                heapq.heappop(self._queue)
+                bucket = self._buckets.get(entry.market)
+                sec = bucket.try_acquire(now) if bucket is not None else 0.0
+                if sec > 0:
+                    # Held back by the budget of the market. Entries of other markets may go first.
+                    heapq.heappush(self._queue, (now + sec, next(self._counter), entry))
+                    continue
+                # endif
+
+                self._in_flight += 1
+                self._executor.submit(self._run, entry, now - entry.due)
+            # endwhile
+        # endwith
+    # enddef
+
+    def _run(self, entry: _Entry, lag: float):
+        try:
+            result = FetchResult(entry.market, entry.id, self.retriever.fetch(entry.market, entry.id), None)
+        except Exception as e:
+            result = FetchResult(entry.market, entry.id, None, e)
+        # endtry
+
+        if self.on_result is not None:
+            try:
+                self.on_result(result)
+            except Exception as e:
+                print(f'[Warning] on_result failed for "{market_name(entry.market)}:{entry.id}": {e!r}', file=sys.stderr)
+            # endtry
+        # endif
+
+        with self._cond:
+            now = time.monotonic()
+            self._in_flight -= 1
+            self._num_fetched += 1
+            if not result.ok:
+                self._num_failed += 1
+            # endif
+            self._recent.append((now, entry.market, lag))
+            self._trim(now)
+
+            if self._is_live(entry):
+                # Missed runs are not caught up on.
+                entry.due = max(entry.due + entry.interval, now)
+                heapq.heappush(self._queue, (entry.due, next(self._counter), entry))
+            # endif
+            self._cond.notify_all()
+        # endwith
+    # enddef
+
+    def _trim(self, now: float):
+        while len(self._recent) > 0 and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+        # endwhile
+    # enddef
+
+    def metrics(self) -> SchedulerMetrics:
+        with self._cond:
+            now = time.monotonic()
+            self._trim(now)
+
+            by_market = collections.Counter(market_name(market) for _, market, _ in self._recent)
+            lags = [lag for _, _, lag in self._recent]
+            # Shorter than the window right after the start.
+            span = min(self.window, now - self._started_at) if self._started_at is not None else self.window
+            span = max(span, 1e-9)
+            # Time held back by budgets counts as well.
+            backlog = [now - entry.due for _, _, entry in self._queue if self._is_live(entry) and entry.due <= now]
+
+            return SchedulerMetrics(
+                num_fetched=self._num_fetched,
+                num_failed=self._num_failed,
+                throughput=len(self._recent) * 60 / span,
+                throughput_by_market={market: n * 60 / span for market, n in by_market.items()},
+                lag_mean=sum(lags) / len(lags) if len(lags) > 0 else 0.0,
+                lag_max=max(lags + backlog) if len(lags + backlog) > 0 else 0.0,
+                backlog=len(backlog),
+                in_flight=self._in_flight,
+                window=self.window,
+                )
+        # endwith
+    # enddef
@@ -0,0 +1,205 @@
+import contextlib
+import json
+import struct
+from typing import *
+
+from nft_market.nftinfo import NFTINFO_FIELDS, NFTInfo
+from nft_market.store import MISSING, from_missing, to_missing
+
+PathOrFile = Union[str, IO]
+
+# Records are written and read in chunks of this many.
+BATCH_SIZE = 65536
+
+_MAGIC = b'NFTI\x01'
+# len(id), len(name), num_supply, num_listing, num_owners, floor, volume, days_from_last_trade, followed by id and name in UTF-8
+_HEADER = struct.Struct('<HHqqqddq')
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+@contextlib.contextmanager
+def _open(path_or_file: PathOrFile, mode: str) -> Iterator[IO]:
+    if isinstance(path_or_file, str):
+        with open(path_or_file, mode, **({} if 'b' in mode else {'encoding': 'utf-8', 'newline': '\n'})) as f:
+            yield f
+        # endwith
+    else:
+        yield path_or_file
+    # endif
+# enddef
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for x in iterable:
+        chunk.append(x)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+        # endif
+    # endfor
+    if len(chunk) > 0:
+        yield chunk
+    # endif
+# enddef
+
+
+def write_jsonl(nfts: Iterable[NFTInfo], path_or_file: PathOrFile) -> int:
+    '''Write NFTInfo as JSON Lines, and return how many are written.'''
+    n = 0
+    encode = _ENCODER.encode
+    with _open(path_or_file, 'w') as f:
+        for chunk in _chunks(nfts, BATCH_SIZE):
+            f.write(''.join([encode(dict(zip(NFTINFO_FIELDS, nft.to_tuple()))) + '\n' for nft in chunk]))
+            n += len(chunk)
+        # endfor
+    # endwith
+
+    return n
+# enddef
+
+
+def read_jsonl(path_or_file: PathOrFile) -> Iterator[NFTInfo]:
+    decode = json.JSONDecoder().decode
+    with _open(path_or_file, 'r') as f:
+        for line in f:
+            if line.isspace():
+                continue
+            # endif
+
+            d = decode(line)
+            yield NFTInfo(d['id'], d['name'], d.get('num_supply'), d.get('num_listing'), d.get('num_owners'), d['floor'], d['volume'],
+                          d.get('days_from_last_trade'))
+        # endfor
+    # endwith
+# enddef
+
+
+def write_binary(nfts: Iterable[NFTInfo], path_or_file: PathOrFile) -> int:
+    '''Write NFTInfo in the binary format, and return how many are written.
+
+    Missing integers are stored as MISSING (-1), so a real value of -1 is read back as None, and IDs and names must be shorter than 64 KiB in UTF-8.
+    '''
+    n = 0
+    pack = _HEADER.pack
+    with _open(path_or_file, 'wb') as f:
+        f.write(_MAGIC)
+        for chunk in _chunks(nfts, BATCH_SIZE):
+            buf = bytearray()
+            for nft in chunk:
+                id = nft.id.encode('utf-8')
+                name = nft.name.encode('utf-8')
+                buf += pack(len(id), len(name), to_missing(nft.num_supply), to_missing(nft.num_listing), to_missing(nft.num_owners),
+                            nft.floor, nft.volume, to_missing(nft.days_from_last_trade))
+                buf += id
+                buf += name
+            # endfor
+            f.write(buf)
+            n += len(chunk)
+        # endfor
+    # endwith
+
+    return n
+# enddef
+
+
+def read_binary(path_or_file: PathOrFile) -> Iterator[NFTInfo]:
+    with _open(path_or_file, 'rb') as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError('Not a binary file of NFTInfo.')
+        # endif
+
+        # Decode the records in blocks, carrying a partial record over to the next block.
+        unpack_from = _HEADER.unpack_from
+        size = _HEADER.size
+        buf = b''
+        while True:
+            block = f.read(1 << 20)
+            if len(block) == 0:
+                break
+            # endif
+            buf = buf + block if len(buf) > 0 else block
+
+            i = 0
+            while i + size <= len(buf):
+                len_id, len_name, num_supply, num_listing, num_owners, floor, volume, days = unpack_from(buf, i)
+                end = i + size + len_id + len_name
+                if end > len(buf):
+                    break
+                # endif
+
+                yield NFTInfo(buf[i + size:i + size + len_id].decode('utf-8'), buf[i + size + len_id:end].decode('utf-8'),
+                              from_missing(num_supply), from_missing(num_listing), from_missing(num_owners), floor, volume,
+                              from_missing(days))
+                i = end
+            # endwhile
+            buf = buf[i:]
+        # endwhile
+
+        if len(buf) > 0:
+            raise ValueError('The binary file of NFTInfo is truncated.')
+        # endif
+    # endwith
+# enddef
+
+
+def arrow_schema() -> Any:
+    '''The pyarrow.Schema of NFTInfo.'''
+    import pyarrow as pa
+
+    return pa.schema([
+        ('id', pa.string()),
+        ('name', pa.string()),
+        ('num_supply', pa.int64()),
+        ('num_listing', pa.int64()),
+        ('num_owners', pa.int64()),
+        ('floor', pa.float64()),
+        ('volume', pa.float64()),
+        ('days_from_last_trade', pa.int64()),
+        ])
+# enddef
+
+
+def to_arrow_batches(nfts: Iterable[NFTInfo], batch_size: int = BATCH_SIZE) -> Iterator[Any]:
+    '''NFTInfo as pyarrow.RecordBatch of up to "batch_size" rows.'''
+    import pyarrow as pa
+
+    schema = arrow_schema()
+    for chunk in _chunks(nfts, batch_size):
+        columns = zip(*[nft.to_tuple() for nft in chunk])
+        yield pa.RecordBatch.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+    # endfor
+# enddef
+
+
+def to_arrow(nfts: Iterable[NFTInfo]) -> Any:
+    '''NFTInfo as a pyarrow.Table.'''
+    import pyarrow as pa
+
+    return pa.Table.from_batches(list(to_arrow_batches(nfts)), schema=arrow_schema())
+# enddef
+
+
+def write_parquet(nfts: Iterable[NFTInfo], path_or_file: PathOrFile, batch_size: int = BATCH_SIZE, compression: str = 'zstd') -> int:
+    '''Write NFTInfo to a Parquet file, one row group per "batch_size" rows, and return how many are written.'''
+    import pyarrow.parquet as pq
+
+    n = 0
+    with pq.ParquetWriter(path_or_file, arrow_schema(), compression=compression) as writer:
+        for batch in to_arrow_batches(nfts, batch_size):
+            writer.write_batch(batch)
+            n += batch.num_rows
+        # endfor
+    # endwith
+
+    return n
+# enddef
+
+
+def read_parquet(path_or_file: PathOrFile, batch_size: int = BATCH_SIZE) -> Iterator[NFTInfo]:
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path_or_file).iter_batches(batch_size=batch_size, columns=list(NFTINFO_FIELDS)):
+        yield from NFTInfo.from_columns(batch.to_pydict())
+    # endfor
+# enddef
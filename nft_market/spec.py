@@ -0,0 +1,297 @@
+import dataclasses
+import datetime
+from enum import Enum, auto
+from typing import *
+
+from nft_market.market import Explorer, Market
+
+
+class Resource(Enum):
+    # Resources that scrapers never read, and can be blocked by a lean browser profile.
+    Image = auto()
+    Media = auto()
+    Font = auto()
+    Tracker = auto()
+
+
+def _days_from_nftgeek_date(s: str) -> float:
+    date = datetime.datetime.strptime(f'{s} UTC', '%Y/%m/%d %I:%M:%S.%f %p %Z').date()
+    return (datetime.date.today() - date) / datetime.timedelta(days=1)
+# enddef
+
+
+# Post-processors that can be referred to by name, e.g. from MarketSpec.from_dict.
+POSTS = {
+    'first_line': lambda s: s.split('\n')[0],
+    'first_word': lambda s: s.split(' ')[0],
+    'no_space': lambda s: s.replace(' ', ''),
+    'strip_sol': lambda s: s.strip(' ◎'),
+    'strip_eth': lambda s: s.replace('ETH', ''),
+    'strip_icp': lambda s: s.replace('ICP', ''),
+    'strip_results': lambda s: s.replace('results', ''),
+    'na_to_none': lambda s: None if s == 'N/A' else s,
+    'days_from_nftgeek_date': _days_from_nftgeek_date,
+    }  # type: Dict[str, Callable[[str], Optional[str]]]
+
+FIELDS = ('name', 'num_supply', 'num_listing', 'num_owners', 'floor', 'volume', 'days_from_last_trade')
+
+
+@dataclasses.dataclass(frozen=True)
+class Selector:
+    xpath: str
+    post: Union[str, Callable[[str], Optional[str]], None] = None
+
+    def __post_init__(self):
+        if isinstance(self.post, str):
+            object.__setattr__(self, 'post', POSTS[self.post])
+        # endif
+    # enddef
+
+
+@dataclasses.dataclass(frozen=True)
+class Page:
+    '''A page to be scraped.
+
+    "url" is either a template formatted with the ID of an NFT, or a function of the ID.
+    Selectors are given as an XPath, a pair of an XPath and a post-processor, or a Selector.
+    If there are several variants, XPaths are formatted with each of them until one of them succeeds.
+    '''
+    url: Union[str, Callable[[str], str]]
+    selectors: Mapping[str, Union[str, Tuple[str, Any], Selector]]
+    variants: Sequence[Mapping[str, Any]] = ({},)
+    # Whether the fetch fails when this page fails. Otherwise, a partial result is returned.
+    required: bool = True
+
+    def __post_init__(self):
+        selectors = {}
+        for field, selector in self.selectors.items():
+            if field not in FIELDS:
+                raise ValueError(f'Unknown field: {field}')
+            # endif
+
+            if isinstance(selector, str):
+                selector = Selector(selector)
+            elif not isinstance(selector, Selector):
+                selector = Selector(*selector)
+            # endif
+            selectors[field] = selector
+        # endfor
+        object.__setattr__(self, 'selectors', selectors)
+        object.__setattr__(self, 'variants', tuple(self.variants))
+
+        # Format the XPaths of every variant once.
+        compiled = tuple(tuple((field, s.xpath.format(**variant), s.post) for field, s in selectors.items())
+                         for variant in self.variants)
+        object.__setattr__(self, 'compiled', compiled)
+    # enddef
+
+    def format_url(self, id: str) -> str:
+        if callable(self.url):
+            return self.url(id)
+        else:
+            return self.url.format(id=id)
+        # endif
+    # enddef
+
+
+@dataclasses.dataclass(frozen=True)
+class MarketSpec:
+    pages: Sequence[Page]
+    deprecated: bool = False
+    # Resources the market needs even with a lean browser profile.
+    allow: AbstractSet[Resource] = frozenset()
+
+    def __post_init__(self):
+        object.__setattr__(self, 'pages', tuple(self.pages))
+        object.__setattr__(self, 'allow', frozenset(self.allow))
+    # enddef
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> 'MarketSpec':
+        '''Build a spec from plain data, e.g. loaded from JSON.
+
+        {"url": "https://example.com/collection/{id}",
+         "selectors": {"name": "//h1", "floor": ["//*[@id='floor']", "strip_eth"], ...},
+         "variants": [{"c": 1}, {"c": 2}]}
+
+        Several pages can also be given as a list in "pages". Post-processors are referred to by their names in POSTS,
+        and resources in "allow" by their names in Resource.
+        '''
+        pages = d['pages'] if 'pages' in d else [d]
+        return cls(pages=[Page(url=p['url'],
+                               selectors=p['selectors'],
+                               variants=p.get('variants', ({},)),
+                               required=p.get('required', True)) for p in pages],
+                   deprecated=d.get('deprecated', False),
+                   allow=[Resource[name] for name in d.get('allow', [])])
+    # enddef
+
+
+def _single(url: Union[str, Callable[[str], str]], selectors: Mapping[str, Any], variants: Sequence[Mapping[str, Any]] = ({},),
+            deprecated: bool = False) -> MarketSpec:
+    return MarketSpec(pages=[Page(url, selectors, variants)], deprecated=deprecated)
+# enddef
+
+
+_NFTGEEK = 'https://t5t44-naaaa-aaaah-qcutq-cai.raw.ic0.app/collection/{id}'
+
+REGISTRY = {
+    Market.OpenSea: _single('https://opensea.io/collection/{id}', {
+        'name': '//*[@id="main"]/div/div/div/div[3]/div/div/div[1]/div/div[2]/h1',
+        'num_supply': '//*[@id="main"]/div/div/div/div[5]/div/div[1]/div/div[1]/div[1]/span/div[2]/span/div/span[1]/div/div[2]/span/div/div[2]/span',
+        'floor': ('//*[@id="main"]/div/div/div/div[5]/div/div[1]/div/div[2]/div[3]/div/div[6]/a/div/span[1]/div', 'first_line'),
+        'volume': ('//*[@id="main"]/div/div/div/div[5]/div/div[1]/div/div[2]/div[3]/div/div[3]/a/div/span[1]/div', 'first_line'),
+        }),
+    Market.tofuNFT: _single('https://tofunft.com/collection/{id}/items', {
+        'name': '//*[@id="__next"]/div[2]/div[1]/div[1]/h1',
+        'num_listing': '//*[@id="__next"]/div[2]/div[1]/div[2]/div[1]/div[3]/div[2]',
+        'num_owners': '//*[@id="__next"]/div[2]/div[1]/div[2]/div[1]/div[2]/div[2]',
+        'floor': '//*[@id="__next"]/div[2]/div[1]/div[2]/div[1]/div[5]/div[2]',
+        'volume': '//*[@id="__next"]/div[2]/div[1]/div[2]/div[1]/div[4]/div[2]',
+        }),
+    Market.PancakeSwap: _single('https://pancakeswap.finance/nfts/collections/{id}', {
+        'name': '//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[1]/h1',
+        'num_supply': '//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[2]/div/div[1]/div[2]',
+        'num_listing': '//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[2]/div/div[2]/div[2]',
+        'floor': '//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[2]/div/div[3]/div[2]',
+        'volume': '//*[@id="__next"]/div[1]/div[3]/div/div[1]/div/div[3]/div[2]/div/div[4]/div[2]',
+        }),
+    # Seems that "named" projects have a different URL schema.
+    Market.Rarible: _single(lambda id: f'https://rarible.com/collection/{id}' if id.startswith('0x') else f'https://rarible.com/{id}/items', {
+        'name': '//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[2]/div/div/span',
+        'num_supply': '//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[3]/div/div[1]/div[3]/div/span',
+        'num_owners': '//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[3]/div/div[1]/div[4]/div/span',
+        'floor': ('//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[3]/div/div[1]/div[1]/div/span', 'strip_eth'),
+        'volume': ('//*[@id="root"]/div[2]/div/div/div[2]/div/div/div[1]/div[3]/div/div[1]/div[2]/div/span', 'strip_eth'),
+        }),
+    Market.GhostMarket: _single('https://ghostmarket.io/collection/{id}/?tab=nfts', {
+        'name': '//*[@id="__layout"]/div/section/div/div[1]/div[3]/span[1]',
+        'num_supply': '//*[@id="__layout"]/div/section/div/div[2]/div[1]/div/div[1]/span/div[2]/div/div/div[1]',
+        'num_owners': '//*[@id="__layout"]/div/section/div/div[2]/div[1]/div/div[2]/span/div[2]/div/div/div[1]',
+        'floor': '//*[@id="__layout"]/div/section/div/div[2]/div[1]/div/div[3]/{c_floor}div/div/div[1]',
+        'volume': '//*[@id="__layout"]/div/section/div/div[2]/div[1]/div/div[4]/{c_floor}div/div/div[1]',
+        }, variants=[{'c_floor': 'span/div[2]/'}, {'c_floor': ''}]),
+    Market.Cryptocom: _single('https://crypto.com/nft/collection/{id}', {
+        'name': '//*[@id="root"]/div[1]/div/div[3]/div/div[1]/div[2]',
+        'num_listing': '//*[@id="root"]/div[1]/div/div[3]/div/div[3]/div/div[1]/span',
+        'num_owners': '//*[@id="root"]/div[1]/div/div[3]/div/div[3]/div/div[2]/span',
+        'floor': '//*[@id="root"]/div[1]/div/div[3]/div/div[3]/div/div[3]/div/div[2]/div/span[2]/div',
+        'volume': '//*[@id="root"]/div[1]/div/div[3]/div/div[3]/div/div[4]/div/span[2]/div',
+        }),
+    Market.Gem: _single('https://www.gem.xyz/collection/{id}', {
+        'name': '//*[@id="app"]/div/div[2]/div[2]/div[1]/div/div[1]/div/div[1]/div[1]/div',
+        'num_listing': ('//*[@id="app"]/div/div[2]/div[2]/div[1]/div/div[2]/div/div[1]/div[2]/div[1]/div/div[2]/div[1]', 'strip_results'),
+        'floor': '//*[@id="app"]/div/div[2]/div[2]/div[1]/div/div[1]/div/div[1]/div[2]/span[3]/span[2]',
+        'volume': '//*[@id="app"]/div/div[2]/div[2]/div[1]/div/div[1]/div/div[1]/div[2]/span[1]/span[2]',
+        }),
+    Market.NFTrade: _single('https://nftrade.com/assets/{id}', {
+        'name': '//*[@id="__next"]/div/main/div/div/div[1]/div[1]/div[3]/div[1]/div[2]/div[1]/div[1]',
+        'floor': '//*[@id="__next"]/div/main/div/div/div[1]/div[1]/div[4]/div[2]/div[1]/div[2]',
+        'volume': '//*[@id="__next"]/div/main/div/div/div[1]/div[1]/div[4]/div[2]/div[4]/div[2]',
+        }),
+    Market.Solanart: _single('https://solanart.io/collections/{id}?tab=items', {
+        'name': '//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[1]/h2',
+        'num_supply': '//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[2]/div[1]/div[1]',
+        'num_owners': '//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[2]/div[3]/div[1]',
+        'floor': ('//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[2]/div[5]/div[1]', 'strip_sol'),
+        'volume': ('//*[@id="__next"]/div/div[1]/div[2]/div[2]/div[2]/div[2]/div[2]/div[7]/div[1]', 'strip_sol'),
+        }),
+    Market.MagicEden: _single('https://magiceden.io/marketplace/{id}', {
+        'name': '//*[@id="root"]/div/div/div/div[3]/div[2]/div[1]/div/h1',
+        'num_listing': '//*[@id="root"]/div/div/div/div[3]/div[2]/div[1]/div/div[4]/div/div/div[4]/div/span[2]',
+        'floor': ('//*[@id="root"]/div/div/div/div[3]/div[2]/div[1]/div/div[4]/div/div/div[1]/div/span[2]', 'strip_sol'),
+        'volume': ('//*[@id="root"]/div/div/div/div[3]/div[2]/div[1]/div/div[4]/div/div/div[2]/div/span[2]', 'strip_sol'),
+        }),
+    Market.XANALIA: _single('https://www.xanalia.com/{id}', {
+        'name': '//*[@id="home-page"]/div/div/div/div[2]/div/div[1]',
+        'num_supply': '//*[@id="home-page"]/div/div/div/div[2]/div/div[2]/div[1]/h5',
+        'num_owners': '//*[@id="home-page"]/div/div/div/div[2]/div/div[2]/div[2]/h5',
+        'floor': '//*[@id="home-page"]/div/div/div/div[2]/div/div[2]/div[3]/h5',
+        'volume': '//*[@id="home-page"]/div/div/div/div[2]/div/div[2]/div[4]/h5',
+        }),
+    Market.Coinbase: _single('https://nft.coinbase.com/collection/{id}', {
+        'name': '//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/h1/span/span[1]',
+        'num_listing': '//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/div[2]/div/div[1]/span[1]',
+        'num_owners': '//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/div[2]/div/div[2]/span[1]',
+        'floor': ('//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/div[2]/div/div[3]/span[1]/div/div/div/span[1]', 'strip_eth'),
+        'volume': ('//*[@id="app"]/div[3]/div/div/main/div[1]/div[2]/div[2]/div/div[4]/span[1]', 'strip_eth'),
+        }),
+    Market.NiftyGateway: _single('https://niftygateway.com/marketplace/collectible/{id}', {
+        'name': '//*[@id="root"]/div/div[1]/div/div/div[2]/div[1]/div/div[2]/h2',
+        'num_listing': '//*[@id="tabpanel-0"]/div/div[1]/div/div[1]/p/b',
+        'num_owners': '//*[@id="root"]/div/div[1]/div/div/div[2]/div[2]/div/div[3]/div[1]/div/h4/span',
+        'floor': ('//*[@id="root"]/div/div[1]/div/div/div[2]/div[2]/div/div[3]/div[2]/div/h4/span', 'first_word'),
+        'volume': ('//*[@id="root"]/div/div[1]/div/div/div[2]/div[2]/div/div[3]/div[4]/div/h4/span', 'first_word'),
+        }),
+    # deprecated
+    Market.Entrepot: _single('https://entrepot.app/marketplace/{id}', {
+        'name': '//*[@id="root"]/main/div/div[1]/div/div[1]/div/div[3]/h1',
+        'num_listing': '//*[@id="root"]/main/div/div[1]/div/div[1]/div/div[2]/div[1]/div/div[2]/strong',
+        'floor': '//*[@id="mainListings"]/div[2]/div/div[2]/div[2]/div/div[1]/div/a/div[{c1}]/div/div[4]/p',
+        'volume': '//*[@id="root"]/main/div/div[1]/div/div[1]/div/div[2]/div[1]/div/div[1]/strong',
+        }, variants=[{'c1': 2}, {'c1': 3}], deprecated=True),
+    Market.CetoSwap: _single('https://7pnex-saaaa-aaaai-qbhwa-cai.raw.ic0.app/#/nftmarket/{id}', {
+        'name': '//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[1]',
+        'num_supply': '//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[5]/div/div/div/div[1]',
+        'num_listing': '//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[1]/div/div/div/div[1]',
+        'num_owners': '//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[2]/div/div/div/div[1]',
+        'floor': '//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[3]/div/div/div/div[1]/div/div',
+        'volume': '//*[@id="root"]/section/section/main/div/div[2]/div[1]/div[3]/div[4]/div/div/div/div[1]/div/div',
+        }, deprecated=True),
+    Market.CCC: _single('https://skeh5-daaaa-aaaai-aar4q-cai.raw.ic0.app/#/collection/{id}', {
+        'name': '//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[2]/h2',
+        'num_supply': '//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[5]/div[2]',
+        'num_listing': '//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[2]/div[2]',
+        'num_owners': ('//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[4]/div[2]', 'na_to_none'),
+        'floor': '//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[3]/div[2]/div',
+        'volume': '//*[@id="app"]/div[1]/div[2]/main/div/div[1]/div[3]/div[1]/div[2]/div',
+        }, deprecated=True),
+    Market.Jelly: _single('https://jelly.xyz/', {
+        'name': '//*[@id="theme-root-element"]/div[3]/div[1]/div/div[2]/div[1]/div[2]/h2',
+        'num_supply': '//*[@id="radix-6-content-items"]/div/div[2]/div/div[1]/div[1]/div[1]/div[1]/div[2]',
+        'num_owners': '//*[@id="radix-6-content-items"]/div/div[2]/div/div[1]/div[1]/div[1]/div[2]/div[2]',
+        'floor': '//*[@id="radix-6-content-items"]/div/div[2]/div/div[1]/div[1]/div[1]/div[3]/div[2]',
+        'volume': '//*[@id="radix-6-content-items"]/div/div[2]/div/div[1]/div[1]/div[1]/div[4]/div[2]',
+        }, deprecated=True),
+    Market.YUMI: _single('https://tppkg-ziaaa-aaaal-qatrq-cai.raw.ic0.app/market/collection-nft-list?id={id}', {
+        'name': '//*[@id="App"]/section/div/div/div/div/div[1]/div[2]/div[2]',
+        'num_listing': '//*[@id="App"]/section/div/div/div/div/div[1]/div[3]/div[1]/span[1]',
+        'num_owners': '//*[@id="App"]/section/div/div/div/div/div[1]/div[3]/div[2]/span[1]',
+        'floor': '//*[@id="App"]/section/div/div/div/div/div[1]/div[3]/div[3]/span[1]',
+        'volume': '//*[@id="App"]/section/div/div/div/div/div[1]/div[3]/div[4]/span[1]',
+        }, deprecated=True),
+    Explorer.NFTgeek: MarketSpec(pages=[
+        Page(f'{_NFTGEEK}/summary', {
+            'name': '//*[@id="root"]/div[2]/div[2]/div/div/div[1]/div/div/span[1]',
+            'num_supply': ('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div[1]/div/div[2]/span', 'no_space'),
+            'num_listing': ('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div[6]/div/div[2]/span', 'no_space'),
+            'floor': ('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div[2]/div/div[2]/span/span', 'no_space'),
+            'volume': ('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div[4]/div/div[2]/span', 'no_space'),
+            }),
+        Page(f'{_NFTGEEK}/holders', {
+            'num_owners': ('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[3]/div/div/div/div[2]', 'no_space'),
+            }, required=False),
+        Page(f'{_NFTGEEK}/transactions', {
+            'days_from_last_trade': ('//*[@id="root"]/div[2]/div[2]/div/div/div[2]/div[5]/div[2]/div/div/div/div/div/table/tbody/tr[2]/td[8]',
+                                     'days_from_nftgeek_date'),
+            }, required=False),
+        ]),
+    Explorer.ICScan: _single('https://icscan.io/nft/collection/{id}', {
+        'name': '//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[1]/div[1]/div/div[1]',
+        'num_supply': '//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[2]/div[1]/div[2]/div[2]',
+        'num_listing': '//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[2]/div[1]/div[3]/div[2]',
+        'num_owners': ('//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[1]/div[2]/div[2]', 'first_line'),
+        'floor': ('//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[1]/div[1]/div[2]', 'first_word'),
+        'volume': ('//*[@id="__next"]/div/div/main/div[2]/div[4]/div/div[2]/div[2]/div[2]/div[1]/div[2]', 'strip_icp'),
+        }),
+    }  # type: Dict[Hashable, MarketSpec]
+
+
+def register_market(market: Hashable, spec: Union[MarketSpec, Mapping[str, Any]]):
+    '''Register (or replace) the spec of a market. A market can be any hashable, e.g. a string.'''
+    if not isinstance(spec, MarketSpec):
+        spec = MarketSpec.from_dict(spec)
+    # endif
+
+    REGISTRY[market] = spec
+# enddef
@@ -0,0 +1,284 @@
+import array
+import bisect
+import dataclasses
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from typing import *
+
+from nft_market.market import Explorer, Market, market_name, parse_market
+from nft_market.nftinfo import NFTInfo
+
+# Stored in place of None in the integer columns. A real value of -1, e.g. days_from_last_trade of a trade dated in UTC
+# ahead of the local date, is read back as None as well.
+MISSING = -1
+
+# timestamp, key, num_supply, num_listing, num_owners, floor, volume, days_from_last_trade
+_RECORD = struct.Struct('<dIqqqddq')
+_COLUMNS = ('timestamp', 'key', 'num_supply', 'num_listing', 'num_owners', 'floor', 'volume', 'days_from_last_trade')
+_TYPECODES = ('d', 'I', 'q', 'q', 'q', 'd', 'd', 'q')
+
+
+@dataclasses.dataclass
+class History:
+    '''Snapshots of one NFT as columns. Missing integers are MISSING.'''
+    market: Union[Market, Explorer, str]
+    id: str
+    name: str
+    timestamp: array.array
+    num_supply: array.array
+    num_listing: array.array
+    num_owners: array.array
+    floor: array.array
+    volume: array.array
+    days_from_last_trade: array.array
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+    # enddef
+
+    def to_numpy(self) -> Dict[str, Any]:
+        '''The columns as NumPy arrays, with masked arrays for the integer columns.'''
+        import numpy as np
+
+        columns = {}
+        for column in _COLUMNS:
+            if column == 'key':
+                continue
+            # endif
+
+            a = np.frombuffer(getattr(self, column), dtype=np.float64 if column in ('timestamp', 'floor', 'volume') else np.int64)
+            if a.dtype == np.int64:
+                a = np.ma.masked_equal(a, MISSING)
+            # endif
+            columns[column] = a
+        # endfor
+
+        return columns
+    # enddef
+
+
+class SnapshotStore:
+    '''An append-only, on-disk time series of NFTInfo.
+
+    Snapshots are stored as fixed-width binary records in "<path>.rows", in the order of time, and read through mmap,
+    so that a query only touches the records within its time range. Markets, IDs and names are kept in "<path>.keys".
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        # (market name, id) -> key, and key -> [market name, id, name]
+        self._keys = {}  # type: Dict[Tuple[str, str], int]
+        self._entries = []  # type: List[List[str]]
+        if os.path.exists(f'{path}.keys'):
+            with open(f'{path}.keys', 'r', encoding='utf-8') as f:
+                for line in f:
+                    key, market, id, name = json.loads(line)
+                    if key == len(self._entries):
+                        self._entries.append([market, id, name])
+                        self._keys[(market, id)] = key
+                    else:
+                        # A renamed NFT.
+                        self._entries[key][2] = name
+                    # endif
+                # endfor
+            # endwith
+        # endif
+
+        self._truncate_partial_record()
+        self._rows = open(f'{path}.rows', 'ab')
+        self._keys_file = open(f'{path}.keys', 'a', encoding='utf-8')
+        self._last_timestamp = self._read_last_timestamp()
+    # enddef
+
+    def __enter__(self) -> 'SnapshotStore':
+        return self
+    # enddef
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    # enddef
+
+    def close(self):
+        with self._lock:
+            self._rows.close()
+            self._keys_file.close()
+        # endwith
+    # enddef
+
+    def __len__(self) -> int:
+        return os.path.getsize(f'{self.path}.rows') // _RECORD.size
+    # enddef
+
+    def _truncate_partial_record(self):
+        # A crash in the middle of an append leaves a part of a record at the end, which would misalign every later one.
+        path = f'{self.path}.rows'
+        if not os.path.exists(path):
+            return
+        # endif
+
+        size = os.path.getsize(path)
+        num_extra = size % _RECORD.size
+        if num_extra > 0:
+            print(f'[Warning] Truncated a partial record of {num_extra} bytes at the end of {path}', file=sys.stderr)
+            os.truncate(path, size - num_extra)
+        # endif
+    # enddef
+
+    def _read_last_timestamp(self) -> float:
+        n = len(self)
+        if n == 0:
+            return float('-inf')
+        # endif
+
+        with open(f'{self.path}.rows', 'rb') as f:
+            f.seek((n - 1) * _RECORD.size)
+            return _RECORD.unpack(f.read(_RECORD.size))[0]
+        # endwith
+    # enddef
+
+    def _key(self, market: Union[Market, Explorer, str], nft: NFTInfo) -> int:
+        name = market_name(market)
+        key = self._keys.get((name, nft.id))
+        if key is None:
+            key = len(self._entries)
+            self._keys[(name, nft.id)] = key
+            self._entries.append([name, nft.id, nft.name])
+        elif self._entries[key][2] == nft.name:
+            return key
+        else:
+            self._entries[key][2] = nft.name
+        # endif
+
+        self._keys_file.write(json.dumps([key, name, nft.id, nft.name], ensure_ascii=False) + '\n')
+        self._keys_file.flush()
+        return key
+    # enddef
+
+    def append(self, market: Union[Market, Explorer, str], nft: NFTInfo, timestamp: float = None):
+        '''Append a snapshot. Timestamps (time.time() by default) must not go back.'''
+        self.extend([(market, nft)], timestamp)
+    # enddef
+
+    def extend(self, snapshots: Iterable[Tuple[Union[Market, Explorer, str], NFTInfo]], timestamp: float = None):
+        '''Append snapshots taken at the same time.'''
+        if timestamp is None:
+            timestamp = time.time()
+        # endif
+
+        with self._lock:
+            if timestamp < self._last_timestamp:
+                raise ValueError(f'The timestamp {timestamp} is older than the last one {self._last_timestamp}.')
+            # endif
+
+            buf = bytearray()
+            for market, nft in snapshots:
+                buf += _RECORD.pack(timestamp, self._key(market, nft),
+                                    to_missing(nft.num_supply), to_missing(nft.num_listing), to_missing(nft.num_owners),
+                                    nft.floor, nft.volume, to_missing(nft.days_from_last_trade))
+            # endfor
+            self._rows.write(buf)
+            self._rows.flush()
+            self._last_timestamp = timestamp
+        # endwith
+    # enddef
+
+    def keys(self) -> List[Tuple[Union[Market, Explorer, str], str]]:
+        '''All the (market, id) pairs in the store.'''
+        return [(parse_market(market), id) for market, id, _ in self._entries]
+    # enddef
+
+    def _scan(self, t0: Optional[float], t1: Optional[float]) -> Iterator[Tuple]:
+        n = len(self)
+        if n == 0:
+            return
+        # endif
+
+        with open(f'{self.path}.rows', 'rb') as f, mmap.mmap(f.fileno(), n * _RECORD.size, access=mmap.ACCESS_READ) as m:
+            # Records are sorted by their leading timestamp.
+            timestamps = _Timestamps(m, n)
+            lo = 0 if t0 is None else bisect.bisect_left(timestamps, t0)
+            hi = n if t1 is None else bisect.bisect_right(timestamps, t1)
+            view = memoryview(m)[lo * _RECORD.size:hi * _RECORD.size]
+            try:
+                yield from _RECORD.iter_unpack(view)
+            finally:
+                view.release()
+            # endtry
+        # endwith
+    # enddef
+
+    def history(self, market: Union[Market, Explorer, str], id: str, t0: float = None, t1: float = None) -> History:
+        '''Snapshots of an NFT with t0 <= timestamp <= t1.'''
+        key = self._keys.get((market_name(market), id))
+        columns = [array.array(typecode) for typecode in _TYPECODES]
+        if key is not None:
+            for record in self._scan(t0, t1):
+                if record[1] == key:
+                    for column, value in zip(columns, record):
+                        column.append(value)
+                    # endfor
+                # endif
+            # endfor
+        # endif
+
+        return History(market, id, self._entries[key][2] if key is not None else None,
+                       timestamp=columns[0], num_supply=columns[2], num_listing=columns[3], num_owners=columns[4],
+                       floor=columns[5], volume=columns[6], days_from_last_trade=columns[7])
+    # enddef
+
+    def snapshots(self, t0: float = None, t1: float = None) -> Iterator[Tuple[float, Union[Market, Explorer, str], NFTInfo]]:
+        '''All the snapshots with t0 <= timestamp <= t1, as (timestamp, market, NFTInfo).'''
+        for timestamp, key, num_supply, num_listing, num_owners, floor, volume, days in self._scan(t0, t1):
+            market, id, name = self._entries[key]
+            yield timestamp, parse_market(market), NFTInfo(id=id, name=name,
+                                                           num_supply=from_missing(num_supply), num_listing=from_missing(num_listing),
+                                                           num_owners=from_missing(num_owners), floor=floor, volume=volume,
+                                                           days_from_last_trade=from_missing(days))
+        # endfor
+    # enddef
+
+    def to_numpy(self) -> Any:
+        '''All the records as a memory-mapped NumPy structured array.'''
+        import numpy as np
+
+        dtype = np.dtype([(column, '<' + typecode.replace('I', 'u4').replace('q', 'i8').replace('d', 'f8'))
+                          for column, typecode in zip(_COLUMNS, _TYPECODES)])
+        assert dtype.itemsize == _RECORD.size, dtype
+
+        return np.memmap(f'{self.path}.rows', dtype=dtype, mode='r', shape=(len(self),))
+    # enddef
+
+
+class _Timestamps(Sequence[float]):
+    # A lazy view of the timestamps in the records for bisect.
+    def __init__(self, m: mmap.mmap, n: int):
+        self.m = m
+        self.n = n
+    # enddef
+
+    def __len__(self) -> int:
+        return self.n
+    # enddef
+
+    def __getitem__(self, i: int) -> float:
+        return struct.unpack_from('<d', self.m, i * _RECORD.size)[0]
+    # enddef
+
+
+def to_missing(i: Optional[int]) -> int:
+    '''An integer field as stored: None as MISSING. Also used by nft_market.serialize.'''
+    return MISSING if i is None else i
+# enddef
+
+
+def from_missing(i: int) -> Optional[int]:
+    '''A stored integer field as NFTInfo takes it: MISSING, and so a real value of -1, as None.'''
+    return None if i == MISSING else i
+# enddef
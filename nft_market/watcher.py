@@ -0,0 +1,210 @@
+import dataclasses
+import heapq
+import itertools
+import sys
+import time
+from typing import *
+
+from nft_market.market import Explorer, Market, market_name
+from nft_market.nftinfo import NFTInfo
+
+
+@dataclasses.dataclass(frozen=True)
+class Threshold:
+    '''How much a field has to move to count as a change.
+
+    A change counts when it exceeds both "absolute" and "relative" times the last value. Changes from or to None always
+    count.
+    '''
+    absolute: float = 0
+    relative: float = 0
+
+    def exceeded(self, old: Any, new: Any) -> bool:
+        if old is None or new is None:
+            return old is not new
+        # endif
+
+        diff = abs(new - old)
+        return diff > self.absolute and diff > self.relative * abs(old)
+    # enddef
+
+
+# The fields watched by default, and any change of them counts.
+DEFAULT_THRESHOLDS = {
+    'floor': Threshold(),
+    'volume': Threshold(),
+    'num_listing': Threshold(),
+    }
+
+
+@dataclasses.dataclass
+class Delta:
+    '''The fields of an NFT that moved since the last one reported, as field -> (old, new).
+
+    For the first fetch of an NFT, all the watched fields are reported with None as the old values.
+    '''
+    market: Union[Market, Explorer]
+    id: str
+    timestamp: float
+    changes: Dict[str, Tuple[Any, Any]]
+    nft: NFTInfo
+
+
+@dataclasses.dataclass
+class _Watch:
+    market: Union[Market, Explorer]
+    id: str
+    interval: float
+    due: float
+    last: Optional[NFTInfo] = None
+    error: Optional[Exception] = None
+
+
+class Watcher:
+    '''Polls NFTs with a Retriever and yields Delta only when the watched fields move beyond their thresholds.
+
+    Polling is adaptive: an NFT that changed is polled again after "min_interval" seconds, and every poll without a
+    change multiplies its interval by "backoff" up to "max_interval", so idle collections take less browser time.
+    '''
+
+    def __init__(self, retriever: Any, pairs: Iterable[Tuple[Union[Market, Explorer], str]],
+                 thresholds: Dict[str, Threshold] = None, min_interval: float = 60, max_interval: float = 3600, backoff: float = 2,
+                 initial: Dict[Tuple[Union[Market, Explorer], str], NFTInfo] = None):
+        '''
+        Args:
+            retriever: Retriever, CachedRetriever or anything with fetch_many.
+            thresholds (Dict[str, Threshold]): The fields to watch. DEFAULT_THRESHOLDS by default.
+            initial (Dict[Tuple[Market, str], NFTInfo]): The last known NFTInfo, e.g. from a previous run. NFTs without it
+                report all the watched fields at the first poll.
+        '''
+        self.retriever = retriever
+        self.thresholds = dict(thresholds if thresholds is not None else DEFAULT_THRESHOLDS)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+        initial = initial or {}
+        self._watches = {}  # type: Dict[Tuple[Union[Market, Explorer], str], _Watch]
+        self._queue = []  # type: List[Tuple[float, int, _Watch]]
+        self._counter = itertools.count()
+        for market, id in pairs:
+            self.add(market, id, initial.get((market, id)))
+        # endfor
+    # enddef
+
+    def add(self, market: Union[Market, Explorer], id: str, last: NFTInfo = None):
+        '''Start watching an NFT from the next poll.'''
+        if (market, id) in self._watches:
+            return
+        # endif
+
+        # Due right away.
+        watch = _Watch(market, id, interval=self.min_interval, due=0.0, last=last)
+        self._watches[(market, id)] = watch
+        self._push(watch)
+    # enddef
+
+    def remove(self, market: Union[Market, Explorer], id: str):
+        # Entries left in the queue are skipped when they come out.
+        self._watches.pop((market, id), None)
+    # enddef
+
+    def last(self, market: Union[Market, Explorer], id: str) -> Optional[NFTInfo]:
+        '''The NFTInfo last reported as a Delta.'''
+        watch = self._watches.get((market, id))
+        return watch.last if watch is not None else None
+    # enddef
+
+    def interval(self, market: Union[Market, Explorer], id: str) -> float:
+        return self._watches[(market, id)].interval
+    # enddef
+
+    def _push(self, watch: _Watch):
+        heapq.heappush(self._queue, (watch.due, next(self._counter), watch))
+    # enddef
+
+    def diff(self, old: Optional[NFTInfo], new: NFTInfo) -> Dict[str, Tuple[Any, Any]]:
+        '''The watched fields that moved beyond their thresholds from "old" to "new".'''
+        changes = {}
+        for field, threshold in self.thresholds.items():
+            old_value = getattr(old, field) if old is not None else None
+            new_value = getattr(new, field)
+            if old is None or threshold.exceeded(old_value, new_value):
+                changes[field] = (old_value, new_value)
+            # endif
+        # endfor
+
+        return changes
+    # enddef
+
+    def next_due(self) -> Optional[float]:
+        '''The time.monotonic() when the next NFT is due, or None if nothing is watched.'''
+        while len(self._queue) > 0 and self._watches.get((self._queue[0][2].market, self._queue[0][2].id)) is not self._queue[0][2]:
+            heapq.heappop(self._queue)
+        # endwhile
+
+        return self._queue[0][0] if len(self._queue) > 0 else None
+    # enddef
+
+    def poll(self, now: float = None) -> List[Delta]:
+        '''Fetch the NFTs due by "now" (time.monotonic() by default) at once, and return the deltas among them.'''
+        if now is None:
+            now = time.monotonic()
+        # endif
+
+        due = {}  # type: Dict[Tuple[Union[Market, Explorer], str], _Watch]
+        while self.next_due() is not None and self._queue[0][0] <= now:
+            _, _, watch = heapq.heappop(self._queue)
+            due[(watch.market, watch.id)] = watch
+        # endwhile
+        if len(due) == 0:
+            return []
+        # endif
+
+        deltas = []
+        for result in self.retriever.fetch_many(list(due.keys())):
+            watch = due[(result.market, result.id)]
+            if result.ok:
+                watch.error = None
+                changes = self.diff(watch.last, result.nft)
+                if len(changes) > 0:
+                    deltas.append(Delta(result.market, result.id, time.time(), changes, result.nft))
+                    watch.last = result.nft
+                    watch.interval = self.min_interval
+                else:
+                    # "last" stays at what was reported, so that slow drifts add up to a change.
+                    watch.interval = min(self.max_interval, watch.interval * self.backoff)
+                # endif
+            else:
+                # Keep the interval and try again.
+                watch.error = result.error
+                if getattr(self.retriever, 'verbose', False):
+                    print(f'[Warning] Failed to watch "{market_name(result.market)}:{result.id}": {result.error!r}', file=sys.stderr)
+                # endif
+            # endif
+
+            watch.due = now + watch.interval
+            if self._watches.get((watch.market, watch.id)) is watch:
+                self._push(watch)
+            # endif
+        # endfor
+
+        return deltas
+    # enddef
+
+    def __iter__(self) -> Iterator[Delta]:
+        '''Poll forever, sleeping until the next NFT is due.'''
+        while True:
+            next_due = self.next_due()
+            if next_due is None:
+                return
+            # endif
+
+            sec = next_due - time.monotonic()
+            if sec > 0:
+                time.sleep(sec)
+            # endif
+
+            yield from self.poll()
+        # endwhile
+    # enddef
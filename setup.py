@@ -20,6 +20,16 @@ setuptools.setup(
         "selenium",
         "webdriver-manager",
         ],
+    extras_require={
+        "http": ["lxml"],
+        "analytics": ["numpy>=1.20"],
+        "parquet": ["pyarrow"],
+        },
+    entry_points={
+        "console_scripts": [
+            "nft-market = nft_market.cli:main",
+            ],
+        },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,57 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from nft_market import Market, NFTInfo
+from nft_market.analytics import Table, pct_change, rolling_mean, rolling_std
+
+
+def _table():
+    return Table([
+        (Market.OpenSea, NFTInfo('azuki', 'Azuki', 10000, 500, 5000, 10.0, 300.0, None)),
+        (Market.Rarible, NFTInfo('azuki', 'Azuki', None, 100, None, 9.0, 100.0, 1)),
+        (Market.MagicEden, NFTInfo('okay_bears', 'Okay Bears', 10000, None, 0, 80.0, 0.0, None)),
+        ])
+
+
+def test_ratios():
+    table = _table()
+    assert table.listing_ratio().tolist() == [0.05, None, None]
+    assert table.owner_concentration().tolist() == [2.0, None, None]
+
+
+def test_floor_spread():
+    spread = _table().floor_spread()
+    assert spread.keys.tolist() == ['azuki', 'okay_bears']
+    assert spread.spread.tolist() == [1.0, None]
+    assert spread.relative[0] == pytest.approx(1 / 9)
+    assert spread.cheapest[0] == Market.Rarible
+
+    # Markets may call a collection by different IDs.
+    spread = _table().floor_spread(key={(Market.MagicEden, 'okay_bears'): 'azuki'})
+    assert spread.keys.tolist() == ['azuki']
+    assert spread.high.tolist() == [80.0]
+
+
+def test_volume_weighted_floor():
+    keys, floors = _table().volume_weighted_floor()
+    assert keys.tolist() == ['azuki', 'okay_bears']
+    assert floors[0] == pytest.approx(9.75)
+    assert floors.mask[1]
+
+
+def test_rolling():
+    a = np.ma.masked_equal([1.0, 2.0, -1, 4.0, 5.0], -1)
+    assert rolling_mean(a, 2).tolist() == [1.0, 1.5, 2.0, 4.0, 4.5]
+    assert rolling_mean(a, 2, min_periods=2).tolist() == [None, 1.5, None, None, 4.5]
+    assert rolling_std(a, 3).tolist()[:2] == [None, pytest.approx(0.5 ** 0.5)]
+    assert rolling_mean([], 3).tolist() == []
+
+
+def test_rolling_large_values():
+    # A small deviation of a large price, over a long series.
+    a = 1e8 + np.arange(10000) % 2
+    assert rolling_std(a, 3)[-1] == pytest.approx(np.std([0, 1, 0], ddof=1))
+    assert rolling_std(a, 3)[2:].min() > 0.5
+    assert rolling_mean(a, 2)[-1] == 1e8 + 0.5
+    assert pct_change([1.0, 2.0, 3.0]).tolist() == [None, 1.0, 0.5]
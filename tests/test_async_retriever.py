@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from nft_market import AsyncRetriever, Browser, Market, NFTInfo, RetryPolicy
+
+
+class _Scraper:
+    '''Stands in for Retriever._retriever_of, with the seconds each ID takes and the number of failures before success.'''
+
+    def __init__(self, seconds=None, failures=None):
+        self.seconds = seconds or {}
+        self.failures = dict(failures or {})
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peaks = {}
+        self.calls = []
+
+    def of(self, market):
+        def scrape(id):
+            with self.lock:
+                self.calls.append(id)
+                self.running[market] = self.running.get(market, 0) + 1
+                self.peaks[market] = max(self.peaks.get(market, 0), self.running[market])
+            time.sleep(self.seconds.get(id, 0.01))
+            with self.lock:
+                self.running[market] -= 1
+                if self.failures.get(id, 0) > 0:
+                    self.failures[id] -= 1
+                    return None, ValueError(id)
+            return NFTInfo(id, id, None, None, None, 1.0, 1.0, None), None
+        return scrape
+
+
+def _retriever(scraper, **kwargs):
+    r = AsyncRetriever(Browser.Firefox, pool_size=4, **kwargs)
+    r.retriever._retriever_of = scraper.of
+    return r
+
+
+def test_backoff_on_event_loop(monkeypatch):
+    scraper = _Scraper(failures={'azuki': 2, 'doodles': 3})
+    sleeps = []
+    sleep = asyncio.sleep
+
+    async def recording_sleep(sec, *args):
+        sleeps.append(sec)
+        await sleep(sec, *args)
+
+    async def main():
+        async with _retriever(scraper, retry=RetryPolicy(num_retry=2, base=0.01, jitter=False)) as r:
+            monkeypatch.setattr(asyncio, 'sleep', recording_sleep)
+            nft = await r.fetch(Market.OpenSea, 'azuki')
+            monkeypatch.undo()
+            with pytest.raises(ValueError):
+                await r.fetch(Market.OpenSea, 'doodles')
+        return nft
+
+    assert asyncio.run(main()).id == 'azuki'
+    assert sleeps == [0.01, 0.02]
+    assert scraper.calls == ['azuki'] * 3 + ['doodles'] * 3
+
+
+def test_fetch_many():
+    scraper = _Scraper(seconds={'slow': 0.3})
+    pairs = [(Market.OpenSea, 'slow')] + [(Market.OpenSea, str(i)) for i in range(4)] + [(Market.MagicEden, str(i)) for i in range(4)]
+
+    async def main():
+        async with _retriever(scraper, market_limits={Market.OpenSea: 2}) as r:
+            return [result.id async for result in r.fetch_many(pairs)]
+
+    ids = asyncio.run(main())
+    # In the order of completion, within the limit of the market.
+    assert ids[-1] == 'slow' and len(ids) == len(pairs)
+    assert scraper.peaks[Market.OpenSea] == 2
+
+
+def test_fetch_many_cancel():
+    scraper = _Scraper(seconds={str(i): 0.05 for i in range(5)})
+
+    async def main():
+        async with _retriever(scraper, market_limits={Market.OpenSea: 1}) as r:
+            results = r.fetch_many([(Market.OpenSea, str(i)) for i in range(5)])
+            async for result in results:
+                break
+            await results.aclose()
+            await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+    # The fetches waiting for the market were cancelled.
+    assert len(scraper.calls) <= 2
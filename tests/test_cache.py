@@ -0,0 +1,67 @@
+import threading
+import time
+
+from nft_market import CachedRetriever, Market, MemoryCache, NFTInfo, SQLiteCache
+
+
+class _FakeRetriever:
+    max_workers = 4
+    verbose = False
+
+    def __init__(self):
+        self.num_calls = 0
+        self.lock = threading.Lock()
+
+    def reserve(self, num_sessions):
+        pass
+
+    def fetch(self, market, id):
+        with self.lock:
+            self.num_calls += 1
+        time.sleep(0.05)
+        return NFTInfo(id, 'name', None, None, None, float(self.num_calls), 1.0, None)
+
+    def close(self):
+        pass
+
+
+def test_memory_cache_lru():
+    cache = MemoryCache(maxsize=2)
+    for key in ['a', 'b', 'c']:
+        cache.set(key, 0, NFTInfo(key, key, None, None, None, 1.0, 1.0, None))
+    assert cache.get('a') is None
+    assert cache.get('c')[1].id == 'c'
+
+
+def test_sqlite_cache(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    nft = NFTInfo('azuki', 'Azuki', 10000, None, 5000, 12.5, 1234.0, None)
+    cache = SQLiteCache(path)
+    cache.set('key', 1.0, nft)
+    cache.close()
+    assert SQLiteCache(path).get('key') == (1.0, nft)
+
+
+def test_ttl_and_single_flight():
+    retriever = _FakeRetriever()
+    cached = CachedRetriever(retriever, ttl=60)
+    threads = [threading.Thread(target=cached.fetch, args=(Market.OpenSea, 'azuki')) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert retriever.num_calls == 1
+
+    assert cached.fetch(Market.OpenSea, 'azuki').floor == 1.0
+    assert retriever.num_calls == 1
+
+
+def test_stale_while_revalidate():
+    retriever = _FakeRetriever()
+    cached = CachedRetriever(retriever, ttl=0, stale_ttl=60)
+    assert cached.fetch(Market.OpenSea, 'azuki').floor == 1.0
+    # The stale result is returned while it is refreshed in the background.
+    assert cached.fetch(Market.OpenSea, 'azuki').floor == 1.0
+    time.sleep(0.2)
+    assert cached.fetch(Market.OpenSea, 'azuki').floor == 2.0
+    cached.close()
@@ -0,0 +1,46 @@
+import io
+import json
+
+from nft_market import FetchResult, Market, NFTInfo, cli
+
+
+class _FakeRetriever:
+    def __init__(self, args):
+        self.windows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def fetch_many(self, pairs, tabs=1, window=None):
+        self.windows.append(window)
+        for market, id in pairs:
+            if id == 'gone':
+                yield FetchResult(market, id, None, ValueError('timeout'))
+            else:
+                yield FetchResult(market, id, NFTInfo(id, 'Name, Inc.', 10, None, 5, 1.5, 100.0, None), None)
+
+
+def test_read_pairs():
+    lines = ['# comment', '', 'Market.OpenSea azuki', 'MagicEden, okay_bears', 'NFTrade\tpolygon/0xc93c', 'broken']
+    assert list(cli.read_pairs(lines)) == [(Market.OpenSea, 'azuki'), (Market.MagicEden, 'okay_bears'),
+                                           (Market.NFTrade, 'polygon/0xc93c')]
+
+
+def test_fetch(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(cli, '_retriever', _FakeRetriever)
+    monkeypatch.setattr('sys.stdin', io.StringIO('Market.OpenSea azuki\nOpenSea gone\nMagicEden okay_bears\n'))
+    assert cli.main(['fetch', '--window', '2']) == 1
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(r['market'], r['id'], r['floor'], r['error']) for r in records] == [
+        ('Market.OpenSea', 'azuki', 1.5, None), ('Market.OpenSea', 'gone', None, "ValueError('timeout')"),
+        ('Market.MagicEden', 'okay_bears', 1.5, None)]
+
+    path = tmp_path / 'pairs.txt'
+    path.write_text('OpenSea azuki\n')
+    assert cli.main(['fetch', str(path), '--format', 'csv', '--output', str(tmp_path / 'out.csv')]) == 0
+    assert (tmp_path / 'out.csv').read_text().splitlines() == [
+        'market,id,name,num_supply,num_listing,num_owners,floor,volume,days_from_last_trade,error',
+        'Market.OpenSea,azuki,"Name, Inc.",10,,5,1.5,100.0,,']
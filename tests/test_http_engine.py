@@ -0,0 +1,143 @@
+import gzip
+import http.server
+import json
+import threading
+import time
+import zlib
+
+import pytest
+
+from nft_market import Browser, Engine, Market, MarketSpec, Page, Retriever, RetryPolicy, Wait
+from nft_market.http_engine import HTTPBuilder, HTTPClient, _inner_text, _json_path
+from test_retriever import browsers  # noqa: F401, the fixture
+
+lxml_html = pytest.importorskip('lxml.html')
+
+_PAGE = '<html><body><h1>Azuki</h1><div><p>Floor</p><p>1.5 <b>ETH</b></p></div><span>2,000</span><script>var x = 1;</script></body></html>'
+_NEXT = ('<html><body><div id="root"></div><script id="__NEXT_DATA__" type="application/json">'
+         + json.dumps({'props': {'collection': {'name': 'Azuki', 'stats': [{'floor': 1.5}, {'volume': 2000}]}}}) + '</script></body></html>')
+# A page rendered by JavaScript, which the HTTP engine cannot read.
+_SHELL = '<html><body><div id="root"></div></body></html>'
+
+_ROUTES = {
+    '/page': (200, {}, _PAGE.encode()),
+    '/next': (200, {}, _NEXT.encode()),
+    '/shell': (200, {}, _SHELL.encode()),
+    '/redirect': (302, {'Location': '/page'}, b''),
+    '/loop': (302, {'Location': '/loop'}, b''),
+    '/gzip': (200, {'Content-Encoding': 'gzip'}, gzip.compress(_PAGE.encode())),
+    '/deflate': (200, {'Content-Encoding': 'deflate'}, zlib.compress(_PAGE.encode())),
+    '/latin1': (200, {'Content-Type': 'text/html; charset=iso-8859-1'}, 'café'.encode('latin-1')),
+    }
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status, headers, body = _ROUTES.get(self.path, (404, {}, b'not found'))
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _IdleTimeoutHandler(_Handler):
+    # Keep-alive connections are closed after 0.2 seconds of idle time.
+    timeout = 0.2
+
+
+def _serve(handler):
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield 'http://127.0.0.1:%d' % httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    yield from _serve(_Handler)
+
+
+@pytest.fixture
+def idle_timeout_server():
+    yield from _serve(_IdleTimeoutHandler)
+
+
+def test_http_client(server):
+    client = HTTPClient(timeout=5, max_redirects=3)
+    assert client.get(server + '/page') == _PAGE
+    assert client.get(server + '/redirect') == _PAGE
+    assert client.get(server + '/gzip') == _PAGE
+    assert client.get(server + '/deflate') == _PAGE
+    assert client.get(server + '/latin1') == 'café'
+    with pytest.raises(ValueError, match='HTTP 404'):
+        client.get(server + '/missing')
+    with pytest.raises(ValueError, match='Too many redirects'):
+        client.get(server + '/loop')
+    client.close()
+
+
+def test_http_client_idle_timeout(idle_timeout_server):
+    client = HTTPClient(timeout=5)
+    assert client.get(idle_timeout_server + '/page') == _PAGE
+    time.sleep(0.5)
+    # The kept-alive connection has been closed by the server, and is replaced.
+    assert client.get(idle_timeout_server + '/page') == _PAGE
+    client.close()
+
+
+def test_inner_text():
+    doc = lxml_html.document_fromstring(_PAGE)
+    assert _inner_text(doc.body) == 'Azuki\nFloor\n1.5 ETH\n2,000'
+    assert _inner_text(doc.xpath('//div')[0]) == 'Floor\n1.5 ETH'
+
+
+def test_json_path():
+    data = {'a': {'b': [{'c': 1}, None]}}
+    assert _json_path(data, 'a.b.0.c') == '1'
+    assert _json_path(data, 'a.b.1') is None
+    assert _json_path(data, 'a.b.2') is None
+    assert _json_path(data, 'a.x') is None
+
+
+def test_http_builder():
+    builder = HTTPBuilder(_NEXT, 'azuki')
+    builder.name('json:props.collection.name')
+    builder.floor('json:props.collection.stats.0.floor')
+    builder.volume('json:props.collection.stats.1.volume')
+    assert builder.resolve() == {'name': 'Azuki', 'floor': 1.5, 'volume': 2000}
+
+    builder = HTTPBuilder(_PAGE, 'azuki')
+    builder.name('//h1')
+    builder.floor('//div/p[2]', lambda s: s.replace('ETH', ''))
+    builder.volume('//h2')
+    with pytest.raises(Exception):
+        builder.resolve()
+
+
+def test_fallback_to_browser(server, browsers):
+    spec = MarketSpec([Page(server + '/{id}', {'name': '//h1', 'floor': ('//div/p[2]', lambda s: s.replace('ETH', '')),
+                                               'volume': '//div/p[2]/b/@data-volume | //span'})])
+    pages = {server + '/shell': {'//h1': 'Shell', '//div/p[2]': '2.5 ETH', '//div/p[2]/b/@data-volume | //span': '100'}}
+
+    r = Retriever(Browser.Firefox, sec_wait=5, wait=Wait.Ready, specs={Market.OpenSea: spec}, engines={Market.OpenSea: Engine.HTTP},
+                  retry=RetryPolicy(num_retry=0))
+    drivers = browsers.install(r._pool, pages)
+
+    nft = r.fetch(Market.OpenSea, 'page')
+    assert (nft.name, nft.floor, nft.volume) == ('Azuki', 1.5, 2000)
+    assert drivers == []
+
+    # The volume is missing without JavaScript, so the page is loaded in a browser.
+    nft = r.fetch(Market.OpenSea, 'shell')
+    assert (nft.name, nft.floor, nft.volume) == ('Shell', 2.5, 100)
+    assert len(drivers) == 1 and drivers[0].urls == [server + '/shell']
+    r.close()
@@ -0,0 +1,46 @@
+import pytest
+
+from nft_market import Browser, Instrumentation, Market, MetricsHook, NFTInfo, Phase, Retriever, RetryPolicy
+from nft_market.instrument import NULL_INSTRUMENTATION
+
+
+def test_disabled():
+    assert not NULL_INSTRUMENTATION.enabled
+    assert NULL_INSTRUMENTATION.timer(Market.OpenSea, Phase.Load) is NULL_INSTRUMENTATION.timer(None, Phase.Launch)
+
+
+def test_fields():
+    http_engine = pytest.importorskip('nft_market.http_engine')
+    pytest.importorskip('lxml')
+
+    hook = MetricsHook()
+    builder = http_engine.HTTPBuilder('<html><body><p id="floor">N/A</p></body></html>', 'azuki', Instrumentation([hook]), Market.OpenSea)
+    builder.floor('//p[@id="floor"]').volume('//p[@id="volume"]')
+    with pytest.raises(ValueError):
+        builder.resolve()
+
+    text = hook.to_prometheus()
+    assert 'nft_market_phase_seconds_count{market="Market.OpenSea",phase="Extract"} 1' in text
+    assert 'nft_market_errors_total{market="Market.OpenSea",field="floor",type="ParseError"} 1' in text
+
+
+def test_retries():
+    hook = MetricsHook(buckets=(1,))
+    r = Retriever(Browser.Firefox, retry=RetryPolicy(num_retry=3, base=0), instrumentation=Instrumentation([hook]))
+    errors = [TimeoutError('page'), TimeoutError('page')]
+
+    def retrieve(spec, id, engine, market):
+        if len(errors) > 0:
+            return None, errors.pop()
+        return NFTInfo(id, id, None, None, None, 1.0, 1.0, None), None
+
+    r._retrieve = retrieve
+    r.fetch(Market.OpenSea, 'azuki')
+    r.close()
+
+    text = hook.to_prometheus()
+    assert 'nft_market_retries_total{market="Market.OpenSea"} 2' in text
+    assert 'nft_market_errors_total{market="Market.OpenSea",field="",type="TimeoutError"} 2' in text
+    assert 'nft_market_fetches_total{market="Market.OpenSea",outcome="success"} 1' in text
+    assert 'nft_market_phase_seconds_bucket{market="Market.OpenSea",phase="Backoff",le="1"} 2' in text
+    assert 'nft_market_phase_seconds_count{market="Market.OpenSea",phase="Fetch"} 1' in text
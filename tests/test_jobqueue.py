@@ -0,0 +1,165 @@
+import multiprocessing
+import threading
+import time
+
+from nft_market import CachedRetriever, FetchResult, Market, NFTInfo, ParseError, RetryPolicy, SQLiteJobQueue, Worker
+
+
+class _FakeRetriever:
+    max_workers = 2
+    verbose = False
+
+    def __init__(self, errors=None):
+        self.retry = RetryPolicy(base=0, jitter=False)
+        self.errors = errors or {}
+        self.fetched = []
+
+    def reserve(self, num_sessions):
+        pass
+
+    def fetch(self, market, id):
+        result, = self.fetch_many([(market, id)])
+        if not result.ok:
+            raise result.error
+        return result.nft
+
+    def fetch_many(self, pairs):
+        for market, id in pairs:
+            self.fetched.append(id)
+            if id in self.errors:
+                yield FetchResult(market, id, None, self.errors[id])
+            else:
+                yield FetchResult(market, id, NFTInfo(id, id, 10, None, 5, 1.5, 100.0, None), None)
+
+
+def test_worker(tmp_path):
+    r = _FakeRetriever({'gone': ValueError('timeout'), 'broken': ParseError('broken', 'floor', 'n/a')})
+    with SQLiteJobQueue(str(tmp_path / 'jobs.sqlite'), max_attempts=3) as queue:
+        queue.put([(Market.OpenSea, 'azuki'), (Market.MagicEden, 'okay_bears'), (Market.OpenSea, 'gone'),
+                   (Market.OpenSea, 'broken')])
+        assert Worker(r, queue, poll_interval=0).run(exit_when_empty=True) == 6
+
+        assert queue.stats() == {'pending': 0, 'leased': 0, 'done': 2, 'dead': 2}
+        results = list(queue.results())
+        assert [(market, nft.id, nft.floor) for _, market, nft in results] == [
+            (Market.OpenSea, 'azuki', 1.5), (Market.MagicEden, 'okay_bears', 1.5)]
+        assert list(queue.results(after=results[0][0]))[0][2].id == 'okay_bears'
+
+        # Retried up to max_attempts, but not errors to give up on.
+        assert {(d.id, d.attempts) for d in queue.dead_letters()} == {('gone', 3), ('broken', 1)}
+        assert r.fetched.count('gone') == 3
+
+        assert queue.requeue_dead() == 2
+        assert queue.stats()['pending'] == 2
+
+
+def test_cached_retriever(tmp_path):
+    r = _FakeRetriever({'broken': ParseError('broken', 'floor', 'n/a')})
+    with SQLiteJobQueue(str(tmp_path / 'jobs.sqlite')) as queue:
+        queue.put([(Market.OpenSea, 'azuki'), (Market.OpenSea, 'broken')])
+        worker = Worker(CachedRetriever(r), queue, poll_interval=0)
+        assert worker.batch == 2
+        worker.run(exit_when_empty=True)
+        # The RetryPolicy of the retriever gives up on the ParseError at once.
+        assert queue.stats() == {'pending': 0, 'leased': 0, 'done': 1, 'dead': 1}
+
+
+def test_lease_expiry(tmp_path):
+    with SQLiteJobQueue(str(tmp_path / 'jobs.sqlite')) as queue:
+        queue.put([(Market.OpenSea, 'azuki')])
+        job, = queue.lease('a', lease_seconds=-1)
+        assert queue.lease('b', lease_seconds=60)[0].attempts == 2
+
+        # The lease of "a" has been lost.
+        assert not queue.complete(job, 'a', NFTInfo('azuki', 'Azuki', None, None, None, 1.0, 1.0, None))
+        assert queue.lease('c') == []
+        assert queue.stats()['leased'] == 1
+
+
+def test_expired_leases_dead_lettered(tmp_path):
+    with SQLiteJobQueue(str(tmp_path / 'jobs.sqlite'), max_attempts=2) as queue:
+        queue.put([(Market.OpenSea, 'azuki')])
+        # The workers crash without completing or failing the job.
+        assert queue.lease('a', lease_seconds=-1)[0].attempts == 1
+        assert queue.lease('b', lease_seconds=-1)[0].attempts == 2
+        assert queue.lease('c') == []
+
+        assert queue.stats() == {'pending': 0, 'leased': 0, 'done': 0, 'dead': 1}
+        dead, = queue.dead_letters()
+        assert (dead.id, dead.attempts, dead.error) == ('azuki', 2, 'lease expired')
+
+
+class _SlowRetriever(_FakeRetriever):
+    def __init__(self, queue, steal=False):
+        super().__init__()
+        self.queue = queue
+        self.steal = steal
+        self.stolen = []
+
+    def fetch_many(self, pairs):
+        time.sleep(0.5)
+        if self.steal:
+            self.stolen = self.queue.lease('thief', lease_seconds=60)
+        else:
+            # Still leased, although the batch has outlasted the lease.
+            assert self.queue.lease('thief') == []
+        return super().fetch_many(pairs)
+
+
+def test_heartbeat(tmp_path):
+    with SQLiteJobQueue(str(tmp_path / 'jobs.sqlite'), lease_seconds=0.2) as queue:
+        queue.put([(Market.OpenSea, 'azuki')])
+        worker = Worker(_SlowRetriever(queue), queue)
+        assert worker.run_once() == 1
+        assert (worker.num_completed, worker.num_lost) == (1, 0)
+        assert queue.stats()['done'] == 1
+
+
+def test_lost_lease(tmp_path):
+    with SQLiteJobQueue(str(tmp_path / 'jobs.sqlite'), lease_seconds=0.2) as queue:
+        queue.put([(Market.OpenSea, 'azuki')])
+        r = _SlowRetriever(queue, steal=True)
+        # Too late for the lease to be extended.
+        worker = Worker(r, queue, heartbeat=10)
+        assert worker.run_once() == 1
+        assert len(r.stolen) == 1
+        assert (worker.num_completed, worker.num_lost) == (0, 1)
+        assert queue.stats()['leased'] == 1
+
+
+def _lease_all(path, owner, leased):
+    queue = SQLiteJobQueue(path)
+    while True:
+        jobs = queue.lease(owner, 3)
+        if len(jobs) == 0:
+            break
+        leased.extend([job.job_id for job in jobs])
+    queue.close()
+
+
+def test_concurrent_leases(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    with SQLiteJobQueue(path) as queue:
+        job_ids = queue.put([(Market.OpenSea, str(i)) for i in range(200)])
+
+    with multiprocessing.Manager() as manager:
+        leased = manager.list()
+        processes = [multiprocessing.Process(target=_lease_all, args=(path, f'w{i}', leased)) for i in range(4)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        assert sorted(leased) == job_ids
+
+
+def test_stop(tmp_path):
+    with SQLiteJobQueue(str(tmp_path / 'jobs.sqlite')) as queue:
+        stop = threading.Event()
+        thread = threading.Thread(target=Worker(_FakeRetriever(), queue, poll_interval=0.01).run, args=(stop,))
+        thread.start()
+        queue.put([(Market.OpenSea, 'azuki')])
+        while queue.stats()['done'] == 0:
+            pass
+        stop.set()
+        thread.join(5)
+        assert not thread.is_alive()
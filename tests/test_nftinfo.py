@@ -0,0 +1,49 @@
+import dataclasses
+import pickle
+
+import pytest
+
+from nft_market.nftinfo import NFTINFO_FIELDS, FrozenNFTInfo, MissingFieldError, NFTInfo, _parse_number
+
+
+def test_parse_number():
+    assert _parse_number('10,000') == 10000
+    assert _parse_number('487.6K') == 487600
+    assert _parse_number('12 k') == 12000
+    assert _parse_number('1.2m') == 1200000
+    assert _parse_number('1.2M') == 1200000
+    assert _parse_number('1.05B') == 1050000000
+    assert _parse_number('<0.01') == 0.01
+    assert _parse_number('> 1K') == 1000
+    assert _parse_number('$1,234.56') == 1234.56
+    assert _parse_number('12.5 ETH') == 12.5
+    assert _parse_number('◎ 69.9') == 69.9
+    assert _parse_number('15,000.7 ICP') == 15000.7
+    assert _parse_number('ETH 0.5') == 0.5
+    assert _parse_number('ICP 12') == 12
+    assert _parse_number('WETH1.2K') == 1200
+    assert _parse_number('Ξ 3.1') == 3.1
+    assert _parse_number('1 234') == 1234
+
+
+def test_parse_number_invalid():
+    for s in ['', '--', 'N/A', '1.2.3', '12 ETHX', 'XETH 12', 'ETH', '15\n20', '1 2 3', '12,34', '1,2345', '__import__("os")']:
+        with pytest.raises(ValueError):
+            _parse_number(s)
+
+
+def test_nftinfo():
+    nft = NFTInfo('azuki', 'Azuki', 10000, None, 5000, 12.5, 1234.0, None)
+    assert not hasattr(nft, '__dict__')
+    assert NFTInfo.from_tuple(nft.to_tuple()) == nft
+    assert NFTInfo.from_tuples([nft.to_tuple()]) == [nft]
+    assert FrozenNFTInfo.from_columns({field: [value] for field, value in zip(NFTINFO_FIELDS, nft.to_tuple())}) == [nft.freeze()]
+    assert pickle.loads(pickle.dumps(nft.freeze())).thaw() == nft
+    assert len({nft.freeze(), nft.freeze()}) == 1
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        nft.freeze().floor = 1.0
+    with pytest.raises(MissingFieldError):
+        NFTInfo('azuki', 'Azuki', 10000, None, 5000, None, 1234.0, None)
+    with pytest.warns(UserWarning):
+        assert nft.num_items_all == 10000
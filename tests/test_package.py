@@ -0,0 +1,42 @@
+import importlib
+import subprocess
+import sys
+
+import nft_market
+
+
+def test_lazy_import():
+    code = ('import sys\n'
+            'from nft_market import Market, NFTInfo\n'
+            'assert not any(m.startswith(("selenium", "webdriver_manager", "nft_market.retriever")) for m in sys.modules)\n'
+            'from nft_market import Browser, Retriever\n'
+            'assert "nft_market.retriever" in sys.modules and "selenium" not in sys.modules\n'
+            # lxml only for the HTTP engine.
+            'Retriever(Browser.Firefox).close()\n'
+            'assert not any(m.startswith(("lxml", "nft_market.http_engine")) for m in sys.modules)\n')
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_lazy_names():
+    for module, names in nft_market._LAZY.items():
+        mod = importlib.import_module(f'nft_market.{module}')
+        # Every class and function defined in the module is exported.
+        defined = {name for name, value in vars(mod).items()
+                   if not name.startswith('_') and getattr(value, '__module__', None) == mod.__name__ and callable(value)}
+        assert defined <= set(names), module
+        for name in names:
+            assert getattr(nft_market, name) is getattr(mod, name)
+    assert 'Retriever' in dir(nft_market)
+    assert 'Retriever' in nft_market.__all__
+
+
+def test_all():
+    for module in ['market', 'instrument', 'nftinfo']:
+        mod = importlib.import_module(f'nft_market.{module}')
+        defined = {name for name, value in vars(mod).items() if not name.startswith('_') and getattr(value, '__module__', None) == mod.__name__}
+        assert defined <= set(nft_market._EAGER), module
+    for name in nft_market.__all__:
+        assert getattr(nft_market, name) is not None
+    # Only the names of the package, e.g. not those of typing.
+    assert not {'Any', 'Dict', 'Enum', 'importlib', 'time', 'threading'} & set(nft_market.__all__)
+    assert len(nft_market.__all__) == len(set(nft_market.__all__))
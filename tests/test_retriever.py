@@ -0,0 +1,293 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from nft_market import Browser, Market, MarketSpec, NFTInfo, Page, Retriever, RetryPolicy, Wait
+from nft_market.retriever import _SessionPool
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+
+class _FakeDriver:
+    '''Tabs of pages, where each page is {xpath: text}.'''
+
+    def __init__(self, pages, popups=True):
+        self.pages = pages
+        # Whether window.open opens a tab, or is blocked as by a popup blocker.
+        self.popups = popups
+        self.tabs = {'tab-0': None}
+        self.current_window_handle = 'tab-0'
+        self.switch_to = _SwitchTo(self)
+        self.urls = []
+        self.blocked_urls = {}
+        self.dead = False
+        self.num_quit = 0
+        self._counter = itertools.count(1)
+
+    @property
+    def current_url(self):
+        if self.dead:
+            raise ConnectionError('The browser has exited.')
+        return self.tabs[self.current_window_handle]
+
+    @property
+    def window_handles(self):
+        return list(self.tabs)
+
+    def get(self, url):
+        self.urls.append(url)
+        self.tabs[self.current_window_handle] = url
+
+    def implicitly_wait(self, sec):
+        pass
+
+    def close(self):
+        del self.tabs[self.current_window_handle]
+
+    def quit(self):
+        self.num_quit += 1
+
+    def execute_script(self, script, *args):
+        if 'window.open' in script:
+            if not self.popups:
+                return None
+            url = args[0] if len(args) > 0 else 'about:blank'
+            if len(args) > 0:
+                self.urls.append(url)
+            self.tabs[f'tab-{next(self._counter)}'] = url
+            return None
+        if 'window.location' in script:
+            self.get(args[0])
+            return None
+        page = self.pages.get(self.tabs[self.current_window_handle], {})
+        return {xpath: page.get(xpath) for xpath in args[0]}
+
+    def execute_cdp_cmd(self, cmd, params):
+        # The block list of the DevTools protocol applies to the current tab.
+        if cmd == 'Network.setBlockedURLs':
+            self.blocked_urls[self.current_window_handle] = params['urls']
+
+
+class _FakeBrowsers:
+    '''Launches fake drivers in place of the browsers of session pools, and keeps them in "drivers" in the order of launch.'''
+
+    def __init__(self):
+        self.drivers = []
+
+    def install(self, pool, pages=None, driver=_FakeDriver, **kwargs):
+        def launch(blocked=frozenset()):
+            self.drivers.append(driver(pages or {}, **kwargs))
+            return pool._session(self.drivers[-1], blocked)
+        pool._launch = launch
+        return self.drivers
+
+
+@pytest.fixture
+def browsers():
+    return _FakeBrowsers()
+
+
+def test_fetch_tabs(browsers):
+    spec = MarketSpec([Page('https://example.com/{id}', {'name': '//h1', 'floor': '//p[1]', 'volume': '//p[2]'})])
+    pages = {f'https://example.com/{id}': {'//h1': id.upper(), '//p[1]': '1.5', '//p[2]': '2K'} for id in ['a', 'b', 'c']}
+    pages['https://example.com/c']['//p[1]'] = None
+
+    r = Retriever(Browser.Firefox, sec_wait=0, wait=Wait.Ready, specs={Market.OpenSea: spec}, retry=RetryPolicy(num_retry=1, base=0))
+    drivers = browsers.install(r._pool, pages)
+    results = list(r.fetch_many([(Market.OpenSea, id) for id in ['a', 'b', 'c']], tabs=3))
+    r.close()
+
+    assert {result.id: result.nft.volume for result in results if result.ok} == {'a': 2000, 'b': 2000}
+    assert [result.id for result in results if not result.ok] == ['c']
+    # One browser loaded all of them in tabs, and "c" was retried alone.
+    assert len(drivers) == 1
+    assert drivers[0].urls == ['https://example.com/b', 'https://example.com/c', 'https://example.com/a', 'https://example.com/c']
+    assert list(drivers[0].tabs) == ['tab-0']
+
+
+def test_block_urls_in_tabs(browsers):
+    spec = MarketSpec([Page('https://example.com/{id}', {'name': '//h1', 'floor': '//p[1]', 'volume': '//p[2]'})])
+    pages = {f'https://example.com/{id}': {'//h1': id.upper(), '//p[1]': '1.5', '//p[2]': '2K'} for id in ['a', 'b', 'c']}
+
+    r = Retriever(Browser.Chrome, sec_wait=0, wait=Wait.Ready, lean=True, specs={Market.OpenSea: spec}, retry=RetryPolicy(num_retry=0))
+    drivers = browsers.install(r._pool, pages)
+    results = list(r.fetch_many([(Market.OpenSea, id) for id in ['a', 'b', 'c']], tabs=3))
+    r.close()
+
+    assert all(result.ok for result in results)
+    assert len(drivers) == 1
+    # Every tab blocked the URLs before loading its page.
+    blocked_urls = drivers[0].blocked_urls
+    assert set(blocked_urls) == {'tab-0', 'tab-1', 'tab-2'}
+    assert all(len(urls) > 0 and urls == blocked_urls['tab-0'] for urls in blocked_urls.values())
+    assert sorted(drivers[0].urls) == ['https://example.com/a', 'https://example.com/b', 'https://example.com/c']
+
+
+def test_fetch_partial(browsers, capsys):
+    spec = MarketSpec([Page('https://example.com/{id}', {'name': '//h1', 'floor': '//p[1]', 'volume': '//p[2]'}),
+                       Page('https://example.com/{id}/holders', {'num_owners': '//h2'}, required=False)])
+    pages = {f'https://example.com/{id}': {'//h1': id.upper(), '//p[1]': '1.5', '//p[2]': '2K'} for id in ['a', 'b']}
+    pages['https://example.com/a/holders'] = {'//h2': '300'}
+    pages['https://example.com/b']['//p[1]'] = None
+
+    r = Retriever(Browser.Firefox, sec_wait=0, wait=Wait.Ready, specs={Market.OpenSea: spec}, retry=RetryPolicy(num_retry=0))
+    drivers = browsers.install(r._pool, pages)
+    nft = r.fetch(Market.OpenSea, 'a')
+    assert (nft.name, nft.num_owners) == ('A', 300)
+    assert capsys.readouterr().err == ''
+
+    # The holders page is missing, so the summary page alone is returned with a warning.
+    pages['https://example.com/a/holders'] = {}
+    nft = r.fetch(Market.OpenSea, 'a')
+    assert (nft.name, nft.floor, nft.volume, nft.num_owners) == ('A', 1.5, 2000, None)
+    assert '[Warning]' in capsys.readouterr().err
+
+    # The summary page is required.
+    with pytest.raises(Exception):
+        r.fetch(Market.OpenSea, 'b')
+    r.close()
+
+
+def test_fetch_tabs_blocked(browsers):
+    spec = MarketSpec([Page('https://example.com/{id}', {'name': '//h1', 'floor': '//p[1]', 'volume': '//p[2]'})])
+    pages = {f'https://example.com/{id}': {'//h1': id.upper(), '//p[1]': '1.5', '//p[2]': '2K'} for id in ['a', 'b', 'c']}
+
+    r = Retriever(Browser.Firefox, sec_wait=0, wait=Wait.Ready, specs={Market.OpenSea: spec}, retry=RetryPolicy(num_retry=0))
+    drivers = browsers.install(r._pool, pages, popups=False)
+    results = r.fetch_tabs(Market.OpenSea, ['a', 'b', 'c'])
+    r.close()
+
+    # No tab could be opened, so the pages were loaded one after another in the first tab.
+    assert [result.nft.name for result in results] == ['A', 'B', 'C']
+    assert drivers[0].urls == ['https://example.com/a', 'https://example.com/b', 'https://example.com/c']
+    assert list(drivers[0].tabs) == ['tab-0']
+
+
+def test_session_pool_reuse(browsers):
+    spec = MarketSpec([Page('https://example.com/{id}', {'name': '//h1', 'floor': '//p[1]', 'volume': '//p[2]'})])
+    pages = {f'https://example.com/{id}': {'//h1': id.upper(), '//p[1]': '1.5', '//p[2]': '2K'} for id in 'abcde'}
+
+    r = Retriever(Browser.Firefox, sec_wait=0, wait=Wait.Ready, max_pages=3, specs={Market.OpenSea: spec}, retry=RetryPolicy(num_retry=0))
+    drivers = browsers.install(r._pool, pages)
+    assert [r.fetch(Market.OpenSea, id).name for id in 'abcde'] == list('ABCDE')
+
+    # A session was reused until it loaded max_pages pages, and then recycled.
+    assert len(drivers) == 2
+    assert drivers[0].urls == [f'https://example.com/{id}' for id in 'abc'] and drivers[0].num_quit == 1
+    assert drivers[1].urls == [f'https://example.com/{id}' for id in 'de'] and drivers[1].num_quit == 0
+    r.close()
+    assert drivers[1].num_quit == 1
+
+
+def test_session_pool_replace(browsers):
+    pool = _SessionPool(Browser.Firefox, headless=True, size=1)
+    drivers = browsers.install(pool)
+
+    # A session whose browser has exited is replaced on acquire.
+    session = pool.acquire()
+    pool.release(session)
+    drivers[0].dead = True
+    session = pool.acquire()
+    assert session.driver is drivers[1] and drivers[0].num_quit == 1
+
+    # A broken session is quit on release, and replaced on acquire.
+    session.broken = True
+    pool.release(session)
+    assert drivers[1].num_quit == 1
+    assert pool.acquire().driver is drivers[2]
+    pool.close()
+
+
+def test_session_pool_close(browsers):
+    pool = _SessionPool(Browser.Firefox, headless=True, size=2)
+    drivers = browsers.install(pool)
+
+    busy, idle = pool.acquire(), pool.acquire()
+    pool.release(idle)
+    pool.close()
+    # Idle sessions are quit right away, and busy ones on release.
+    assert [driver.num_quit for driver in drivers] == [0, 1]
+    pool.release(busy)
+    assert [driver.num_quit for driver in drivers] == [1, 1]
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_fetch_many_limits():
+    r = Retriever(Browser.Firefox, pool_size=3)
+    lock = threading.Lock()
+    running = {Market.OpenSea: 0, Market.MagicEden: 0}
+    peaks = {Market.OpenSea: 0, Market.MagicEden: 0, None: 0}
+
+    def fetch(market, id):
+        with lock:
+            running[market] += 1
+            peaks[market] = max(peaks[market], running[market])
+            peaks[None] = max(peaks[None], sum(running.values()))
+        time.sleep(0.02)
+        with lock:
+            running[market] -= 1
+        if id == 'broken':
+            raise ValueError(id)
+        return NFTInfo(id, id, None, None, None, 1.0, 1.0, None)
+
+    r.fetch = fetch
+    pairs = [(Market.OpenSea, str(i)) for i in range(6)] + [(Market.MagicEden, str(i)) for i in range(6)] + [(Market.MagicEden, 'broken')]
+    batch = r.fetch_many(pairs, market_limits={Market.OpenSea: 1})
+    assert len(list(batch)) == len(pairs)
+    # Within the limit of the market, and of the workers.
+    assert peaks[Market.OpenSea] == 1 and peaks[None] <= 3
+    assert batch.summary() == {'total': 13, 'succeeded': 12, 'failed': 1, 'errors': {'Market.MagicEden:broken': "ValueError('broken')"}}
+
+    for kwargs in [{'max_workers': 0}, {'market_limits': {Market.OpenSea: 0}}, {'tabs': 0}]:
+        with pytest.raises(ValueError):
+            r.fetch_many(pairs, **kwargs)
+    r.close()
+
+
+def test_fetch_many_window():
+    r = Retriever(Browser.Firefox, pool_size=2)
+    r.fetch = lambda market, id: time.sleep(0.01) or NFTInfo(id, id, None, None, None, 1.0, 1.0, None)
+    num_read = []
+
+    def pairs():
+        # Endless, so that only a window can be read.
+        for i in itertools.count():
+            num_read.append(i)
+            yield Market.OpenSea, str(i)
+
+    batch = r.fetch_many(pairs(), window=3)
+    for num_yielded, result in enumerate(itertools.islice(batch, 10), 1):
+        # No more than the window is read ahead of the results.
+        assert len(num_read) <= num_yielded + 3
+    assert len(batch.pairs) <= 13 and batch.summary()['succeeded'] == 10
+    r.close()
+
+
+def test_fetch_many_concurrency(browsers):
+    spec = MarketSpec([Page('https://example.com/{id}', {'name': '//h1', 'floor': '//p[1]', 'volume': '//p[2]'})])
+    pages = {f'https://example.com/{id}': {'//h1': id.upper(), '//p[1]': '1.5', '//p[2]': '2K'} for id in 'abcd'}
+    # Every page load waits for the other three, so the fetches finish only if all of them run at once.
+    barrier = threading.Barrier(4, timeout=5)
+
+    class _BlockingDriver(_FakeDriver):
+        def get(self, url):
+            barrier.wait()
+            super().get(url)
+
+    # A pool of one session by default.
+    r = Retriever(Browser.Firefox, sec_wait=0, wait=Wait.Ready, specs={Market.OpenSea: spec}, retry=RetryPolicy(num_retry=0))
+    drivers = browsers.install(r._pool, pages, driver=_BlockingDriver)
+    results = list(r.fetch_many([(Market.OpenSea, id) for id in 'abcd'], max_workers=4))
+    r.close()
+
+    assert sorted(result.nft.name for result in results if result.ok) == list('ABCD')
+    assert len(drivers) == 4 and r.max_workers == 4
@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+from nft_market import Browser, Market, MissingFieldError, NFTInfo, ParseError, Retriever, RetryPolicy
+
+
+def test_backoff():
+    policy = RetryPolicy(base=1, multiplier=2, cap=5, jitter=False)
+    assert [policy.backoff(n) for n in range(5)] == [1, 2, 4, 5, 5]
+
+    policy = RetryPolicy(base=1, multiplier=2, cap=5)
+    assert all(0 <= policy.backoff(n) <= 5 for n in range(10))
+
+
+def test_next_wait():
+    policy = RetryPolicy(num_retry=2, base=1, jitter=False)
+    started_at = time.monotonic()
+    error = MissingFieldError('id', 'floor', 'No such element')
+    assert policy.next_wait(1, error, started_at) == 1
+    assert policy.next_wait(2, error, started_at) == 2
+    assert policy.next_wait(3, error, started_at) is None
+    assert policy.next_wait(1, ParseError('id', 'floor', 'Not a number'), started_at) is None
+
+    policy = RetryPolicy(base=10, jitter=False, deadline=5)
+    assert policy.next_wait(1, error, started_at) is None
+
+
+def test_fetch_does_not_leak_backoff():
+    r = Retriever(Browser.Firefox, retry=RetryPolicy(num_retry=3, base=0.01, jitter=False))
+    attempts = []
+
+    def retrieve(id):
+        attempts.append(id)
+        if len(attempts) % 2 == 1:
+            return None, MissingFieldError(id, 'floor', 'No such element')
+        return NFTInfo(id, 'name', None, None, None, 1.0, 1.0, None), None
+
+    r._retriever_of = lambda market: retrieve
+    for _ in range(3):
+        r.fetch(Market.OpenSea, 'azuki')
+    assert len(attempts) == 6
+    assert r.retry.backoff(0) == 0.01
+
+    r._retriever_of = lambda market: lambda id: (None, ParseError(id, 'floor', 'Not a number'))
+    with pytest.raises(ParseError):
+        r.fetch(Market.OpenSea, 'azuki')
+    r.close()
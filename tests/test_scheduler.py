@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from nft_market import CachedRetriever, Market, NFTInfo, Scheduler, TokenBucket
+
+
+class _FakeRetriever:
+    max_workers = 4
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def fetch(self, market, id):
+        with self.lock:
+            self.calls.append((time.monotonic(), market, id))
+        time.sleep(0.01)
+        if id == 'broken':
+            raise ValueError(id)
+        return NFTInfo(id, id, None, None, None, 1.0, 1.0, None)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=60, burst=2)
+    now = time.monotonic()
+    assert bucket.try_acquire(now) == 0
+    assert bucket.try_acquire(now) == 0
+    assert bucket.try_acquire(now) == 1
+    assert bucket.try_acquire(now + 1) == 0
+
+    for kwargs in [{'rate': 0}, {'rate': -1}, {'rate': 60, 'burst': 0}]:
+        with pytest.raises(ValueError):
+            TokenBucket(**kwargs)
+    with pytest.raises(ValueError):
+        Scheduler(_FakeRetriever(), budgets={Market.OpenSea: 0})
+
+
+def test_scheduler():
+    r = _FakeRetriever()
+    results = []
+    watchlist = [(Market.OpenSea, f'os-{i}', 0.1) for i in range(5)] + [(Market.MagicEden, 'me', 0.1), (Market.MagicEden, 'broken', 0.1)]
+    with Scheduler(r, watchlist, budgets={Market.OpenSea: 600}, on_result=results.append) as scheduler:
+        # Until a few rounds of the OpenSea watchlist, however slow the machine is.
+        deadline = time.monotonic() + 30
+        while sum(market == Market.OpenSea for _, market, _ in r.calls) < 10 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        metrics = scheduler.metrics()
+        calls = list(r.calls)
+
+    # 10 requests per second to OpenSea, at most. Only bounds that hold however late the threads run are asserted.
+    opensea = [t for t, market, _ in calls if market == Market.OpenSea]
+    assert len(opensea) >= 10
+    assert opensea[-1] - opensea[0] >= (len(opensea) - 1) * 0.1 * 0.8
+    # MagicEden is not held back by OpenSea, whose five entries share its budget.
+    assert sum(market == Market.MagicEden for _, market, _ in calls) > len(opensea)
+
+    assert metrics.num_failed > 0
+    assert metrics.throughput_by_market['Market.OpenSea'] < metrics.throughput_by_market['Market.MagicEden']
+    # The OpenSea entries are due every 0.1 seconds, but each of them runs every 0.5 seconds.
+    assert metrics.lag_max > 0.1
+    assert sum(not result.ok for result in results) > 0
+
+
+def test_cached_retriever():
+    with Scheduler(CachedRetriever(_FakeRetriever())) as scheduler:
+        assert scheduler.max_workers == 4
@@ -0,0 +1,43 @@
+import io
+
+import pytest
+
+from nft_market import NFTInfo
+from nft_market import serialize
+
+NFTS = [
+    NFTInfo('azuki', 'Azuki', 10000, None, 5000, 12.5, 1234.0, None),
+    NFTInfo('doodles-official', 'Doodles ✨', None, 321, None, 3.2, 0.0, 7),
+    ]
+
+
+def test_jsonl():
+    f = io.StringIO()
+    assert serialize.write_jsonl(NFTS, f) == 2
+    assert list(serialize.read_jsonl(io.StringIO(f.getvalue()))) == NFTS
+
+
+def test_binary(tmp_path):
+    path = str(tmp_path / 'nfts.bin')
+    # Records across the blocks of the reader.
+    assert serialize.write_binary(NFTS * 50000, path) == 100000
+    assert list(serialize.read_binary(path)) == NFTS * 50000
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    with pytest.raises(ValueError):
+        list(serialize.read_binary(io.BytesIO(data[:-1])))
+
+    # -1 is MISSING, and read back as None.
+    f = io.BytesIO()
+    serialize.write_binary([NFTInfo('azuki', 'Azuki', 10000, None, 5000, 12.5, 1234.0, -1)], f)
+    assert next(serialize.read_binary(io.BytesIO(f.getvalue()))).days_from_last_trade is None
+
+
+def test_parquet(tmp_path):
+    pytest.importorskip('pyarrow')
+
+    path = str(tmp_path / 'nfts.parquet')
+    assert serialize.write_parquet(NFTS * 3, path, batch_size=2) == 6
+    assert list(serialize.read_parquet(path)) == NFTS * 3
+    assert serialize.to_arrow(NFTS).column('num_supply').to_pylist() == [10000, None]
@@ -0,0 +1,30 @@
+import pytest
+
+from nft_market import Explorer, Market, MarketSpec, REGISTRY
+
+
+def test_registry():
+    for market in list(Market) + list(Explorer):
+        assert market in REGISTRY, market
+
+
+def test_variants():
+    page = REGISTRY[Market.GhostMarket].pages[0]
+    assert len(page.compiled) == 2
+    floors = [xpath for selectors in page.compiled for field, xpath, _ in selectors if field == 'floor']
+    assert floors[0].endswith('div[3]/span/div[2]/div/div/div[1]')
+    assert floors[1].endswith('div[3]/div/div/div[1]')
+
+
+def test_from_dict():
+    spec = MarketSpec.from_dict({
+        'url': 'https://example.com/collection/{id}',
+        'selectors': {'name': '//h1', 'floor': ['//*[@id="floor"]', 'strip_eth'], 'volume': '//*[@id="volume"]'},
+        })
+    page = spec.pages[0]
+    assert page.format_url('foo') == 'https://example.com/collection/foo'
+    assert page.selectors['floor'].post('1.5ETH') == '1.5'
+    assert not spec.deprecated
+
+    with pytest.raises(ValueError):
+        MarketSpec.from_dict({'url': '', 'selectors': {'price': '//p'}})
@@ -0,0 +1,46 @@
+import pytest
+
+from nft_market import MISSING, Market, NFTInfo, SnapshotStore
+
+
+def _nft(id, floor, num_listing=None):
+    return NFTInfo(id, id.capitalize(), 10000, num_listing, 5000, floor, 100.0, None)
+
+
+def test_history(tmp_path):
+    path = str(tmp_path / 'snapshots')
+    with SnapshotStore(path) as store:
+        for t in range(10):
+            store.extend([(Market.OpenSea, _nft('azuki', float(t))), (Market.MagicEden, _nft('azuki', -float(t), 3))], timestamp=t)
+        assert len(store) == 20
+
+        history = store.history(Market.OpenSea, 'azuki', 3, 6)
+        assert list(history.timestamp) == [3, 4, 5, 6]
+        assert list(history.floor) == [3, 4, 5, 6]
+        assert list(history.num_listing) == [MISSING] * 4
+        assert len(store.history(Market.OpenSea, 'doodles')) == 0
+
+        with pytest.raises(ValueError):
+            store.append(Market.OpenSea, _nft('azuki', 0), timestamp=5)
+
+    # Reopened from the disk.
+    with SnapshotStore(path) as store:
+        assert set(store.keys()) == {(Market.OpenSea, 'azuki'), (Market.MagicEden, 'azuki')}
+        snapshots = list(store.snapshots(9))
+        assert [(market, nft) for _, market, nft in snapshots] == [(Market.OpenSea, _nft('azuki', 9.0)), (Market.MagicEden, _nft('azuki', -9.0, 3))]
+
+
+def test_partial_record(tmp_path, capsys):
+    path = str(tmp_path / 'snapshots')
+    with SnapshotStore(path) as store:
+        store.append(Market.OpenSea, _nft('azuki', 1.0), timestamp=1)
+    # A crash in the middle of an append.
+    with open(path + '.rows', 'ab') as f:
+        f.write(b'\x00' * 7)
+
+    with SnapshotStore(path) as store:
+        assert '[Warning]' in capsys.readouterr().err
+        store.append(Market.OpenSea, _nft('azuki', 2.0), timestamp=2)
+        history = store.history(Market.OpenSea, 'azuki')
+        assert list(history.timestamp) == [1, 2]
+        assert list(history.floor) == [1.0, 2.0]
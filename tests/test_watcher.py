@@ -0,0 +1,42 @@
+from nft_market import FetchResult, Market, NFTInfo, Threshold, Watcher
+
+
+class _FakeRetriever:
+    def __init__(self):
+        self.floors = {}
+        self.num_calls = 0
+
+    def fetch_many(self, pairs):
+        self.num_calls += 1
+        for market, id in pairs:
+            floor = self.floors[id]
+            if floor is None:
+                yield FetchResult(market, id, None, ValueError('unavailable'))
+            else:
+                yield FetchResult(market, id, NFTInfo(id, id, None, 10, None, floor, 100.0, None), None)
+
+
+def test_deltas():
+    r = _FakeRetriever()
+    r.floors = {'azuki': 10.0, 'doodles': 5.0}
+    watcher = Watcher(r, [(Market.OpenSea, 'azuki'), (Market.OpenSea, 'doodles')], thresholds={'floor': Threshold(relative=0.05)},
+                      min_interval=10, max_interval=40)
+
+    deltas = watcher.poll(now=0)
+    assert {d.id: d.changes for d in deltas} == {'azuki': {'floor': (None, 10.0)}, 'doodles': {'floor': (None, 5.0)}}
+
+    # Below the threshold.
+    r.floors = {'azuki': 10.4, 'doodles': 6.0}
+    assert watcher.poll(now=5) == []
+    deltas = watcher.poll(now=10)
+    assert [(d.id, d.changes) for d in deltas] == [('doodles', {'floor': (5.0, 6.0)})]
+
+    # Idle collections back off, and slow drifts add up.
+    assert watcher.interval(Market.OpenSea, 'azuki') == 20
+    assert watcher.interval(Market.OpenSea, 'doodles') == 10
+    r.floors = {'azuki': 10.6, 'doodles': None}
+    assert watcher.poll(now=20) == []
+    deltas = watcher.poll(now=30)
+    assert [(d.id, d.changes) for d in deltas] == [('azuki', {'floor': (10.0, 10.6)})]
+    assert watcher.interval(Market.OpenSea, 'doodles') == 10
+    assert watcher.next_due() == 40